@@ -0,0 +1,166 @@
+"""
+Replay benchmark: inclusion latency and overpayment of the fee oracle's tiers versus the
+previous fixed policy (twice the base fee plus a 1 gwei tip), over recorded fee history.
+
+A transaction submitted after block i is priced from the history up to block i. It is
+included in the first later block whose base fee it covers and whose tip threshold (the
+block's --cutoff reward percentile) its effective tip reaches. Overpayment is what it paid
+per gas above base fee plus that threshold; excess tip is the same in gwei.
+
+Run from the project root:
+    python -m benchmarks.fee_oracle record --rpc https://rpc.soniclabs.com --blocks 2000 --out fees.json
+    python -m benchmarks.fee_oracle run --history fees.json
+    python -m benchmarks.fee_oracle run            # synthetic history with congestion bursts
+"""
+import argparse
+import json
+import random
+import statistics
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.helpers.evm.fees import DEFAULT_TIERS, GWEI, legacy_fees, snapshot_from_history, suggest
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def record(rpc: str, blocks: int, out: str, chunk: int = 500) -> None:
+    """Save eth_feeHistory for the last `blocks` blocks in one feeHistory-shaped JSON file"""
+    from web3 import Web3
+
+    w3 = Web3(Web3.HTTPProvider(rpc))
+    newest = w3.eth.block_number
+    oldest = newest - blocks + 1
+    base_fees, ratios, rewards = [], [], []
+    start = oldest
+    while start <= newest:
+        count = min(chunk, newest - start + 1)
+        history = w3.eth.fee_history(count, start + count - 1, PERCENTILES)
+        base_fees.extend(history["baseFeePerGas"][:-1])
+        ratios.extend(history["gasUsedRatio"])
+        rewards.extend(history["reward"])
+        start += count
+    base_fees.append(history["baseFeePerGas"][-1])
+    with open(out, "w") as f:
+        json.dump({
+            "oldestBlock": oldest,
+            "baseFeePerGas": [int(fee) for fee in base_fees],
+            "gasUsedRatio": ratios,
+            "reward": [[int(tip) for tip in block] for block in rewards],
+            "percentiles": PERCENTILES
+        }, f)
+    print(f"recorded blocks {oldest}..{newest} to {out}")
+
+
+def synthetic(blocks: int, seed: int = 7) -> Dict:
+    """EIP-1559 base fee walk with quiet periods and congestion bursts"""
+    rng = random.Random(seed)
+    base_fee = 50 * GWEI
+    base_fees, ratios, rewards = [], [], []
+    congested = 0
+    for _ in range(blocks):
+        if congested == 0 and rng.random() < 0.01:
+            congested = rng.randint(10, 60)
+        ratio = rng.uniform(0.7, 1.0) if congested else rng.uniform(0.0, 0.95)
+        scale = rng.uniform(1, 20) * GWEI if congested else rng.uniform(0.001, 0.3) * GWEI
+        tips = sorted(int(scale * rng.uniform(0.05, 1.5)) for _ in PERCENTILES)
+        base_fees.append(base_fee)
+        ratios.append(ratio)
+        rewards.append(tips if ratio > 0 else [0] * len(PERCENTILES))
+        base_fee = max(GWEI, int(base_fee * (1 + (ratio - 0.5) / 0.5 / 8)))
+        congested = max(0, congested - 1)
+    base_fees.append(base_fee)
+    return {"oldestBlock": 0, "baseFeePerGas": base_fees, "gasUsedRatio": ratios,
+            "reward": rewards, "percentiles": PERCENTILES}
+
+
+def _window(history: Dict, end: int, size: int) -> Dict:
+    start = max(0, end - size + 1)
+    return {
+        "oldestBlock": history["oldestBlock"] + start,
+        "baseFeePerGas": history["baseFeePerGas"][start:end + 2],
+        "gasUsedRatio": history["gasUsedRatio"][start:end + 1],
+        "reward": history["reward"][start:end + 1],
+    }
+
+
+def simulate(history: Dict, price: Callable[[Dict], Tuple[int, int]], window: int,
+             cutoff: int, max_wait: int) -> Dict[str, Optional[float]]:
+    percentiles = history["percentiles"]
+    cutoff_column = percentiles.index(cutoff)
+    base_fees, ratios, rewards = history["baseFeePerGas"], history["gasUsedRatio"], history["reward"]
+    blocks = len(ratios)
+    latencies: List[int] = []
+    overpayments: List[float] = []
+    headroom: List[float] = []
+    tip_excess: List[float] = []
+    missed = 0
+    for i in range(window - 1, blocks - 1):
+        max_fee, tip = price(_window(history, i, window))
+        for j in range(i + 1, min(blocks, i + 1 + max_wait)):
+            base_fee = base_fees[j]
+            threshold = rewards[j][cutoff_column] if ratios[j] > 0 else 0
+            effective_tip = min(tip, max_fee - base_fee)
+            if max_fee >= base_fee and effective_tip >= threshold:
+                latencies.append(j - i)
+                overpayments.append((base_fee + effective_tip) / (base_fee + threshold) - 1)
+                headroom.append(max_fee / base_fee)
+                tip_excess.append((effective_tip - threshold) / GWEI)
+                break
+        else:
+            missed += 1
+    total = len(latencies) + missed
+    latencies.sort()
+    return {
+        "included": len(latencies) / total if total else None,
+        "latency_mean": statistics.mean(latencies) if latencies else None,
+        "latency_p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else None,
+        "overpay_mean": statistics.mean(overpayments) if overpayments else None,
+        "tip_excess_gwei": statistics.mean(tip_excess) if tip_excess else None,
+        "max_fee_headroom": statistics.mean(headroom) if headroom else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command")
+    rec = sub.add_parser("record")
+    rec.add_argument("--rpc", required=True)
+    rec.add_argument("--blocks", type=int, default=2000)
+    rec.add_argument("--out", default="fee_history.json")
+    run = sub.add_parser("run")
+    run.add_argument("--history", help="file written by `record`; synthetic history if omitted")
+    run.add_argument("--blocks", type=int, default=5000, help="synthetic history length")
+    run.add_argument("--window", type=int, default=10, help="blocks of history the oracle sees")
+    run.add_argument("--cutoff", type=int, default=25, choices=PERCENTILES, help="tip percentile needed for inclusion")
+    run.add_argument("--max-wait", type=int, default=50, help="blocks before a tx counts as not included")
+    args = parser.parse_args()
+    if args.command is None:
+        args = parser.parse_args(["run"])
+
+    if args.command == "record":
+        record(args.rpc, args.blocks, args.out)
+        return
+
+    if args.history:
+        with open(args.history) as f:
+            history = json.load(f)
+    else:
+        history = synthetic(args.blocks)
+    window, cutoff, max_wait = args.window, args.cutoff, args.max_wait
+    percentiles = history["percentiles"]
+
+    strategies = {"legacy (2x base + 1 gwei)": lambda h: legacy_fees(h["baseFeePerGas"][-1])}
+    for name, tier in DEFAULT_TIERS.items():
+        strategies[name] = lambda h, tier=tier: suggest(snapshot_from_history(h, percentiles), tier)
+
+    print(f"blocks: {len(history['gasUsedRatio'])}, window: {window}, inclusion cutoff: p{cutoff}, max wait: {max_wait}")
+    print(f"{'strategy':<26}{'included':>10}{'latency':>10}{'p95':>6}{'overpay':>10}{'excess tip':>12}{'max fee/base':>14}")
+    for name, price in strategies.items():
+        r = simulate(history, price, window, cutoff, max_wait)
+        fmt = lambda v, spec: format(v, spec) if v is not None else "-"
+        print(f"{name:<26}{fmt(r['included'], '>10.1%')}{fmt(r['latency_mean'], '>10.2f')}"
+              f"{fmt(r['latency_p95'], '>6')}{fmt(r['overpay_mean'], '>10.2%')}{fmt(r['tip_excess_gwei'], '>12.3f')}{fmt(r['max_fee_headroom'], '>14.2f')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Round trips per action with and without JSON-RPC batching, against a local stub node.
+
+The stub answers every method the pre-flight of a Sonic sell or swap uses and counts
+HTTP POSTs. Each scenario replays an action's RPC reads, once through a plain pooled
+provider and once through the RpcBatcher, and prints POSTs (round trips) and wall time.
+Serial reads get faster by the round trips saved; pre-flight steps already run
+concurrently, so there batching mostly saves POSTs (and rate-limit budget) rather than time.
+
+Run from the project root:
+    python -m benchmarks.rpc_batch --latency 0.05 --runs 5
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+
+from web3 import Web3
+
+from src.constants.abi import ERC20_ABI
+from src.helpers.evm.rpc_batch import RpcBatcher
+from src.helpers.evm.rpc_pool import PooledHTTPProvider, RpcPool
+from src.helpers.preflight import Preflight
+
+WALLET = "0x000000000000000000000000000000000000dEaD"
+TOKEN = "0x039e2fB66102314Ce7b64Ce5Ce3E5183bc94aD38"
+ROUTER = "0x1c55b1C160e8D398E7535C9Ec556914aeFb51ee7"
+WORD = "0x" + "0" * 62 + "12"
+
+RESULTS = {
+    "eth_chainId": "0x92",
+    "eth_blockNumber": "0x100",
+    "eth_gasPrice": "0x3b9aca00",
+    "eth_getTransactionCount": "0x7",
+    "eth_getBalance": "0xde0b6b3a7640000",
+    "eth_estimateGas": "0x5208",
+    "eth_call": WORD,
+    "eth_feeHistory": {"oldestBlock": "0xf7", "baseFeePerGas": ["0x3b9aca00"] * 11,
+                       "gasUsedRatio": [0.5] * 10, "reward": [["0x1", "0x2", "0x3"]] * 10},
+}
+
+
+class CountingNode:
+    def __init__(self, latency: float):
+        self.posts = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                node.posts += 1
+                time.sleep(latency)
+                calls = body if isinstance(body, list) else [body]
+                results = [{"jsonrpc": "2.0", "id": call["id"], "result": RESULTS.get(call["method"], "0x0")} for call in calls]
+                payload = json.dumps(results if isinstance(body, list) else results[0]).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+def sell_preflight(w3: Web3, batcher) -> None:
+    """The reads of sell_token: balance, allowance and fees, then the gas estimate"""
+    token = w3.eth.contract(address=TOKEN, abi=ERC20_ABI)
+    preflight = Preflight("sell_token", batcher)
+    preflight.step("fees", lambda: w3.eth.fee_history(10, "latest", [10, 50, 90]))
+    preflight.step("balance", lambda: token.functions.balanceOf(WALLET).call())
+    preflight.step("allowance", lambda: token.functions.allowance(WALLET, ROUTER).call())
+    preflight.step("native", lambda: w3.eth.get_balance(WALLET))
+    preflight.step("estimate_gas", lambda *_: w3.eth.estimate_gas({"from": WALLET, "to": ROUTER, "data": "0x"}),
+                   "fees", "balance", "allowance")
+    preflight.run()
+
+
+def evm_transfer_prep(w3: Web3, batcher) -> None:
+    """Nonce and gas price for a legacy transfer"""
+    if batcher is None:
+        w3.eth.get_transaction_count(WALLET)
+        w3.eth.gas_price
+    else:
+        batcher.gather(lambda: w3.eth.get_transaction_count(WALLET), lambda: w3.eth.gas_price)
+
+
+def sonic_transfer_prep(w3: Web3, batcher) -> None:
+    """Fee history, chain id and token decimals ahead of a Sonic transfer"""
+    token = w3.eth.contract(address=TOKEN, abi=ERC20_ABI)
+    calls = (lambda: w3.eth.fee_history(10, "latest", [10, 50, 90]), lambda: w3.eth.chain_id,
+             lambda: token.functions.decimals().call())
+    if batcher is None:
+        for call in calls:
+            call()
+    else:
+        batcher.gather(*calls)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "sell-token pre-flight": sell_preflight,
+    "evm transfer nonce+gas": evm_transfer_prep,
+    "sonic transfer prep": sonic_transfer_prep,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stub takes per POST")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    node = CountingNode(args.latency)
+    pool = RpcPool([node.url], hedge_after=None)
+    plain = Web3(PooledHTTPProvider(pool))
+    batcher = RpcBatcher(pool.send)
+    batched = Web3(PooledHTTPProvider(pool, batcher))
+
+    print(f"stub latency {args.latency * 1000:.0f}ms per POST, {args.runs} runs each")
+    print(f"{'action':<26}{'POSTs plain':>13}{'POSTs batched':>15}{'ms plain':>10}{'ms batched':>12}")
+    for name, scenario in SCENARIOS.items():
+        row = {}
+        for label, w3, b in (("plain", plain, None), ("batched", batched, batcher)):
+            posts_before, times = node.posts, []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                scenario(w3, b)
+                times.append((time.perf_counter() - started) * 1000)
+            row[label] = ((node.posts - posts_before) / args.runs, statistics.median(times))
+        print(f"{name:<26}{row['plain'][0]:>13.1f}{row['batched'][0]:>15.1f}{row['plain'][1]:>10.0f}{row['batched'][1]:>12.0f}")
+    print(f"\nbatcher: {batcher.metrics()}")
+    node.server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Local benchmark for the RPC pool: read latency and errors against stub JSON-RPC servers.
+
+Three stub nodes run on localhost: a fast one with occasional long stalls, a steady
+slower one, and a flaky one that returns HTTP 503 for a share of requests. The same
+reads are sent through a web3 instance on each single node and through the pool, with
+and without hedging, and the latency percentiles and failures are compared. Per-endpoint
+metrics of the hedged pool are printed at the end.
+
+Run from the project root:
+    python -m benchmarks.rpc_pool --requests 300 --hedge-after 0.05
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+from web3 import Web3
+
+from src.helpers.evm.rpc_pool import PooledHTTPProvider, RpcPool
+
+
+class StubNode:
+    """JSON-RPC server answering eth_blockNumber / eth_chainId after a configurable delay"""
+
+    def __init__(self, name: str, latency: float, stall_rate: float = 0.0, stall: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.name = name
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                node.requests += 1
+                delay = node.latency * node.rng.uniform(0.8, 1.2)
+                if node.rng.random() < node.stall_rate:
+                    delay += node.stall
+                time.sleep(delay)
+                if node.rng.random() < node.error_rate:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                calls = body if isinstance(body, list) else [body]
+                results = [{"jsonrpc": "2.0", "id": call["id"], "result": "0x92" if call["method"] == "eth_chainId" else "0x10"}
+                           for call in calls]
+                payload = json.dumps(results if isinstance(body, list) else results[0]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+def run(w3: Web3, requests: int) -> Tuple[List[float], int]:
+    latencies, failures = [], 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        try:
+            w3.eth.block_number
+        except Exception:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return latencies, failures
+
+
+def summarize(latencies: List[float], failures: int) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else float("nan")
+    return {
+        "mean": statistics.mean(latencies) * 1000 if latencies else float("nan"),
+        "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+        "failures": failures
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--hedge-after", type=float, default=0.05, help="seconds before a duplicate read is sent")
+    args = parser.parse_args()
+    logging.getLogger("helpers.evm.rpc_pool").setLevel(logging.ERROR)
+
+    nodes = [
+        StubNode("fast, stalls", latency=0.01, stall_rate=0.08, stall=0.5, seed=1),
+        StubNode("steady", latency=0.03, seed=2),
+        StubNode("flaky", latency=0.015, error_rate=0.3, seed=3),
+    ]
+    urls = [node.url for node in nodes]
+    setups = {f"single: {node.name}": RpcPool([node.url], hedge_after=None) for node in nodes}
+    setups["pool, no hedging"] = RpcPool(urls, hedge_after=None, cooldown=2.0)
+    setups[f"pool, hedge after {args.hedge_after * 1000:.0f}ms"] = hedged = RpcPool(urls, hedge_after=args.hedge_after, cooldown=2.0)
+
+    print(f"{args.requests} eth_blockNumber reads per setup")
+    print(f"{'setup':<28}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'failed':>8}")
+    try:
+        for name, pool in setups.items():
+            r = summarize(*run(Web3(PooledHTTPProvider(pool)), args.requests))
+            print(f"{name:<28}{r['mean']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['failures']:>8}")
+        print("\nhedged pool endpoints:")
+        metrics = hedged.metrics()
+        for node, endpoint in zip(nodes, metrics["read"]):
+            print(f"  {node.name:<14} latency {endpoint['latency_ms']}ms, {endpoint['requests']} requests, "
+                  f"{endpoint['errors']} errors, {endpoint['hedges_won']} hedges won, healthy={endpoint['healthy']}")
+        print(f"  {metrics['stats']}")
+    finally:
+        for node in nodes:
+            node.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: time to sign one Sonic sell transaction with each signer type.
+
+The local signer and the HSM stand-in sign a real EIP-1559 transaction. Privy is
+approximated by the client side of its path: the authorization signature every request
+carries, plus a sleep for the HTTPS round trip (--privy-latency, 0 to leave it out).
+
+Run from the project root:
+    python -m benchmarks.tx_signers --iterations 500 --privy-latency 0.15
+"""
+import argparse
+import time
+
+from eth_account import Account
+
+from benchmarks.privy_signer import APP_ID, BODY, URL, _generate_auth_key
+from src.helpers.evm.privy import PrivyAuthorizationSigner
+from src.helpers.evm.signers import HsmSigner, LocalKeySigner, PrivySigner, SoftwareHsm
+
+
+def _sell_tx(sender: str) -> dict:
+    return {
+        "from": sender,
+        "to": "0x1c55b1C160e8D398E7535C9Ec556914aeFb51ee7",
+        "data": "0x" + "ab" * 100,
+        "value": 0,
+        "nonce": 42,
+        "gas": 210000,
+        "chainId": 146,
+        "type": 2,
+        "maxFeePerGas": 110 * 10 ** 9,
+        "maxPriorityFeePerGas": 10 ** 9,
+    }
+
+
+def _per_signature_ms(signer, tx: dict, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        signer.sign(tx)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--privy-latency", type=float, default=0.15, help="seconds per simulated Privy round trip")
+    args = parser.parse_args()
+
+    account = Account.create()
+    private_key = account.key.hex()
+    hsm = SoftwareHsm()
+    hsm.import_key("bench", private_key)
+    auth = PrivyAuthorizationSigner(_generate_auth_key())
+
+    def privy_sign(tx, wallet_id):
+        auth.sign("POST", URL, BODY, APP_ID)
+        time.sleep(args.privy_latency)
+        return b""
+
+    tx = _sell_tx(account.address)
+    local = LocalKeySigner(private_key)
+    assert HsmSigner(hsm, "bench").sign(tx) == local.sign(tx), "HSM and local signatures differ"
+
+    rows = [
+        ("local key", local, args.iterations),
+        ("HSM stand-in", HsmSigner(hsm, "bench"), args.iterations),
+        ("Privy (simulated)", PrivySigner("wallet-id", privy_sign), max(1, min(args.iterations, 20))),
+    ]
+    print(f"{'signer':<20}{'ms per tx':>12}")
+    for name, signer, iterations in rows:
+        print(f"{name:<20}{_per_signature_ms(signer, tx, iterations):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,14 @@ import random
 import time
 import logging
 import os
+import threading
 from pathlib import Path
+from typing import List
 from dotenv import load_dotenv
 from src.connection_manager import ConnectionManager
 from src.helpers import print_h_bar
 from src.action_handler import execute_action
+from src.helpers.scheduler import ScheduledTask
 import src.actions.twitter_actions  
 import src.actions.echochamber_actions
 import src.actions.solana_actions
@@ -66,6 +69,7 @@ class ZerePyAgent:
 
             # Set up empty agent state
             self.state = {}
+            self._inputs_lock = threading.Lock()
 
         except Exception as e:
             logger.error("Could not load ZerePy agent")
@@ -147,6 +151,9 @@ class ZerePyAgent:
 
     def perform_action(self, connection: str, action: str, **kwargs) -> None:
         return self.connection_manager.perform_action(connection, action, **kwargs)
+
+    async def perform_action_async(self, connection: str, action: str, **kwargs) -> None:
+        return await self.connection_manager.perform_action_async(connection, action, **kwargs)
     
     def select_action(self, use_time_based_weights: bool = False) -> dict:
         task_weights = [weight for weight in self.task_weights.copy()]
@@ -157,6 +164,74 @@ class ZerePyAgent:
         
         return random.choices(self.tasks, weights=task_weights, k=1)[0]
 
+    def replenish_inputs(self) -> None:
+        """Read the timeline and room info the tasks work from, when they have run out"""
+        # TODO: Add more inputs to complexify agent behavior
+        with self._inputs_lock:
+            if "timeline_tweets" not in self.state or self.state["timeline_tweets"] is None or len(self.state["timeline_tweets"]) == 0:
+                if any("tweet" in task["name"] for task in self.tasks):
+                    logger.info("\n👀 READING TIMELINE")
+                    self.state["timeline_tweets"] = self.connection_manager.perform_action(
+                        connection_name="twitter",
+                        action_name="read-timeline",
+                        params=[]
+                    )
+
+            if "room_info" not in self.state or self.state["room_info"] is None:
+                if any("echochambers" in task["name"] for task in self.tasks):
+                    logger.info("\n👀 READING ECHOCHAMBERS ROOM INFO")
+                    self.state["room_info"] = self.connection_manager.perform_action(
+                        connection_name="echochambers",
+                        action_name="get-room-info",
+                        params={}
+                    )
+
+    def run_task(self, action_name: str):
+        """Refresh inputs and perform one task; the result is truthy on success"""
+        self.replenish_inputs()
+        return execute_action(self, action_name)
+
+    def _task_interval(self, index: int):
+        """
+        Interval for a task without one in the JSON: as often as the weighted random
+        loop would pick it, i.e. loop_delay * total weight / its weight (time of day
+        adjusted when use_time_based_weights is set).
+        """
+        def interval():
+            weights = self.task_weights
+            if self.use_time_based_weights:
+                weights = self._adjust_weights_for_time(datetime.now().hour, weights)
+            return self.loop_delay * sum(weights) / weights[index] if weights[index] > 0 else None
+        return interval
+
+    def scheduled_tasks(self) -> List[ScheduledTask]:
+        """
+        The agent's tasks for the server's scheduler. A task entry may set "interval"
+        (seconds), "jitter" (fraction of the interval, default 0.1), "trigger" (an event
+        name that runs it on demand) and "retry_delay" (after a failure, default 60).
+        """
+        if not self.is_llm_set:
+            try:
+                self._setup_llm_provider()
+                self.is_llm_set = True
+            except ValueError as e:
+                logger.warning(f"{e}; tasks that generate text will fail")
+
+        tasks = []
+        for index, task in enumerate(self.tasks):
+            interval = task.get("interval")
+            if interval is None and not task.get("trigger"):
+                interval = self._task_interval(index)
+            tasks.append(ScheduledTask(
+                name=task["name"],
+                run=lambda action_name=task["name"]: self.run_task(action_name),
+                interval=interval,
+                jitter=task.get("jitter", 0.1),
+                trigger=task.get("trigger"),
+                retry_delay=task.get("retry_delay", 60)
+            ))
+        return tasks
+
     def loop(self):
         """Main agent loop for autonomous behavior"""
         if not self.is_llm_set:
@@ -177,24 +252,7 @@ class ZerePyAgent:
                 success = False
                 try:
                     # REPLENISH INPUTS
-                    # TODO: Add more inputs to complexify agent behavior
-                    if "timeline_tweets" not in self.state or self.state["timeline_tweets"] is None or len(self.state["timeline_tweets"]) == 0:
-                        if any("tweet" in task["name"] for task in self.tasks):
-                            logger.info("\n👀 READING TIMELINE")
-                            self.state["timeline_tweets"] = self.connection_manager.perform_action(
-                                connection_name="twitter",
-                                action_name="read-timeline",
-                                params=[]
-                            )
-
-                    if "room_info" not in self.state or self.state["room_info"] is None:
-                        if any("echochambers" in task["name"] for task in self.tasks):
-                            logger.info("\n👀 READING ECHOCHAMBERS ROOM INFO")
-                            self.state["room_info"] = self.connection_manager.perform_action(
-                                connection_name="echochambers",
-                                action_name="get-room-info",
-                                params={}
-                            )
+                    self.replenish_inputs()
 
                     # CHOOSE AN ACTION
                     # TODO: Add agentic action selection
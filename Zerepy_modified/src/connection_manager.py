@@ -1,4 +1,8 @@
+import asyncio
+import contextvars
+import functools
 import logging
+from concurrent.futures import Executor
 from typing import Any, List, Optional, Type, Dict
 from src.connections.base_connection import BaseConnection
 from src.connections.anthropic_connection import AnthropicConnection
@@ -22,6 +26,9 @@ from src.connections.together_connection import TogetherAIConnection
 
 logger = logging.getLogger("connection_manager")
 
+# Sonic actions that only read chain state
+SONIC_READ_ONLY_ACTIONS = ['get-balance', 'get-balances', 'get-portfolio', 'get-token-by-ticker', 'get-nonce-metrics', 'get-swap-quote', 'get-tx-status', 'get-fee-tiers', 'get-rpc-metrics', 'get-signers']
+
 
 class ConnectionManager:
     def __init__(self, agent_config):
@@ -172,6 +179,42 @@ class ConnectionManager:
         except Exception as e:
             logging.error(f"\nAn error occurred: {e}")
 
+    def _build_kwargs(self, connection_name: str, action_name: str, params: List[Any]) -> Optional[Dict[str, Any]]:
+        """Map positional params onto the action's parameter names; None if the action is unusable"""
+        connection = self.connections[connection_name]
+        if action_name not in connection.actions:
+            logging.error(
+                f"\nError: Unknown action '{action_name}' for connection '{connection_name}'"
+            )
+            return None
+
+        action = connection.actions[action_name]
+
+        # Convert list of params to kwargs dictionary, handling both required and optional params
+        kwargs = {}
+        param_index = 0
+
+        # Add provided parameters up to the number provided
+        for i, param in enumerate(action.parameters):
+            if param_index < len(params):
+                kwargs[param.name] = params[param_index]
+                param_index += 1
+
+        # Validate all required parameters are present
+        missing_required = [
+            param.name
+            for param in action.parameters
+            if param.required and param.name not in kwargs
+        ]
+
+        if missing_required:
+            logging.error(
+                f"\nError: Missing required parameters: {', '.join(missing_required)}"
+            )
+            return None
+
+        return kwargs
+
     def perform_action(
         self, connection_name: str, action_name: str, params: List[Any]
     ) -> Optional[Any]:
@@ -181,7 +224,7 @@ class ConnectionManager:
 
             # Only check read-only status for Sonic connection
             if isinstance(connection, SonicConnection):
-                read_only_actions = ['get-balance', 'get-token-by-ticker']
+                read_only_actions = SONIC_READ_ONLY_ACTIONS
                 privy_enabled_actions = ['transfer', 'swap', 'create-token', 'sell-token', 'get-sell-quote']  # Add Privy-enabled actions
                 require_private_key = (action_name not in read_only_actions 
                                      and action_name not in privy_enabled_actions)
@@ -198,38 +241,51 @@ class ConnectionManager:
                     logging.error(f"\nError: Connection '{connection_name}' is not configured")
                     return None
 
-            if action_name not in connection.actions:
-                logging.error(
-                    f"\nError: Unknown action '{action_name}' for connection '{connection_name}'"
-                )
+            kwargs = self._build_kwargs(connection_name, action_name, params)
+            if kwargs is None:
                 return None
 
-            action = connection.actions[action_name]
+            return connection.perform_action(action_name, kwargs)
+
+        except Exception as e:
+            logging.error(
+                f"\nAn error occurred while trying action {action_name} for {connection_name} connection: {e}"
+            )
+            return None
 
-            # Convert list of params to kwargs dictionary, handling both required and optional params
-            kwargs = {}
-            param_index = 0
+    @staticmethod
+    def is_read_only(connection_name: str, action_name: str) -> bool:
+        """Whether an action only reads: the Sonic read-only list, and get-* actions elsewhere"""
+        return action_name in SONIC_READ_ONLY_ACTIONS or action_name.startswith("get-")
 
-            # Add provided parameters up to the number provided
-            for i, param in enumerate(action.parameters):
-                if param_index < len(params):
-                    kwargs[param.name] = params[param_index]
-                    param_index += 1
+    async def perform_action_async(
+        self, connection_name: str, action_name: str, params: List[Any], executor: Optional[Executor] = None
+    ) -> Optional[Any]:
+        """
+        Perform an action from async code. Sonic actions with an async implementation are
+        awaited on the event loop; everything else runs the sync path in a worker thread,
+        taken from `executor` when given (the default executor otherwise). The worker runs
+        in a copy of the caller's context, as under asyncio.to_thread.
+        """
+        connection = self.connections.get(connection_name)
+        async_client = getattr(connection, "async_client", None) if isinstance(connection, SonicConnection) else None
+        if async_client is None or not async_client.supports(action_name):
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(contextvars.copy_context().run,
+                                            self.perform_action, connection_name, action_name, params)
+            )
 
-            # Validate all required parameters are present
-            missing_required = [
-                param.name
-                for param in action.parameters
-                if param.required and param.name not in kwargs
-            ]
+        try:
+            # Every async Sonic action is read-only or Privy-signed, so a live node is all that is needed
+            if not await async_client.is_connected():
+                logging.error(f"\nError: Could not connect to {connection_name} network")
+                return None
 
-            if missing_required:
-                logging.error(
-                    f"\nError: Missing required parameters: {', '.join(missing_required)}"
-                )
+            kwargs = self._build_kwargs(connection_name, action_name, params)
+            if kwargs is None:
                 return None
 
-            return connection.perform_action(action_name, kwargs)
+            return await async_client.perform_action(action_name, kwargs)
 
         except Exception as e:
             logging.error(
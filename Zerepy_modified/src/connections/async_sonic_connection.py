@@ -0,0 +1,724 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3
+from web3.middleware import async_geth_poa_middleware
+
+from src.constants.abi import ERC20_ABI, SFUN_LAUNCHPAD_ABI
+from src.helpers import progress
+from src.helpers.preflight import Preflight
+from src.helpers.evm.nonce import is_already_known
+from src.helpers.evm.quotes import Quote
+from src.helpers.evm.rpc_pool import AsyncPooledHTTPProvider
+from src.helpers.evm.privy import PRIVY_API, PrivyError, get_authorization_signer, to_privy_transaction
+
+logger = logging.getLogger("connections.async_sonic_connection")
+
+
+
+class AsyncSonicConnectionError(Exception):
+    """Raised by the async Sonic client"""
+    pass
+
+
+class AsyncSonicConnection:
+    """
+    asyncio counterpart of SonicConnection for balances, quotes, swaps, sells and creates.
+
+    It shares the sync connection's nonce manager, token metadata registry, Privy wallet
+    cache and authorization signer, but talks to the RPC node, Kyber and Privy through
+    AsyncWeb3 and one pooled aiohttp session. The server awaits these actions directly
+    instead of parking a worker thread on every HTTP round trip.
+    """
+
+    ACTIONS = ("get-balance", "get-sell-quote", "get-swap-quote", "swap", "sell-token", "create-token")
+
+    def __init__(self, sonic, pool_size: int = 100, request_timeout: float = 30.0):
+        self._sonic = sonic
+        self.rpc_url = sonic.rpc_url
+        self.explorer = sonic.explorer
+        self.aggregator_api = sonic.aggregator_api
+        self.pool_size = pool_size
+        self.request_timeout = request_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._w3: Optional[AsyncWeb3] = None
+        self._wallet_lookups: Dict[str, asyncio.Future] = {}
+
+    @property
+    def chain_id(self) -> int:
+        return self._sonic.chain_id
+
+    async def _http(self) -> aiohttp.ClientSession:
+        """Pooled keep-alive session shared by RPC, Kyber and Privy requests"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._session
+
+    async def web3(self) -> AsyncWeb3:
+        if self._w3 is None:
+            # Same endpoint pool (and health records) as the sync connection
+            provider = AsyncPooledHTTPProvider(
+                self._sonic._rpc_pool,
+                self._http,
+                request_kwargs={"timeout": aiohttp.ClientTimeout(total=self.request_timeout)}
+            )
+            w3 = AsyncWeb3(provider)
+            w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+            self._w3 = w3
+        return self._w3
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._w3 = None
+
+    async def is_connected(self) -> bool:
+        try:
+            return await (await self.web3()).is_connected()
+        except Exception:
+            return False
+
+    def _get_explorer_link(self, tx_hash: str) -> str:
+        return f"{self.explorer}/tx/{tx_hash}"
+
+    def _is_native(self, token: str) -> bool:
+        return token.lower() == self._sonic.NATIVE_TOKEN.lower()
+
+    async def _token_decimals(self, token_address: str) -> int:
+        """Decimals from the shared registry; read asynchronously the first time a token is seen"""
+        known = self._sonic._tokens.peek(self.chain_id, token_address)
+        if known and known.decimals is not None:
+            return known.decimals
+        w3 = await self.web3()
+        contract = w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+        decimals = await contract.functions.decimals().call()
+        return self._sonic._tokens.put(self.chain_id, token_address, decimals=decimals).decimals
+
+    async def _get_privy_wallet_address(self, privy_wallet_id: Optional[str] = None) -> str:
+        """Resolve a Privy wallet id, sharing one lookup between concurrent callers"""
+        signer = self._sonic._signers.get(privy_wallet_id)
+        if signer is not None:
+            return signer.address
+        privy_wallet_id = privy_wallet_id or os.getenv("PRIVY_WALLET_ID")
+        if not privy_wallet_id:
+            raise AsyncSonicConnectionError("Missing Privy configuration")
+
+        cache = self._sonic._privy_wallets
+        address = cache.peek(privy_wallet_id)
+        if address:
+            return address
+
+        pending = self._wallet_lookups.get(privy_wallet_id)
+        if pending is not None:
+            cache.stats["shared"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._wallet_lookups[privy_wallet_id] = future
+        try:
+            address = await self._fetch_privy_wallet(privy_wallet_id)
+            cache.remember(privy_wallet_id, address)
+            future.set_result(address)
+            return address
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            self._wallet_lookups.pop(privy_wallet_id, None)
+
+    def _privy_credentials(self):
+        app_id = os.getenv("PRIVY_APP_ID")
+        app_secret = os.getenv("PRIVY_APP_SECRET")
+        if not app_id or not app_secret:
+            raise PrivyError("Missing Privy configuration")
+        return app_id, aiohttp.BasicAuth(app_id, app_secret)
+
+    async def _fetch_privy_wallet(self, wallet_id: str) -> str:
+        app_id, auth = self._privy_credentials()
+        session = await self._http()
+        async with session.get(f"{PRIVY_API}/wallets/{wallet_id}", headers={"privy-app-id": app_id}, auth=auth) as response:
+            if response.status >= 400:
+                raise PrivyError(f"Privy API error: {response.status}, {await response.text()}")
+            data = await response.json()
+        address = data.get("address")
+        if not address:
+            raise PrivyError("Could not find wallet address in Privy response")
+        logger.info(f"Retrieved wallet address from Privy: {address}")
+        return address
+
+    async def sign_transaction_via_privy(self, tx: Dict, privy_wallet_id: Optional[str] = None) -> bytes:
+        """Sign through Privy's eth_signTransaction RPC; same payload as the sync connection"""
+        app_id, auth = self._privy_credentials()
+        privy_wallet_id = privy_wallet_id or os.getenv("PRIVY_WALLET_ID")
+        if not privy_wallet_id:
+            raise AsyncSonicConnectionError("Missing Privy configuration - need a wallet id")
+
+        url = f"{PRIVY_API}/wallets/{privy_wallet_id}/rpc"
+        payload = {"method": "eth_signTransaction", "params": {"transaction": to_privy_transaction(tx)}}
+        headers = {
+            "privy-app-id": app_id,
+            "Content-Type": "application/json",
+            "privy-authorization-signature": get_authorization_signer().sign("POST", url, payload, app_id)
+        }
+
+        session = await self._http()
+        async with session.post(url, json=payload, headers=headers, auth=auth) as response:
+            if response.status >= 400:
+                raise AsyncSonicConnectionError(f"Privy API error: {response.status}, {await response.text()}")
+            data = await response.json()
+
+        signed_tx = data.get("data", {}).get("signed_transaction")
+        if not signed_tx:
+            raise AsyncSonicConnectionError("No signed_transaction in Privy response")
+        return bytes.fromhex(signed_tx[2:] if signed_tx.startswith("0x") else signed_tx)
+
+    async def _sign_and_send(self, tx: Dict, wallet_address: str, privy_wallet_id: Optional[str] = None,
+                             kind: Optional[str] = None):
+        """Async twin of SonicConnection._sign_and_send, drawing nonces from the same manager"""
+        nonces = self._sonic._nonce_manager
+        w3 = await self.web3()
+        for attempt in range(2):
+            # reserve() may hit the node on first use or after a resync, so keep it off the loop
+            tx["nonce"] = await asyncio.to_thread(nonces.reserve, wallet_address)
+            signed_tx = None
+            try:
+                signed_tx = await self._sonic._signers.asign(tx, privy_wallet_id)
+                progress.report(progress.SIGNED, kind=kind, wallet=wallet_address, nonce=tx["nonce"])
+                tx_hash = await w3.eth.send_raw_transaction(signed_tx)
+            except Exception as e:
+                # An earlier broadcast of these bytes landed; re-signing on a new nonce would trade twice
+                if signed_tx is not None and is_already_known(e):
+                    tx_hash = HexBytes(keccak(signed_tx))
+                    logger.info(f"Transaction {tx_hash.hex()} already known to the node, treating it as sent")
+                    nonces.confirm(wallet_address, tx["nonce"], tx_hash.hex())
+                    return tx_hash
+                retry = await asyncio.to_thread(nonces.handle_error, wallet_address, tx["nonce"], e)
+                if retry and attempt == 0:
+                    logger.warning(f"Nonce {tx['nonce']} rejected ({e}), retrying with resynced nonce")
+                    continue
+                raise
+            nonces.confirm(wallet_address, tx["nonce"], tx_hash.hex())
+            return tx_hash
+
+    async def _send_tracked(self, kind: str, tx: Dict, wallet_address: str, privy_wallet_id: Optional[str] = None,
+                            decode=None, gas_key=None):
+        """Sign and send, then hand the transaction to the shared tracker (which fee-bumps it if stuck)"""
+        tx_hash = await self._sign_and_send(tx, wallet_address, privy_wallet_id, kind=kind)
+        sonic = self._sonic
+        broadcast = sonic._rpc_pool.accepted_by(tx_hash)
+        job = sonic._tracker.track(
+            kind, tx_hash, wallet_address, tx["nonce"],
+            decode=decode,
+            explorer_url=self._get_explorer_link(tx_hash.hex()),
+            replace=sonic._replacer(tx, wallet_address, privy_wallet_id) if sonic._auto_replace else None,
+            broadcast_via=broadcast["endpoint"] if broadcast else None,
+            observe=(lambda receipt: sonic._gas_cache.observe(gas_key, receipt)) if gas_key else None
+        )
+        sonic._report_broadcast(job)
+        return tx_hash, job
+
+    async def _fees(self, speed: Optional[str] = None) -> Tuple[int, int]:
+        """Fees from the connection's shared fee oracle; only a stale snapshot costs a thread hop"""
+        oracle = self._sonic._fee_oracle
+        fees = oracle.peek(speed)
+        if fees is None:
+            fees = await asyncio.to_thread(oracle.fees, speed)
+        return fees
+
+    async def get_balance(self, address: Optional[str] = None, token_address: Optional[str] = None,
+                          privy_wallet_id: Optional[str] = None) -> float:
+        target_address = address or await self._get_privy_wallet_address(privy_wallet_id)
+        w3 = await self.web3()
+        if token_address:
+            contract = w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+            balance, decimals = await asyncio.gather(
+                contract.functions.balanceOf(Web3.to_checksum_address(target_address)).call(),
+                self._token_decimals(token_address)
+            )
+            return balance / (10 ** decimals)
+        balance = await w3.eth.get_balance(Web3.to_checksum_address(target_address))
+        return Web3.from_wei(balance, "ether")
+
+    async def _get_swap_route(self, token_in: str, token_out: str, amount_in: float) -> Dict:
+        if self._is_native(token_in):
+            amount_raw = Web3.to_wei(amount_in, "ether")
+        else:
+            amount_raw = int(amount_in * (10 ** await self._token_decimals(token_in)))
+
+        params = {"tokenIn": token_in, "tokenOut": token_out, "amountIn": str(amount_raw), "gasInclude": "true"}
+        session = await self._http()
+        async with session.get(f"{self.aggregator_api}/routes", headers={"x-client-id": "ZerePyBot"}, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        if data.get("code") != 0:
+            raise AsyncSonicConnectionError(f"API error: {data.get('message')}")
+        return data["data"]
+
+    async def _get_encoded_swap_data(self, route_summary: Dict, wallet_address: str, slippage: float = 0.5) -> str:
+        payload = {
+            "routeSummary": route_summary,
+            "sender": wallet_address,
+            "recipient": wallet_address,
+            "slippageTolerance": int(slippage * 100),
+            "deadline": int(time.time() + 1200),
+            "source": "ZerePyBot"
+        }
+        session = await self._http()
+        async with session.post(f"{self.aggregator_api}/route/build", headers={"x-client-id": "zerepy"}, json=payload) as response:
+            if response.status >= 400:
+                logger.error(f"Route build failed with status {response.status}: {await response.text()}")
+                response.raise_for_status()
+            data = await response.json()
+        if data.get("code") != 0:
+            raise AsyncSonicConnectionError(f"API error: {data.get('message', 'Unknown API error')}")
+        return data["data"]["data"]
+
+    async def get_swap_quote(self, token_in: str, token_out: str, amount: float) -> str:
+        """Quote a swap and store its route in the connection's quote store. Returns JSON."""
+        quote = await self._sonic._quotes.aquote(
+            token_in, token_out, amount,
+            lambda: self._get_swap_route(token_in, token_out, amount)
+        )
+        summary = quote.route.get("routeSummary", {})
+        token_out_decimals = 18 if self._is_native(token_out) else await self._token_decimals(token_out)
+        return json.dumps({
+            "result": {
+                "quote_id": quote.quote_id,
+                "token_in": token_in,
+                "token_out": token_out,
+                "amountIn": amount,
+                "amountOut": float(summary.get("amountOut", 0)) / (10 ** token_out_decimals),
+                "priceImpact": summary.get("priceImpact", 0),
+                "routerAddress": quote.route.get("routerAddress"),
+                "expires_at": quote.expires_at
+            }
+        })
+
+    async def _handle_token_approval(self, token_address: str, spender_address: str, amount: int,
+                                     wallet_address: str, privy_wallet_id: Optional[str] = None,
+                                     current_allowance: Optional[int] = None,
+                                     fees: Optional[Tuple[int, int]] = None) -> Optional[str]:
+        """Send an approval if the allowance is short; never waits for it to be mined"""
+        w3 = await self.web3()
+        token_contract = w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+        spender_address = Web3.to_checksum_address(spender_address)
+        if current_allowance is None:
+            current_allowance = await token_contract.functions.allowance(wallet_address, spender_address).call()
+        if current_allowance >= amount:
+            return None
+
+        max_fee, max_priority_fee = fees or await self._fees()
+        data = token_contract.encodeABI("approve", [spender_address, amount])
+        approve_tx = {
+            "from": wallet_address,
+            "to": Web3.to_checksum_address(token_address),
+            "data": data,
+            "value": 0,
+            "chainId": self.chain_id,
+            "type": 2,
+            "maxFeePerGas": max_fee,
+            "maxPriorityFeePerGas": max_priority_fee
+        }
+        approve_tx["gas"] = await w3.eth.estimate_gas({"from": wallet_address, "to": approve_tx["to"], "data": data})
+        tx_hash, job = await self._send_tracked("approve", approve_tx, wallet_address, privy_wallet_id)
+        logger.info(f"Approval transaction sent: {self._get_explorer_link(tx_hash.hex())}")
+        return job.tx_hash
+
+    async def _route_for(self, token_in: str, token_out: str, amount: float, quote_id: Optional[str],
+                         taken: List[Quote]) -> Dict:
+        if quote_id:
+            quote = self._sonic._quotes.use(quote_id, token_in, token_out, amount)
+            taken.append(quote)
+            return quote.route
+        return await self._get_swap_route(token_in, token_out, amount)
+
+    async def swap(self, token_in: str, token_out: str, amount: float, slippage: float = 0.5,
+                   privy_wallet_id: Optional[str] = None, quote_id: Optional[str] = None,
+                   speed: Optional[str] = None) -> str:
+        taken = []  # the quote this swap executes, handed back if the swap is never sent
+        try:
+            w3 = await self.web3()
+            gas_cache = self._sonic._gas_cache
+            is_native = self._is_native(token_in)
+
+            async def check_balance(wallet_address):
+                current_balance = await self.get_balance(address=wallet_address, token_address=None if is_native else token_in)
+                if current_balance < amount:
+                    raise ValueError(f"Insufficient balance. Required: {amount}, Available: {current_balance}")
+                return current_balance
+
+            async def raw_amount():
+                if is_native:
+                    return Web3.to_wei(amount, "ether")
+                return int(amount * (10 ** await self._token_decimals(token_in)))
+
+            async def read_allowance(wallet_address, route_data):
+                if is_native:
+                    return None
+                token_contract = w3.eth.contract(address=Web3.to_checksum_address(token_in), abi=ERC20_ABI)
+                return await token_contract.functions.allowance(
+                    wallet_address, Web3.to_checksum_address(route_data["routerAddress"])
+                ).call()
+
+            async def estimate_gas(wallet_address, route_data, encoded_data, fees, allowance, amount_raw):
+                max_fee, max_priority_fee = fees
+                tx = {
+                    "from": wallet_address,
+                    "to": Web3.to_checksum_address(route_data["routerAddress"]),
+                    "data": encoded_data,
+                    "chainId": self.chain_id,
+                    "value": Web3.to_wei(amount, "ether") if is_native else 0,
+                    "type": 2,
+                    "maxFeePerGas": max_fee,
+                    "maxPriorityFeePerGas": max_priority_fee
+                }
+                if allowance is not None and allowance < amount_raw:
+                    # estimate_gas would revert until the approval is mined
+                    return tx, None
+                return tx, gas_cache.lookup(gas_cache.key(tx, token_in)) or await w3.eth.estimate_gas(tx)
+
+            preflight = Preflight("swap")
+            preflight.step("wallet", lambda: self._get_privy_wallet_address(privy_wallet_id))
+            preflight.step("route", lambda: self._route_for(token_in, token_out, amount, quote_id, taken))
+            preflight.step("fees", lambda: self._fees(speed))
+            preflight.step("amount", raw_amount)
+            preflight.step("balance", check_balance, "wallet")
+            preflight.step("build", lambda wallet_address, route_data: self._get_encoded_swap_data(
+                route_data["routeSummary"], wallet_address, slippage), "wallet", "route")
+            preflight.step("allowance", read_allowance, "wallet", "route")
+            preflight.step("estimate_gas", estimate_gas, "wallet", "route", "build", "fees", "allowance", "amount")
+            results = await preflight.arun()
+
+            wallet_address = results["wallet"]
+            route_data = results["route"]
+            tx, estimated_gas = results["estimate_gas"]
+            gas_key = gas_cache.key(tx, token_in)
+            progress.report(progress.ROUTED, kind="swap", wallet=wallet_address, router=route_data["routerAddress"],
+                            amount_out=route_data["routeSummary"].get("amountOut"))
+
+            approval_hash = None
+            if estimated_gas is None:
+                approval_hash = await preflight.ameasure("approve", self._handle_token_approval(
+                    token_in, route_data["routerAddress"], results["amount"], wallet_address, privy_wallet_id,
+                    current_allowance=results["allowance"], fees=results["fees"]
+                ))
+            progress.report(progress.APPROVED, kind="swap", wallet=wallet_address, approval_tx=approval_hash)
+            if approval_hash:
+                # estimate_gas would revert until the approval is mined: use what this call
+                # shape has used before, or else Kyber's estimate
+                tx["gas"] = self._sonic._gas_behind_approval(gas_key, int(route_data["routeSummary"].get("gas", 0) or 0))
+                logger.info(f"Approval {approval_hash} pending, using route gas limit: {tx['gas']}")
+            else:
+                tx["gas"] = int(estimated_gas * 1.2)
+
+            tx_hash, job = await preflight.ameasure("sign_and_send", self._send_tracked("swap", tx, wallet_address, privy_wallet_id,
+                                                                                     gas_key=gas_key))
+            logger.info(f"Transaction hash: {tx_hash.hex()}")
+            tx_link = self._get_explorer_link(tx_hash.hex())
+            return f"n🔄 Swap transaction sent: {tx_link}\n📋 Job: {job.job_id}\n{preflight.summary()}"
+
+        except Exception as e:
+            for quote in taken:
+                self._sonic._quotes.release(quote)
+            logger.error(f"Swap failed with detailed error: {str(e)}")
+            raise
+
+    async def get_sell_quote(self, token_address: str, token_amount: str) -> str:
+        try:
+            w3 = await self.web3()
+            decimals = await self._token_decimals(token_address)
+            token_amount_int = int(float(token_amount) * (10 ** decimals))
+            if token_amount_int <= 0:
+                return json.dumps({"error": True, "detail": "Invalid amount. Amount must be greater than zero."})
+
+            launchpad = w3.eth.contract(address=Web3.to_checksum_address(self._sonic.SFUN_LAUNCHPAD), abi=SFUN_LAUNCHPAD_ABI)
+            result = await launchpad.functions.calculateCurvedSellReturn(
+                Web3.to_checksum_address(token_address), token_amount_int
+            ).call()
+
+            result_readable = float(result) / (10 ** 18)
+            if result_readable <= 0.000001:
+                return json.dumps({
+                    "error": True,
+                    "detail": "Swap failed silently - amount too small or token has insufficient liquidity."
+                })
+
+            fee = result_readable * 0.005
+            estimated_output = result_readable - fee
+            min_output = estimated_output * 0.99
+
+            market_cap = 0
+            try:
+                total_supply = await asyncio.to_thread(
+                    self._sonic._tokens.total_supply, self._sonic._web3, self.chain_id, token_address
+                )
+                market_cap = total_supply / (10 ** decimals) * (estimated_output / float(token_amount))
+            except Exception as mc_error:
+                logger.warning(f"Could not calculate market cap: {str(mc_error)}")
+
+            return json.dumps({
+                "result": {
+                    "estimated_output": str(estimated_output),
+                    "min_output": str(min_output),
+                    "price_impact": "0.5",
+                    "fee": str(fee),
+                    "market_cap": str(market_cap),
+                }
+            })
+
+        except Exception as e:
+            logger.error(f"Failed to get sell quote: {str(e)}")
+            error_detail = str(e)
+            if "execution reverted" in error_detail:
+                error_detail = "Swap calculation failed - token may have trading restrictions or insufficient liquidity."
+            elif "gas required exceeds allowance" in error_detail:
+                error_detail = "Gas estimation failed - token may have complex transfer logic or restrictions."
+            return json.dumps({"error": True, "detail": f"Failed to get sell quote: {error_detail}"})
+
+    async def sell_token(self, token_address: str, token_amount: str, min_eth_out: str,
+                         privy_wallet_id: Optional[str] = None, wait: Optional[str] = None,
+                         speed: Optional[str] = None) -> str:
+        try:
+            w3 = await self.web3()
+            gas_cache = self._sonic._gas_cache
+            launchpad_address = Web3.to_checksum_address(self._sonic.SFUN_LAUNCHPAD)
+            launchpad = w3.eth.contract(address=launchpad_address, abi=SFUN_LAUNCHPAD_ABI)
+            token_contract = w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+            min_eth_out_int = int(float(min_eth_out) * (10 ** 18))
+
+            async def read_allowance(wallet_address):
+                try:
+                    return await token_contract.functions.allowance(wallet_address, launchpad_address).call()
+                except Exception as allowance_error:
+                    logger.warning(f"Could not check allowance: {str(allowance_error)}")
+                    return None
+
+            async def estimate_gas(wallet_address, decimals, fees, allowance):
+                max_fee, max_priority_fee = fees
+                token_amount_int = int(float(token_amount) * (10 ** decimals))
+                tx = {
+                    "from": wallet_address,
+                    "to": launchpad_address,
+                    "data": launchpad.encodeABI(fn_name="sell", args=[
+                        Web3.to_checksum_address(token_address), token_amount_int, min_eth_out_int
+                    ]),
+                    "value": 0,
+                    "chainId": self.chain_id,
+                    "type": 2,
+                    "maxFeePerGas": max_fee,
+                    "maxPriorityFeePerGas": max_priority_fee
+                }
+                # With an approval still needed the estimate would revert; the gas limit is set after it is sent
+                if allowance is not None and allowance < token_amount_int:
+                    return tx, None, None
+                try:
+                    return tx, gas_cache.lookup(gas_cache.key(tx, token_address)) or await w3.eth.estimate_gas(tx), None
+                except Exception as gas_error:
+                    return tx, None, gas_error
+
+            preflight = Preflight("sell_token")
+            preflight.step("wallet", lambda: self._get_privy_wallet_address(privy_wallet_id))
+            preflight.step("decimals", lambda: self._token_decimals(token_address))
+            preflight.step("fees", lambda: self._fees(speed))
+            preflight.step("balance", lambda wallet_address: token_contract.functions.balanceOf(wallet_address).call(), "wallet")
+            preflight.step("allowance", read_allowance, "wallet")
+            preflight.step("estimate_gas", estimate_gas, "wallet", "decimals", "fees", "allowance")
+            results = await preflight.arun()
+
+            wallet_address = results["wallet"]
+            decimals = results["decimals"]
+            token_balance = results["balance"]
+            token_amount_int = int(float(token_amount) * (10 ** decimals))
+            tx, estimated_gas, gas_error = results["estimate_gas"]
+
+            if token_balance < token_amount_int:
+                return json.dumps({
+                    "error": True,
+                    "detail": f"Insufficient token balance. You have {token_balance / (10 ** decimals)} tokens but are trying to sell {token_amount}."
+                })
+
+            progress.report(progress.ROUTED, kind="sell-token", wallet=wallet_address, router=launchpad_address)
+
+            approval_hash = None
+            allowed = results["allowance"]
+            if allowed is not None and allowed < token_amount_int:
+                try:
+                    approval_hash = await preflight.ameasure("approve", self._handle_token_approval(
+                        token_address, launchpad_address, token_amount_int, wallet_address, privy_wallet_id,
+                        current_allowance=allowed, fees=results["fees"]
+                    ))
+                except Exception as approval_error:
+                    logger.error(f"Automatic approval failed: {str(approval_error)}")
+                    return json.dumps({"error": True, "detail": f"Failed to automatically approve token: {str(approval_error)}"})
+
+            progress.report(progress.APPROVED, kind="sell-token", wallet=wallet_address, approval_tx=approval_hash)
+
+            gas_key = gas_cache.key(tx, token_address)
+            if approval_hash:
+                tx["gas"] = self._sonic._gas_behind_approval(gas_key)
+            else:
+                if gas_error is not None:
+                    logger.error(f"Gas estimation failed: {str(gas_error)}")
+                    return json.dumps({"error": True, "detail": f"Failed to estimate gas: {str(gas_error)}"})
+                tx["gas"] = int(estimated_gas * 1.2)
+
+            tx_hash, job = await preflight.ameasure("sign_and_send", self._send_tracked(
+                "sell-token", tx, wallet_address, privy_wallet_id,
+                decode=lambda receipt: {"amount_received": str(self._sonic._amount_received(receipt, wallet_address))},
+                gas_key=gas_key
+            ))
+            logger.info(f"Sell transaction sent: {tx_hash.hex()}")
+
+            if not self._sonic._wants_receipt(wait):
+                return self._sonic._pending_response(job)
+
+            receipt = await preflight.ameasure("receipt", self._sonic._tracker.wait_async(job))
+            tx_hash_hex = job.tx_hash
+
+            amount_received = 0
+            try:
+                amount_received = self._sonic._amount_received(receipt, wallet_address)
+            except Exception as receipt_error:
+                logger.warning(f"Could not extract amount received: {str(receipt_error)}")
+                amount_received = float(min_eth_out)
+
+            return json.dumps({
+                "result": {
+                    "transaction_hash": tx_hash_hex,
+                    "explorer_url": self._get_explorer_link(tx_hash_hex),
+                    "amount_received": str(amount_received),
+                    "status": "success",
+                    "timings": preflight.report()
+                }
+            })
+
+        except Exception as e:
+            logger.error(f"Sell transaction failed: {str(e)}")
+            error_detail = str(e)
+            if "execution reverted" in error_detail:
+                error_detail = "Transaction failed - token may have trading restrictions or insufficient liquidity."
+            elif "insufficient funds" in error_detail:
+                error_detail = "Insufficient funds for gas fee. Please ensure you have enough S for the network fee."
+            elif "transaction underpriced" in error_detail:
+                error_detail = "Transaction underpriced. Network is busy - please try again with higher gas price."
+            elif "nonce too low" in error_detail:
+                error_detail = "Transaction nonce issue. Please try again in a few moments."
+            return json.dumps({"error": True, "detail": f"Sell transaction failed: {error_detail}"})
+
+    async def create_token(self, name: str, symbol: str, initial_value: str,
+                           privy_wallet_id: Optional[str] = None, wait: Optional[str] = None,
+                           speed: Optional[str] = None) -> str:
+        try:
+            w3 = await self.web3()
+            initial_value_float = float(initial_value)
+            launchpad = w3.eth.contract(address=Web3.to_checksum_address(self._sonic.SFUN_LAUNCHPAD), abi=SFUN_LAUNCHPAD_ABI)
+
+            async def check_balance(wallet_address):
+                current_balance = await self.get_balance(address=wallet_address)
+                if current_balance < initial_value_float:
+                    raise ValueError(f"Insufficient balance. You have {current_balance} S but need at least {initial_value_float} S plus gas fees.")
+                return current_balance
+
+            async def estimate_gas(wallet_address, fees):
+                max_fee, max_priority_fee = fees
+                tx = {
+                    "from": wallet_address,
+                    "to": launchpad.address,
+                    "data": launchpad.encodeABI(fn_name="create", args=[name, symbol]),
+                    "chainId": self.chain_id,
+                    "value": Web3.to_wei(initial_value_float, "ether"),
+                    "type": 2,
+                    "maxFeePerGas": max_fee,
+                    "maxPriorityFeePerGas": max_priority_fee
+                }
+                try:
+                    gas_cache = self._sonic._gas_cache
+                    tx["gas"] = int((gas_cache.lookup(gas_cache.key(tx)) or await w3.eth.estimate_gas(tx)) * 1.2)
+                except Exception as e:
+                    raise ValueError(f"Failed to estimate gas: {str(e)}")
+                return tx
+
+            preflight = Preflight("create_token")
+            preflight.step("wallet", lambda: self._get_privy_wallet_address(privy_wallet_id))
+            preflight.step("fees", lambda: self._fees(speed))
+            preflight.step("balance", check_balance, "wallet")
+            preflight.step("estimate_gas", estimate_gas, "wallet", "fees")
+            results = await preflight.arun()
+            wallet_address = results["wallet"]
+            tx = results["estimate_gas"]
+
+            try:
+                tx_hash, job = await preflight.ameasure("sign_and_send", self._send_tracked(
+                    "create-token", tx, wallet_address, privy_wallet_id, decode=self._sonic._created_token,
+                    gas_key=self._sonic._gas_cache.key(tx)
+                ))
+            except Exception as e:
+                raise ValueError(f"Failed to send transaction: {str(e)}")
+            tx_link = self._get_explorer_link(tx_hash.hex())
+
+            if not self._sonic._wants_receipt(wait):
+                return self._sonic._pending_response(job)
+
+            try:
+                receipt = await preflight.ameasure("receipt", self._sonic._tracker.wait_async(job, timeout=120))
+                # A fee-bumped replacement may be the one that was mined
+                tx_link = self._get_explorer_link(job.tx_hash)
+                if receipt.status != 1:
+                    raise ValueError("Transaction failed on-chain. Check the transaction in the block explorer.")
+            except Exception as e:
+                logger.error(f"Error waiting for receipt: {str(e)}")
+                return f"⚠️ Token creation transaction sent but status unknown: {tx_link}"
+
+            try:
+                events = launchpad.events.TokenCreated().process_receipt(receipt)
+            except Exception as e:
+                logger.error(f"Error processing events: {str(e)}")
+                return f"⚠️ Transaction completed but error processing events: {tx_link}"
+            if not events:
+                logger.error("TokenCreated event not found in receipt")
+                return f"⚠️ Transaction completed but token creation event not found: {tx_link}"
+
+            new_token_address = events[0]["args"]["tokenAddress"]
+            token_explorer_link = f"{self.explorer}/token/{new_token_address}"
+            try:
+                token_balance = await self.get_balance(address=wallet_address, token_address=new_token_address)
+                return f"🪙 Token {symbol} created successfully!\n📝 Token Address: {new_token_address}\n💰 Initial Token Balance: {token_balance:,.2f} {symbol}\n🔍 Token Explorer: {token_explorer_link}\n⛓️ Transaction: {tx_link}\n{preflight.summary()}"
+            except Exception as e:
+                logger.error(f"Error getting token balance: {str(e)}")
+                return f"🪙 Token {symbol} created successfully!\n📝 Token Address: {new_token_address}\n🔍 Token Explorer: {token_explorer_link}\n⛓️ Transaction: {tx_link}\n{preflight.summary()}"
+
+        except Exception as e:
+            logger.error(f"Token creation failed: {str(e)}")
+            if "insufficient funds" in str(e).lower():
+                raise ValueError("Insufficient funds for token creation. Make sure you have enough S for the initial value plus gas fees.")
+            raise
+
+    def supports(self, action_name: str) -> bool:
+        return action_name in self.ACTIONS
+
+    async def perform_action(self, action_name: str, kwargs: Dict[str, Any]) -> Any:
+        """Validate against the sync connection's action definitions and await the async method"""
+        if not self.supports(action_name):
+            raise KeyError(f"Unknown async action: {action_name}")
+
+        load_dotenv()
+        errors = self._sonic.actions[action_name].validate_params(kwargs)
+        if errors:
+            raise ValueError(f"Invalid parameters: {', '.join(errors)}")
+
+        method = getattr(self, action_name.replace('-', '_'))
+        return await method(**kwargs)
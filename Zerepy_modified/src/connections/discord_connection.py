@@ -4,7 +4,7 @@ from typing import Dict, Any
 from dotenv import set_key, load_dotenv
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 from src.helpers import print_h_bar
-import requests
+from src.helpers.transport import get_transport
 import json
 
 logger = logging.getLogger("connections.discord_connection")
@@ -390,7 +390,7 @@ class DiscordConnection(BaseConnection):
             "Accept": "application/json",
             "Authorization": self._get_request_auth_token(),
         }
-        response = requests.request("PUT", url, headers=headers, data={})
+        response = get_transport().request("PUT", url, headers=headers, data={})
         if response.status_code != 204:
             raise DiscordAPIError(
                 f"Failed to called PUT to Discord: {response.status_code} - {response.text}"
@@ -405,7 +405,7 @@ class DiscordConnection(BaseConnection):
             "Accept": "application/json",
             "Authorization": self._get_request_auth_token(),
         }
-        response = requests.request("POST", url, headers=headers, data=payload)
+        response = get_transport().request("POST", url, headers=headers, data=payload)
         if response.status_code != 200:
             raise DiscordAPIError(
                 f"Failed to call POST to Discord: {response.status_code} - {response.text}"
@@ -420,7 +420,7 @@ class DiscordConnection(BaseConnection):
             "Authorization": self._get_request_auth_token(),
         }
         print(headers)
-        response = requests.request("GET", url, headers=headers, data={})
+        response = get_transport().request("GET", url, headers=headers, data={})
         if response.status_code != 200:
             raise DiscordAPIError(
                 f"Failed to call GET to Discord: {response.status_code} - {response.text}"
@@ -435,7 +435,7 @@ class DiscordConnection(BaseConnection):
         try:
             url = f"{self.base_url}/users/@me"
             headers = {"Accept": "application/json", "Authorization": f"Bot {api_key}"}
-            response = requests.request("GET", url, headers=headers, data={})
+            response = get_transport().request("GET", url, headers=headers, data={})
             if response.status_code != 200:
                 raise DiscordAPIError(
                     f"Failed to call GET to Discord: {response.status_code} - {response.text}"
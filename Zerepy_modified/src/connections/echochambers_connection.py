@@ -6,6 +6,7 @@ from collections import deque
 import requests
 from dotenv import load_dotenv
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.transport import get_transport
 
 logger = logging.getLogger("connections.echochambers_connection")
 
@@ -211,7 +212,7 @@ class EchochambersConnection(BaseConnection):
 
         for attempt in range(3):
             try:
-                response = requests.request(method, url, timeout=10, **kwargs)
+                response = get_transport().request(method, url, timeout=10, retries=0, **kwargs)
                 if response.status_code == 429:  # Rate limit
                     retry_after = int(response.headers.get('Retry-After', 60))
                     logger.warning(f"Rate limit hit, waiting {retry_after}s")
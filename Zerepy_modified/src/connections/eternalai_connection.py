@@ -6,7 +6,7 @@ from dotenv import load_dotenv, set_key
 from openai import OpenAI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 from web3 import Web3
-import requests
+from src.helpers.transport import get_transport
 
 logger = logging.getLogger("connections.eternalai_connection")
 IPFS = "ipfs://"
@@ -147,12 +147,12 @@ class EternalAIConnection(BaseConnection):
     def get_on_chain_system_prompt_content(on_chain_data: str) -> str:
         if IPFS in on_chain_data:
             light_house = on_chain_data.replace(IPFS, LIGHTHOUSE_IPFS)
-            response = requests.get(light_house)
+            response = get_transport().get(light_house)
             if response.status_code == 200:
                 return response.text
             else:
                 gcs = on_chain_data.replace(IPFS, GCS_ETERNAL_AI_BASE_URL)
-                response = requests.get(gcs)
+                response = get_transport().get(gcs)
                 if response.status_code == 200:
                     return response.text
                 else:
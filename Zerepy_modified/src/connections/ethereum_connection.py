@@ -1,13 +1,17 @@
 import logging
 import os
 import time
-import requests
+from src.helpers.transport import get_transport
 from typing import Dict, Any, Optional, Union
 from dotenv import load_dotenv, set_key
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from src.constants.networks import EVM_NETWORKS
 from src.constants.abi import ERC20_ABI
+from src.helpers.evm.token_metadata import get_token_registry
+from src.helpers.evm.read_cache import BlockReadCache, construct_read_cache_middleware
+from src.helpers.evm.rpc_batch import RpcBatcher
+from src.helpers.evm.rpc_pool import PooledHTTPProvider, pool_from_config
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 
 logger = logging.getLogger("connections.ethereum_connection")
@@ -30,9 +34,24 @@ class EthereumConnection(BaseConnection):
             
         self.scanner_url = EVM_NETWORKS[self.network]["scanner_url"]
         self.chain_id = EVM_NETWORKS[self.network]["chain_id"]
+        self._rpc_pool = pool_from_config(config, EVM_NETWORKS[self.network], self.rpc_url)
+        # Independent reads issued together go out as one JSON-RPC batch POST
+        self._batcher = RpcBatcher(
+            self._rpc_pool.send,
+            window=config.get("rpc_batch_window", 0.0),
+            batch_window=config.get("rpc_batch_max_wait", 0.005)
+        )
+        # Identical reads within one block are answered once; eth_chainId is read once, ever
+        self._read_cache = BlockReadCache(
+            lambda: self._web3.eth.block_number,
+            poll_interval=config.get("read_cache_poll_interval", 1.0),
+            max_entries=config.get("read_cache_size", 10000),
+            enabled=config.get("read_cache", True)
+        )
         
         super().__init__(config)
         self._initialize_web3()
+        self._tokens = get_token_registry(config.get("token_metadata_store", ".zerepy/token_metadata.sqlite"))
         
         # Kyberswap aggregator API for best swap routes
         self.aggregator_api = f"https://aggregator-api.kyberswap.com/{self.network}/api/v1"
@@ -41,13 +60,18 @@ class EthereumConnection(BaseConnection):
         """Generate block explorer link for transaction"""
         return f"https://{self.scanner_url}/tx/{tx_hash}"
 
+    def _token_decimals(self, token_address: str) -> int:
+        """Token decimals from the shared metadata registry (one RPC per token, ever)"""
+        return self._tokens.decimals(self._web3, self.chain_id, token_address)
+
     def _initialize_web3(self) -> None:
         """Initialize Web3 connection with retry logic"""
         if not self._web3:
             for attempt in range(3):
                 try:
-                    self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
+                    self._web3 = Web3(PooledHTTPProvider(self._rpc_pool, self._batcher))
                     self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+                    self._web3.middleware_onion.inject(construct_read_cache_middleware(self._read_cache), "read_cache", layer=0)
                     
                     if not self._web3.is_connected():
                         raise EthereumConnectionError("Failed to connect to Ethereum network")
@@ -202,7 +226,7 @@ class EthereumConnection(BaseConnection):
     def _get_token_address(self, ticker: str) -> Optional[str]:
         """Helper function to get token address from DEXScreener"""
         try:
-            response = requests.get(
+            response = get_transport().get(
                 f"https://api.dexscreener.com/latest/dex/search?q={ticker}"
             )
             response.raise_for_status()
@@ -259,8 +283,8 @@ class EthereumConnection(BaseConnection):
             balance = contract.functions.balanceOf(
                 Web3.to_checksum_address(address)
             ).call()
-            decimals = contract.functions.decimals().call()
-            return balanqce / (10 ** decimals)
+            decimals = self._token_decimals(token_address)
+            return balance / (10 ** decimals)
         else:
             # Get native ETH balance
             balance = self._web3.eth.get_balance(Web3.to_checksum_address(address))
@@ -298,8 +322,8 @@ class EthereumConnection(BaseConnection):
             )
             
             # Get token info
-            symbol = token_contract.functions.symbol().call()
-            decimals = token_contract.functions.decimals().call()
+            symbol = self._tokens.symbol(self._web3, self.chain_id, token_address)
+            decimals = self._token_decimals(token_address)
             
             # Get balance
             raw_balance = token_contract.functions.balanceOf(account.address).call()
@@ -308,7 +332,7 @@ class EthereumConnection(BaseConnection):
             # Try to get ETH value using Kyberswap price API
             try:
                 kyber_url = f"{self.aggregator_api}/tokens/rates"
-                response = requests.get(kyber_url, params={
+                response = get_transport().get(kyber_url, params={
                     "tokenIn": token_address, 
                     "tokenOut": self.NATIVE_TOKEN, 
                     "amount": str(raw_balance) 
@@ -339,9 +363,11 @@ class EthereumConnection(BaseConnection):
             private_key = os.getenv('ETH_PRIVATE_KEY')
             account = self._web3.eth.account.from_key(private_key)
             
-            # Get latest nonce and gas price
-            nonce = self._web3.eth.get_transaction_count(account.address)
-            gas_price = self._web3.eth.gas_price
+            # Get the pending nonce and gas price in one batch round trip
+            nonce, gas_price = self._batcher.gather(
+                lambda: self._web3.eth.get_transaction_count(account.address, "pending"),
+                lambda: self._web3.eth.gas_price
+            )
             
             if token_address and token_address.lower() != self.NATIVE_TOKEN.lower():
                 # Prepare ERC20 transfer
@@ -349,7 +375,7 @@ class EthereumConnection(BaseConnection):
                     address=Web3.to_checksum_address(token_address),
                     abi=ERC20_ABI
                 )
-                decimals = contract.functions.decimals().call()
+                decimals = self._token_decimals(token_address)
                 amount_raw = int(amount * (10 ** decimals))
                 
                 tx = contract.functions.transfer(
@@ -424,11 +450,7 @@ class EthereumConnection(BaseConnection):
             if token_in.lower() == self.NATIVE_TOKEN.lower():
                 amount_raw = self._web3.to_wei(amount, 'ether')
             else:
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_in),
-                    abi=ERC20_ABI
-                )
-                decimals = token_contract.functions.decimals().call()
+                decimals = self._token_decimals(token_in)
                 amount_raw = int(amount * (10 ** decimals))
             
             # Prepare API request
@@ -441,7 +463,7 @@ class EthereumConnection(BaseConnection):
                 "gasInclude": "true"
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = get_transport().get(url, headers=headers, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -479,7 +501,7 @@ class EthereumConnection(BaseConnection):
                 "source": "zerepy"
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = get_transport().post(url, headers=headers, json=payload)
             response.raise_for_status()
             
             data = response.json()
@@ -487,13 +509,17 @@ class EthereumConnection(BaseConnection):
                 raise ValueError(f"API error: {data.get('message')}")
                 
             # Prepare transaction parameters
+            nonce, gas_price = self._batcher.gather(
+                lambda: self._web3.eth.get_transaction_count(account.address, "pending"),
+                lambda: self._web3.eth.gas_price
+            )
             tx = {
                 'from': account.address,
                 'to': Web3.to_checksum_address(route_data["routerAddress"]),
                 'data': data["data"]["data"],
                 'value': self._web3.to_wei(amount, 'ether') if token_in.lower() == self.NATIVE_TOKEN.lower() else 0,
-                'nonce': self._web3.eth.get_transaction_count(account.address),
-                'gasPrice': self._web3.eth.gas_price,
+                'nonce': nonce,
+                'gasPrice': gas_price,
                 'chainId': self.chain_id
             }
             
@@ -527,11 +553,15 @@ class EthereumConnection(BaseConnection):
                     abi=ERC20_ABI
                 )
                 
-                # Check current allowance
-                current_allowance = token_contract.functions.allowance(
-                    account.address,
-                    spender_address
-                ).call()
+                # Check current allowance; nonce and gas price share its batch in case an approval is needed
+                current_allowance, nonce, gas_price = self._batcher.gather(
+                    lambda: token_contract.functions.allowance(
+                        account.address,
+                        spender_address
+                    ).call(),
+                    lambda: self._web3.eth.get_transaction_count(account.address, "pending"),
+                    lambda: self._web3.eth.gas_price
+                )
                 
                 if current_allowance < amount:
                     # Prepare approval transaction
@@ -540,8 +570,8 @@ class EthereumConnection(BaseConnection):
                         amount
                     ).build_transaction({
                         'from': account.address,
-                        'nonce': self._web3.eth.get_transaction_count(account.address),
-                        'gasPrice': self._web3.eth.gas_price,
+                        'nonce': nonce,
+                        'gasPrice': gas_price,
                         'chainId': self.chain_id
                     })
                     
@@ -604,11 +634,7 @@ class EthereumConnection(BaseConnection):
                 if token_in.lower() == "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2".lower():  # WETH
                     amount_raw = self._web3.to_wei(amount, 'ether')
                 else:
-                    token_contract = self._web3.eth.contract(
-                        address=Web3.to_checksum_address(token_in),
-                        abi=ERC20_ABI
-                    )
-                    decimals = token_contract.functions.decimals().call()
+                    decimals = self._token_decimals(token_in)
                     amount_raw = int(amount * (10 ** decimals))
                     
                 approval_hash = self._handle_token_approval(token_in, router_address, amount_raw)
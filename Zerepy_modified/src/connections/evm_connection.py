@@ -1,13 +1,19 @@
+import json
 import logging
 import os
 import time
-import requests
+from src.helpers.transport import get_transport
 from typing import Dict, Any, Optional, Union
 from dotenv import load_dotenv, set_key
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from src.constants.networks import EVM_NETWORKS
 from src.constants.abi import ERC20_ABI
+from src.helpers.evm.token_metadata import get_token_registry
+from src.helpers.evm.multicall import MulticallReader, read_balances
+from src.helpers.evm.read_cache import BlockReadCache, construct_read_cache_middleware
+from src.helpers.evm.rpc_batch import RpcBatcher
+from src.helpers.evm.rpc_pool import PooledHTTPProvider, pool_from_config
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 
 logger = logging.getLogger("connections.evm_connection")
@@ -34,11 +40,27 @@ class EVMConnection(BaseConnection):
         
         # Get RPC URL: either from the config override or from the network defaults
         self.rpc_url = config.get("rpc") or network_config["rpc_url"]
+        # Reads are spread over every configured endpoint; writes stick to the preferred ones
+        self._rpc_pool = pool_from_config(config, network_config, self.rpc_url)
+        self._batcher = RpcBatcher(
+            self._rpc_pool.send,
+            window=config.get("rpc_batch_window", 0.0),
+            batch_window=config.get("rpc_batch_max_wait", 0.005)
+        )
+        # Identical reads within one block are answered once; eth_chainId is read once, ever
+        self._read_cache = BlockReadCache(
+            lambda: self._web3.eth.block_number,
+            poll_interval=config.get("read_cache_poll_interval", 1.0),
+            max_entries=config.get("read_cache_size", 10000),
+            enabled=config.get("read_cache", True)
+        )
         self.scanner_url = network_config["scanner_url"]
         self.chain_id = network_config["chain_id"]
         
         super().__init__(config)
         self._initialize_web3()
+        self._tokens = get_token_registry(config.get("token_metadata_store", ".zerepy/token_metadata.sqlite"))
+        self._multicall = MulticallReader(self._web3)
         
         # Kyberswap aggregator API for best swap routes
         self.aggregator_api = f"https://aggregator-api.kyberswap.com/{self.network}/api/v1"
@@ -47,13 +69,18 @@ class EVMConnection(BaseConnection):
         """Generate block explorer link for transaction"""
         return f"https://{self.scanner_url}/tx/{tx_hash}"
 
+    def _token_decimals(self, token_address: str) -> int:
+        """Token decimals from the shared metadata registry (one RPC per token, ever)"""
+        return self._tokens.decimals(self._web3, self.chain_id, token_address)
+
     def _initialize_web3(self) -> None:
         """Initialize Web3 connection with retry logic"""
         if not self._web3:
             for attempt in range(3):
                 try:
-                    self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
+                    self._web3 = Web3(PooledHTTPProvider(self._rpc_pool, self._batcher))
                     self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+                    self._web3.middleware_onion.inject(construct_read_cache_middleware(self._read_cache), "read_cache", layer=0)
                     
                     if not self._web3.is_connected():
                         raise EthereumConnectionError("Failed to connect to Ethereum network")
@@ -100,6 +127,13 @@ class EVMConnection(BaseConnection):
                 ],
                 description="Get ETH or token balance"
             ),
+            "get-balances": Action(
+                name="get-balances",
+                parameters=[
+                    ActionParameter("token_addresses", True, str, "Comma-separated token addresses")
+                ],
+                description="Get native and token balances for your wallet in a single batched RPC call"
+            ),
             "transfer": Action(
                 name="transfer", 
                 parameters=[
@@ -123,6 +157,11 @@ class EVMConnection(BaseConnection):
                     ActionParameter("slippage", False, float, "Max slippage percentage (default 0.5%)")
                 ],
                 description="Swap tokens using Kyberswap aggregator"
+            ),
+            "get-rpc-metrics": Action(
+                name="get-rpc-metrics",
+                parameters=[],
+                description="Get latency, error and health counters for each RPC endpoint, plus batching and read cache counters"
             )
         }
 
@@ -202,10 +241,18 @@ class EVMConnection(BaseConnection):
         except Exception as e:
             return f"Failed to get address: {str(e)}"
 
+    def get_rpc_metrics(self) -> str:
+        """Return the RPC pool's per-endpoint counters as JSON"""
+        return json.dumps({"result": {
+            **self._rpc_pool.metrics(),
+            "batching": self._batcher.metrics(),
+            "read_cache": self._read_cache.metrics()
+        }})
+
     def _get_token_address(self, ticker: str) -> Optional[str]:
         """Helper function to get token address from DEXScreener"""
         try:
-            response = requests.get(f"https://api.dexscreener.com/latest/dex/search?q={ticker}")
+            response = get_transport().get(f"https://api.dexscreener.com/latest/dex/search?q={ticker}")
             response.raise_for_status()
             data = response.json()
             if not data.get('pairs'):
@@ -254,7 +301,7 @@ class EVMConnection(BaseConnection):
                 abi=ERC20_ABI
             )
             balance = contract.functions.balanceOf(Web3.to_checksum_address(address)).call()
-            decimals = contract.functions.decimals().call()
+            decimals = self._token_decimals(token_address)
             return balance / (10 ** decimals)
         else:
             balance = self._web3.eth.get_balance(Web3.to_checksum_address(address))
@@ -280,7 +327,7 @@ class EVMConnection(BaseConnection):
                 address=Web3.to_checksum_address(token_address), 
                 abi=ERC20_ABI 
             )
-            decimals = token_contract.functions.decimals().call()
+            decimals = self._token_decimals(token_address)
             raw_balance = token_contract.functions.balanceOf(account.address).call()
             token_balance = raw_balance / (10 ** decimals)
             return token_balance
@@ -288,20 +335,44 @@ class EVMConnection(BaseConnection):
         except Exception as e:
             return False
 
+    def get_balances(self, token_addresses: str) -> Dict[str, Any]:
+        """Native and token balances for the configured wallet through one Multicall3 read"""
+        try:
+            private_key = os.getenv('EVM_PRIVATE_KEY') or os.getenv('ETH_PRIVATE_KEY')
+            account = self._web3.eth.account.from_key(private_key)
+            tokens = [token.strip() for token in token_addresses.split(",") if token.strip()]
+            snapshot = read_balances(self._multicall, self._tokens, self.chain_id, [account.address], tokens)
+            balances = snapshot["balances"][account.address]
+            return {
+                "address": account.address,
+                "native": balances["native"],
+                "tokens": {
+                    snapshot["tokens"][token]["symbol"] or token: balances["tokens"].get(token)
+                    for token in tokens
+                },
+                "errors": snapshot["errors"]
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get balances: {str(e)}")
+            raise
+
     def _prepare_transfer_tx(self, to_address: str, amount: float, token_address: Optional[str] = None) -> Dict[str, Any]:
         """Prepare transfer transaction with proper gas estimation"""
         try:
             private_key = os.getenv('EVM_PRIVATE_KEY') or os.getenv('ETH_PRIVATE_KEY')
             account = self._web3.eth.account.from_key(private_key)
-            nonce = self._web3.eth.get_transaction_count(account.address)
-            gas_price = self._web3.eth.gas_price
+            nonce, gas_price = self._batcher.gather(
+                lambda: self._web3.eth.get_transaction_count(account.address, "pending"),
+                lambda: self._web3.eth.gas_price
+            )
             
             if token_address and token_address.lower() != self.NATIVE_TOKEN.lower():
                 contract = self._web3.eth.contract(
                     address=Web3.to_checksum_address(token_address),
                     abi=ERC20_ABI
                 )
-                decimals = contract.functions.decimals().call()
+                decimals = self._token_decimals(token_address)
                 amount_raw = int(amount * (10 ** decimals))
                 tx = contract.functions.transfer(
                     Web3.to_checksum_address(to_address),
@@ -352,11 +423,7 @@ class EVMConnection(BaseConnection):
             if token_in.lower() == self.NATIVE_TOKEN.lower():
                 amount_raw = self._web3.to_wei(amount, 'ether')
             else:
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_in),
-                    abi=ERC20_ABI
-                )
-                decimals = token_contract.functions.decimals().call()
+                decimals = self._token_decimals(token_in)
                 amount_raw = int(amount * (10 ** decimals))
             
             headers = {"x-client-id": "zerepy"}
@@ -367,7 +434,7 @@ class EVMConnection(BaseConnection):
                 "to": sender,
                 "gasInclude": "true"
             }
-            response = requests.get(url, headers=headers, params=params)
+            response = get_transport().get(url, headers=headers, params=params)
             response.raise_for_status()
             data = response.json()
             if data.get("code") != 0:
@@ -393,18 +460,22 @@ class EVMConnection(BaseConnection):
                 "deadline": int(time.time() + 1200),
                 "source": "zerepy"
             }
-            response = requests.post(url, headers=headers, json=payload)
+            response = get_transport().post(url, headers=headers, json=payload)
             response.raise_for_status()
             data = response.json()
             if data.get("code") != 0:
                 raise ValueError(f"API error: {data.get('message')}")
+            nonce, gas_price = self._batcher.gather(
+                lambda: self._web3.eth.get_transaction_count(account.address, "pending"),
+                lambda: self._web3.eth.gas_price
+            )
             tx = {
                 'from': account.address,
                 'to': Web3.to_checksum_address(route_data["routerAddress"]),
                 'data': data["data"]["data"],
                 'value': self._web3.to_wei(amount, 'ether') if token_in.lower() == self.NATIVE_TOKEN.lower() else 0,
-                'nonce': self._web3.eth.get_transaction_count(account.address),
-                'gasPrice': self._web3.eth.gas_price,
+                'nonce': nonce,
+                'gasPrice': gas_price,
                 'chainId': self.chain_id
             }
             try:
@@ -428,15 +499,20 @@ class EVMConnection(BaseConnection):
                 address=Web3.to_checksum_address(token_address),
                 abi=ERC20_ABI
             )
-            current_allowance = token_contract.functions.allowance(account.address, spender_address).call()
+            # The nonce and gas price ride along in the same batch in case an approval is needed
+            current_allowance, nonce, gas_price = self._batcher.gather(
+                lambda: token_contract.functions.allowance(account.address, spender_address).call(),
+                lambda: self._web3.eth.get_transaction_count(account.address, "pending"),
+                lambda: self._web3.eth.gas_price
+            )
             if current_allowance < amount:
                 approve_tx = token_contract.functions.approve(
                     spender_address,
                     amount
                 ).build_transaction({
                     'from': account.address,
-                    'nonce': self._web3.eth.get_transaction_count(account.address),
-                    'gasPrice': self._web3.eth.gas_price,
+                    'nonce': nonce,
+                    'gasPrice': gas_price,
                     'chainId': self.chain_id
                 })
                 try:
@@ -473,11 +549,7 @@ class EVMConnection(BaseConnection):
                 if token_in.lower() == "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2".lower():
                     amount_raw = self._web3.to_wei(amount, 'ether')
                 else:
-                    token_contract = self._web3.eth.contract(
-                        address=Web3.to_checksum_address(token_in),
-                        abi=ERC20_ABI
-                    )
-                    decimals = token_contract.functions.decimals().call()
+                    decimals = self._token_decimals(token_in)
                     amount_raw = int(amount * (10 ** decimals))
                 approval_hash = self._handle_token_approval(token_in, router_address, amount_raw)
                 if approval_hash:
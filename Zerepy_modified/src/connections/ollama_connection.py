@@ -1,5 +1,5 @@
 import logging
-import requests
+from src.helpers.transport import get_transport
 import json
 from typing import Dict, Any
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
@@ -79,7 +79,7 @@ class OllamaConnection(BaseConnection):
         """Test if Ollama is reachable"""
         try:
             url = f"{self.base_url}/v1/models"
-            response = requests.get(url)
+            response = get_transport().get(url)
             if response.status_code != 200:
                 raise OllamaAPIError(f"Failed to connect to Ollama: {response.status_code} - {response.text}")
         except Exception as e:
@@ -104,7 +104,7 @@ class OllamaConnection(BaseConnection):
                 "prompt": prompt,
                 "system": system_prompt,
             }
-            response = requests.post(url, json=payload, stream=True)
+            response = get_transport().post(url, json=payload, stream=True, timeout=(5, 300))
 
             if response.status_code != 200:
                 raise OllamaAPIError(f"API error: {response.status_code} - {response.text}")
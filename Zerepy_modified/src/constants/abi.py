@@ -60,6 +60,13 @@ ERC20_ABI = [
         "outputs": [{"name": "", "type": "uint8"}],
         "type": "function"
     },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "totalSupply",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "type": "function"
+    },
     {
         "constant": True,
         "inputs": [{"name": "_owner", "type": "address"}],
@@ -128,4 +135,97 @@ ERC20_ABI = [
         "name": "Transfer",
         "type": "event"
     }
-]
\ No newline at end of file
+]
+# Multicall3 is deployed at the same address on Sonic and the major EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# s.fun launchpad: create, sell, the bonding-curve sell quote and the TokenCreated event
+SFUN_LAUNCHPAD_ABI = [
+    {
+        "inputs": [
+            {"internalType": "string", "name": "name", "type": "string"},
+            {"internalType": "string", "name": "symbol", "type": "string"}
+        ],
+        "name": "create",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "tokenAddress", "type": "address"},
+            {"internalType": "uint256", "name": "tokenAmount", "type": "uint256"},
+            {"internalType": "uint256", "name": "minS", "type": "uint256"}
+        ],
+        "name": "sell",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "tokenAddress", "type": "address"},
+            {"internalType": "uint256", "name": "tokenAmount", "type": "uint256"}
+        ],
+        "name": "calculateCurvedSellReturn",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "tokenAddress", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "creator", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "name", "type": "string"},
+            {"indexed": False, "internalType": "string", "name": "symbol", "type": "string"}
+        ],
+        "name": "TokenCreated",
+        "type": "event"
+    }
+]
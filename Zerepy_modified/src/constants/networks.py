@@ -1,7 +1,17 @@
 SONIC_NETWORKS = {
     "mainnet": {
         "rpc_url": "https://rpc.soniclabs.com",
-        "scanner_url": "https://sonicscan.org"
+        # Extra read endpoints for the RPC pool; writes stay on rpc_url unless write_rpc_urls is set
+        "rpc_urls": [
+            "https://sonic-rpc.publicnode.com",
+            "https://rpc.ankr.com/sonic_mainnet"
+        ],
+        "scanner_url": "https://sonicscan.org",
+        # Default token list for batched balance reads (wS, USDC.e)
+        "tokens": [
+            "0x039e2fB66102314Ce7b64Ce5Ce3E5183bc94aD38",
+            "0x29219dd400f2Bf60E5a23d13Be72B486D4038894"
+        ]
     },
     "testnet": {
         "rpc_url": "https://rpc.blaze.soniclabs.com",
@@ -16,16 +26,19 @@ SONIC_NETWORKS = {
 EVM_NETWORKS = {
     "ethereum": {
         "rpc_url": "https://ethereum-rpc.publicnode.com",
+        "rpc_urls": ["https://eth.llamarpc.com", "https://rpc.ankr.com/eth"],
         "scanner_url": "etherscan.io",
         "chain_id": 1
     },
     "base": {
         "rpc_url": "https://mainnet.base.org",
+        "rpc_urls": ["https://base-rpc.publicnode.com", "https://base.llamarpc.com"],
         "scanner_url": "basescan.org",
         "chain_id": 8453
     },
     "polygon": {
         "rpc_url": "https://polygon-rpc.com",
+        "rpc_urls": ["https://polygon-bor-rpc.publicnode.com", "https://polygon.llamarpc.com"],
         "scanner_url": "polygonscan.com",
         "chain_id": 137
     }
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.helpers.evm.multicall import MulticallReader, read_balances
+
+logger = logging.getLogger("helpers.evm.balance_watcher")
+
+
+class BalanceWatcher:
+    """
+    One balance poller per connection for every wallet that has live subscribers.
+
+    Wallets are reference counted: the first watch() of an address adds it, the last
+    unwatch() drops it, and the poller thread sleeps while nothing is watched. On each
+    new block the native and token balances of all watched wallets are read in a single
+    multicall pinned to that block, so the RPC cost grows with blocks rather than with
+    subscribers, and a wallet watched by a hundred clients is read once. Listeners are
+    called with an update for each wallet whose balances changed (and for each wallet's
+    first read), carrying the per-asset deltas.
+    """
+
+    def __init__(self, web3, reader: MulticallReader, registry, chain_id: int,
+                 tokens: Sequence[str] = (), poll_interval: float = 1.0):
+        self._web3 = web3
+        self._reader = reader
+        self._registry = registry
+        self.chain_id = chain_id
+        self.tokens = list(tokens)
+        self.poll_interval = poll_interval
+        self._watched: Dict[str, int] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_block: Optional[int] = None
+        self.stats = {"heads": 0, "reads": 0, "updates": 0, "errors": 0}
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `listener(update)` on the poller thread for every balance change"""
+        self._listeners.append(listener)
+
+    def watch(self, address: str) -> None:
+        with self._lock:
+            self._watched[address] = self._watched.get(address, 0) + 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="balance-watcher", daemon=True)
+                self._thread.start()
+            # Read a newly watched wallet on the next pass rather than the next block
+            self._last_block = None
+        self._wakeup.set()
+
+    def unwatch(self, address: str) -> None:
+        with self._lock:
+            count = self._watched.get(address, 0) - 1
+            if count > 0:
+                self._watched[address] = count
+                return
+            self._watched.pop(address, None)
+            self._latest.pop(address, None)
+
+    def latest(self, address: str) -> Optional[Dict[str, Any]]:
+        """Last balances read for a watched wallet, for subscribers that join later"""
+        with self._lock:
+            return self._latest.get(address)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                addresses = list(self._watched)
+            if not addresses:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                self._poll(addresses)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Balance poll failed: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _poll(self, addresses: List[str]) -> None:
+        block = self._web3.eth.block_number
+        if block == self._last_block:
+            return
+        self._last_block = block
+        self.stats["heads"] += 1
+        snapshot = read_balances(self._reader, self._registry, self.chain_id, addresses, self.tokens,
+                                 block_identifier=block)
+        self.stats["reads"] += 1
+
+        updates = []
+        with self._lock:
+            for address in addresses:
+                if address not in self._watched:
+                    continue
+                held = snapshot["balances"][address]
+                previous = self._latest.get(address)
+                changes = self._changes(previous, held)
+                if previous is not None and not changes:
+                    continue
+                update = {"address": address, "block_number": block, "native": held["native"],
+                          "tokens": dict(held["tokens"]), "changes": changes}
+                self._latest[address] = update
+                updates.append(update)
+        for update in updates:
+            self.stats["updates"] += 1
+            for listener in self._listeners:
+                try:
+                    listener(update)
+                except Exception as e:
+                    logger.warning(f"Balance listener failed: {e}")
+
+    @staticmethod
+    def _changes(previous: Optional[Dict[str, Any]], held: Dict[str, Any]) -> Dict[str, float]:
+        """Delta per asset ("native" or token address) against the previous read"""
+        if previous is None:
+            return {}
+        changes = {}
+        assets = [("native", previous["native"], held["native"])]
+        assets += [(token, previous["tokens"].get(token), balance) for token, balance in held["tokens"].items()]
+        for asset, before, after in assets:
+            if before is not None and after is not None and after != before:
+                changes[asset] = after - before
+        return changes
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            watched = len(self._watched)
+            subscribers = sum(self._watched.values())
+        return {**self.stats, "wallets": watched, "subscribers": subscribers, "last_block": self._last_block}
@@ -0,0 +1,201 @@
+import logging
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("helpers.evm.fees")
+
+GWEI = 10 ** 9
+
+
+@dataclass(frozen=True)
+class FeeTier:
+    """A named speed: which reward percentile to tip at and how much base-fee headroom to allow"""
+    name: str
+    percentile: int
+    base_multiplier: float
+    min_priority_fee: int = 0
+
+
+DEFAULT_TIERS = {
+    "eco": FeeTier("eco", 10, 1.125),
+    "normal": FeeTier("normal", 50, 1.5),
+    "fast": FeeTier("fast", 90, 2.0, GWEI),
+}
+
+
+@dataclass
+class FeeSnapshot:
+    """Fee market as of `block_number`: the next block's base fee and typical tips per percentile"""
+    block_number: int
+    next_base_fee: int
+    rewards: Dict[int, int]
+    fetched_at: float = field(default_factory=time.time)
+
+
+def legacy_fees(base_fee: int) -> Tuple[int, int]:
+    """The previous fixed policy: twice the base fee plus a 1 gwei tip"""
+    return base_fee * 2 + GWEI, GWEI
+
+
+def snapshot_from_history(history: Dict[str, Any], percentiles: List[int]) -> FeeSnapshot:
+    """
+    Build a snapshot from an eth_feeHistory result. The tip for each percentile is the
+    median of that percentile over the non-empty blocks of the window, so one outlier
+    block does not set the price.
+    """
+    ratios = history["gasUsedRatio"]
+    rewards = history.get("reward") or []
+    tips = {}
+    for column, percentile in enumerate(percentiles):
+        samples = [
+            int(block_rewards[column])
+            for block_rewards, ratio in zip(rewards, ratios)
+            if ratio > 0 and len(block_rewards) > column
+        ]
+        tips[percentile] = int(statistics.median(samples)) if samples else 0
+    return FeeSnapshot(
+        block_number=int(history["oldestBlock"]) + len(ratios) - 1,
+        # feeHistory returns one more base fee than blocks: the one for the next block
+        next_base_fee=int(history["baseFeePerGas"][-1]),
+        rewards=tips
+    )
+
+
+def suggest(snapshot: FeeSnapshot, tier: FeeTier) -> Tuple[int, int]:
+    """(max_fee, max_priority_fee) for `tier` under `snapshot`"""
+    max_priority_fee = max(snapshot.rewards.get(tier.percentile, 0), tier.min_priority_fee)
+    max_fee = int(snapshot.next_base_fee * tier.base_multiplier) + max_priority_fee
+    return max_fee, max_priority_fee
+
+
+def bump_fees(max_fee: int, max_priority_fee: int, factor: float = 1.125,
+              floor: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+    """
+    Fees for a replacement of a pending transaction. Nodes only accept a replacement
+    whose max fee and tip both beat the original by their price bump (10% in geth), so
+    both are raised by `factor` and then to `floor` (usually the oracle's current fast
+    tier) if that is higher.
+    """
+    new_priority_fee = -(-max_priority_fee * int(factor * 1000) // 1000)
+    new_max_fee = -(-max_fee * int(factor * 1000) // 1000)
+    if floor is not None:
+        new_max_fee = max(new_max_fee, floor[0])
+        new_priority_fee = max(new_priority_fee, floor[1])
+    # A zero tip stays zero under a multiplier; the node still wants it raised
+    new_priority_fee = max(new_priority_fee, max_priority_fee + 1)
+    return max(new_max_fee, new_priority_fee), new_priority_fee
+
+
+class FeeOracle:
+    """
+    EIP-1559 fee suggestions for one chain connection, shared by all of its write actions.
+
+    The oracle reads eth_feeHistory for the last `history_blocks` blocks with the reward
+    percentiles of its tiers and keeps the result until the chain moves past the block it
+    was read at, so a burst of transactions costs one fee read per block instead of one
+    per transaction. `head` returns the current head block without reading the node (the
+    connection's read cache follows it), or None when unknown; the snapshot then falls
+    back to a `max_age` in seconds. Callers pick a tier by name (eco, normal, fast); nodes
+    without eth_feeHistory fall back to the latest block's base fee and the previous fixed
+    policy.
+    """
+
+    def __init__(self, web3, tiers: Optional[Dict[str, FeeTier]] = None, default_speed: str = "normal",
+                 history_blocks: int = 10, max_age: float = 1.0, head: Optional[Callable[[], Optional[int]]] = None):
+        self._web3 = web3
+        self.tiers = dict(tiers or DEFAULT_TIERS)
+        if default_speed not in self.tiers:
+            raise ValueError(f"Unknown fee speed '{default_speed}'. Must be one of: {', '.join(self.tiers)}")
+        self.default_speed = default_speed
+        self.history_blocks = history_blocks
+        self.max_age = max_age
+        self._head = head
+        self._percentiles = sorted({tier.percentile for tier in self.tiers.values()})
+        self._snapshot: Optional[FeeSnapshot] = None
+        self._legacy = False
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "refreshes": 0, "fallbacks": 0}
+
+    def tier(self, speed: Optional[str] = None) -> FeeTier:
+        speed = (speed or self.default_speed).lower()
+        if speed not in self.tiers:
+            raise ValueError(f"Unknown fee speed '{speed}'. Must be one of: {', '.join(self.tiers)}")
+        return self.tiers[speed]
+
+    def _fresh(self) -> Optional[FeeSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        head = self._head() if self._head is not None else None
+        if head is not None:
+            return snapshot if snapshot.block_number >= head else None
+        if time.time() - snapshot.fetched_at < self.max_age:
+            return snapshot
+        return None
+
+    def _fetch(self) -> FeeSnapshot:
+        try:
+            history = self._web3.eth.fee_history(self.history_blocks, "latest", self._percentiles)
+            self._legacy = False
+            return snapshot_from_history(history, self._percentiles)
+        except Exception as e:
+            logger.debug(f"eth_feeHistory unavailable ({e}), using the latest block's base fee")
+            self.stats["fallbacks"] += 1
+            latest_block = self._web3.eth.get_block("latest")
+            base_fee = latest_block.get("baseFeePerGas")
+            if base_fee is None:
+                base_fee = self._web3.eth.gas_price
+            self._legacy = True
+            return FeeSnapshot(latest_block["number"], base_fee, {})
+
+    def snapshot(self) -> FeeSnapshot:
+        """The current snapshot, refreshed at most once per block however many callers ask"""
+        snapshot = self._fresh()
+        if snapshot:
+            self.stats["hits"] += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._fresh()
+            if snapshot:
+                self.stats["hits"] += 1
+                return snapshot
+            self._snapshot = self._fetch()
+            self.stats["refreshes"] += 1
+            return self._snapshot
+
+    def _suggest(self, snapshot: FeeSnapshot, speed: Optional[str]) -> Tuple[int, int]:
+        tier = self.tier(speed)
+        if self._legacy:
+            return legacy_fees(snapshot.next_base_fee)
+        return suggest(snapshot, tier)
+
+    def peek(self, speed: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """Fees from a fresh cached snapshot, or None when reading them would need an RPC call"""
+        snapshot = self._fresh()
+        if snapshot is None:
+            return None
+        self.stats["hits"] += 1
+        return self._suggest(snapshot, speed)
+
+    def fees(self, speed: Optional[str] = None) -> Tuple[int, int]:
+        """(max_fee, max_priority_fee) for the named speed, or the default speed"""
+        return self._suggest(self.snapshot(), speed)
+
+    def describe(self) -> Dict[str, Any]:
+        """Every tier's current fees, for display"""
+        snapshot = self.snapshot()
+        tiers = {}
+        for name in self.tiers:
+            max_fee, max_priority_fee = self._suggest(snapshot, name)
+            tiers[name] = {"max_fee_per_gas": max_fee, "max_priority_fee_per_gas": max_priority_fee}
+        return {
+            "block_number": snapshot.block_number,
+            "next_base_fee": snapshot.next_base_fee,
+            "default": self.default_speed,
+            "tiers": tiers,
+            "stats": dict(self.stats)
+        }
+
@@ -0,0 +1,155 @@
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger("helpers.evm.gas_cache")
+
+GasKey = Tuple[str, str, Optional[str]]
+
+# ERC-20 approve and transfer: their cost depends on whether a storage slot goes from zero
+# to non-zero (a first allowance, a recipient's first balance), which the call shape
+# doesn't show, so a learned figure can fall ~17k gas short. These are always estimated.
+UNCACHEABLE_SELECTORS = frozenset({"0x095ea7b3", "0xa9059cbb"})
+
+
+class GasLimitCache:
+    """
+    Learned gas figures per call shape, so stable writes can skip eth_estimateGas.
+
+    A call shape is (to, 4-byte selector, token). Every receipt of a transaction sent
+    with a key adds its gasUsed to that key's rolling window of the last `window`
+    samples. lookup() answers with the `percentile` of the window once it holds at least
+    `min_samples` samples that agree with each other (the percentile is no more than
+    `max_spread` above the median); callers add their usual buffer on top, as they do to
+    an estimate. Shapes whose cost depends on the input, like aggregator routes, never
+    settle and keep being estimated, and ERC-20 approve and transfer get no key at all
+    (see UNCACHEABLE_SELECTORS). A reverted transaction drops its key's samples, so
+    the next call estimates again. With `store_path` the windows survive restarts.
+    """
+
+    def __init__(self, window: int = 50, percentile: float = 95, min_samples: int = 5,
+                 max_spread: float = 0.25, store_path: Optional[str] = None, enabled: bool = True):
+        self.window = window
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_spread = max_spread
+        self.store_path = store_path
+        self.enabled = enabled
+        self._samples: Dict[GasKey, Deque[int]] = {}
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "uncacheable": 0, "observed": 0, "invalidated": 0}
+        self._load()
+
+    @staticmethod
+    def key(tx: Dict[str, Any], token: Optional[str] = None) -> Optional[GasKey]:
+        """
+        Call shape of a transaction dict: its target, function selector and the token
+        involved. None for calls whose gas must always be estimated.
+        """
+        data = tx.get("data") or "0x"
+        if isinstance(data, (bytes, bytearray)):
+            data = "0x" + data.hex()
+        selector = data[:10].lower()
+        if selector in UNCACHEABLE_SELECTORS:
+            return None
+        return str(tx.get("to", "")).lower(), selector, token.lower() if token else None
+
+    def _high(self, samples) -> Optional[int]:
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        high = ordered[max(0, math.ceil(len(ordered) * self.percentile / 100) - 1)]
+        median = ordered[len(ordered) // 2]
+        if high > median * (1 + self.max_spread):
+            return None
+        return high
+
+    def lookup(self, key: Optional[GasKey]) -> Optional[int]:
+        """The learned gas figure for `key`, or None when the caller should estimate"""
+        if not self.enabled:
+            return None
+        if key is None:
+            self.stats["uncacheable"] += 1
+            return None
+        with self._lock:
+            samples = self._samples.get(key)
+            gas = self._high(samples) if samples else None
+            self.stats["hits" if gas is not None else "misses"] += 1
+        if gas is not None:
+            logger.debug(f"Gas for {key} from cache: {gas}")
+        return gas
+
+    def observe(self, key: Optional[GasKey], receipt) -> None:
+        """Learn from a receipt; reverted transactions invalidate the key instead"""
+        if key is None:
+            return
+        if receipt.get("status") != 1:
+            self.invalidate(key)
+            return
+        gas_used = receipt.get("gasUsed")
+        if not gas_used:
+            return
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(int(gas_used))
+            self.stats["observed"] += 1
+        self._save()
+
+    def invalidate(self, key: GasKey) -> None:
+        with self._lock:
+            if self._samples.pop(key, None) is None:
+                return
+            self.stats["invalidated"] += 1
+        logger.info(f"Reverted transaction for {key}, gas will be estimated again")
+        self._save()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            confident = sum(1 for samples in self._samples.values() if self._high(samples) is not None)
+            stats["keys"] = len(self._samples)
+        lookups = stats["hits"] + stats["misses"]
+        stats["confident_keys"] = confident
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats["enabled"] = self.enabled
+        return stats
+
+    def _save(self) -> None:
+        if not self.store_path:
+            return
+        with self._lock:
+            snapshot = [[list(key), list(samples)] for key, samples in self._samples.items()]
+        try:
+            with self._store_lock:
+                directory = os.path.dirname(self.store_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.store_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            logger.warning(f"Could not persist gas samples: {e}")
+
+    def _load(self) -> None:
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load gas samples: {e}")
+            return
+        for key, samples in snapshot:
+            # Learned before these selectors were excluded
+            if key[1] in UNCACHEABLE_SELECTORS:
+                continue
+            self._samples[tuple(key)] = deque((int(gas) for gas in samples), maxlen=self.window)
+        logger.info(f"Restored gas samples for {len(self._samples)} call shape(s)")
@@ -0,0 +1,224 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence, Union
+
+import requests
+from eth_abi import decode, encode
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+
+from src.constants.abi import MULTICALL3_ABI, MULTICALL3_ADDRESS
+
+logger = logging.getLogger("helpers.evm.multicall")
+
+# Rough per-call gas used by a simple view function inside aggregate3
+DEFAULT_CALL_GAS = 30_000
+# ABI overhead of one Call3 tuple on top of its calldata (offsets, address, bool, length)
+CALL3_OVERHEAD_BYTES = 160
+# Node error messages meaning the eth_call ran and failed, as opposed to not being served
+EXECUTION_ERROR_MARKERS = ("revert", "out of gas", "gas required exceeds", "execution", "invalid opcode",
+                           "stack", "invalid jump")
+
+
+def is_execution_error(error: Exception) -> bool:
+    """Whether a failed eth_call was executed and failed, so splitting the batch can help"""
+    if isinstance(error, requests.RequestException):
+        return False
+    if isinstance(error, (ContractLogicError, BadFunctionCallOutput)):
+        return True
+    # web3 raises other JSON-RPC errors as ValueError({"code", "message"})
+    if isinstance(error, ValueError):
+        message = str(error.args[0].get("message", "") if error.args and isinstance(error.args[0], dict)
+                      else error).lower()
+        return any(marker in message for marker in EXECUTION_ERROR_MARKERS)
+    return False
+
+
+@dataclass
+class Call:
+    """A single view call to batch through Multicall3"""
+    target: str
+    signature: str
+    args: Sequence[Any] = ()
+    output_types: Sequence[str] = ("uint256",)
+    gas: int = DEFAULT_CALL_GAS
+    label: Any = None
+    calldata: bytes = field(init=False, default=b"")
+
+    def __post_init__(self):
+        self.target = Web3.to_checksum_address(self.target)
+        selector = Web3.keccak(text=self.signature)[:4]
+        arg_types = self.signature[self.signature.index("(") + 1:-1]
+        types = [t for t in arg_types.split(",") if t]
+        self.calldata = selector + (encode(types, list(self.args)) if types else b"")
+
+
+@dataclass
+class CallResult:
+    success: bool
+    value: Any = None
+    error: Optional[str] = None
+    label: Any = None
+
+
+class MulticallReader:
+    """
+    Batches view calls into Multicall3 aggregate3 eth_calls.
+
+    Calls are chunked so no single eth_call exceeds `max_gas` or `max_calldata_bytes`,
+    every call is sent with allowFailure so a revert only affects that call, and a
+    chunk whose eth_call reverts or runs out of gas as a whole is bisected until the bad
+    call is isolated. Transport and other node errors are raised as they are, since
+    splitting the chunk would only multiply the failing requests.
+    """
+
+    def __init__(self, web3: Web3, address: str = MULTICALL3_ADDRESS,
+                 max_gas: int = 25_000_000, max_calldata_bytes: int = 96_000, max_calls: int = 500):
+        self._web3 = web3
+        self.address = Web3.to_checksum_address(address)
+        self.max_gas = max_gas
+        self.max_calldata_bytes = max_calldata_bytes
+        self.max_calls = max_calls
+        self._contract = web3.eth.contract(address=self.address, abi=MULTICALL3_ABI)
+        self.stats = {"batches": 0, "calls": 0, "failed_calls": 0, "bisections": 0}
+
+    # Call builders for the common reads
+    @staticmethod
+    def erc20_balance(token: str, owner: str, label: Any = None) -> Call:
+        return Call(token, "balanceOf(address)", [Web3.to_checksum_address(owner)], label=label)
+
+    @staticmethod
+    def erc20_allowance(token: str, owner: str, spender: str, label: Any = None) -> Call:
+        return Call(
+            token, "allowance(address,address)",
+            [Web3.to_checksum_address(owner), Web3.to_checksum_address(spender)], label=label
+        )
+
+    @staticmethod
+    def erc20_decimals(token: str, label: Any = None) -> Call:
+        return Call(token, "decimals()", output_types=("uint8",), label=label)
+
+    @staticmethod
+    def erc20_symbol(token: str, label: Any = None) -> Call:
+        return Call(token, "symbol()", output_types=("string",), label=label)
+
+    @staticmethod
+    def erc20_total_supply(token: str, label: Any = None) -> Call:
+        return Call(token, "totalSupply()", label=label)
+
+    def native_balance(self, owner: str, label: Any = None) -> Call:
+        return Call(self.address, "getEthBalance(address)", [Web3.to_checksum_address(owner)], label=label)
+
+    def _chunks(self, calls: List[Call]) -> List[List[Call]]:
+        chunks, current, gas, size = [], [], 0, 0
+        for call in calls:
+            call_size = len(call.calldata) + CALL3_OVERHEAD_BYTES
+            if current and (
+                gas + call.gas > self.max_gas
+                or size + call_size > self.max_calldata_bytes
+                or len(current) >= self.max_calls
+            ):
+                chunks.append(current)
+                current, gas, size = [], 0, 0
+            current.append(call)
+            gas += call.gas
+            size += call_size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _decode(self, call: Call, success: bool, data: bytes) -> CallResult:
+        if not success:
+            return CallResult(False, error="call reverted", label=call.label)
+        try:
+            values = decode(list(call.output_types), data)
+        except Exception as e:
+            return CallResult(False, error=f"could not decode result: {e}", label=call.label)
+        return CallResult(True, values[0] if len(values) == 1 else values, label=call.label)
+
+    def _execute_chunk(self, chunk: List[Call], block_identifier) -> List[CallResult]:
+        self.stats["batches"] += 1
+        try:
+            raw = self._contract.functions.aggregate3(
+                [(call.target, True, call.calldata) for call in chunk]
+            ).call(block_identifier=block_identifier)
+        except Exception as e:
+            if not is_execution_error(e):
+                raise
+            if len(chunk) == 1:
+                return [CallResult(False, error=str(e), label=chunk[0].label)]
+            # Something in this chunk breaks the whole eth_call; split it to isolate the call
+            self.stats["bisections"] += 1
+            middle = len(chunk) // 2
+            return (
+                self._execute_chunk(chunk[:middle], block_identifier)
+                + self._execute_chunk(chunk[middle:], block_identifier)
+            )
+        return [self._decode(call, success, data) for call, (success, data) in zip(chunk, raw)]
+
+    def execute(self, calls: List[Call], block_identifier: Union[str, int] = "latest") -> List[CallResult]:
+        """Run the calls and return their results in the same order"""
+        results: List[CallResult] = []
+        for chunk in self._chunks(calls):
+            results.extend(self._execute_chunk(chunk, block_identifier))
+        self.stats["calls"] += len(calls)
+        self.stats["failed_calls"] += sum(1 for result in results if not result.success)
+        return results
+
+
+def read_balances(reader: MulticallReader, registry, chain_id: int, owners: Sequence[str],
+                  tokens: Sequence[str], block_identifier: Union[str, int] = "latest") -> dict:
+    """
+    Native and ERC-20 balances for several wallets in one batched read.
+
+    Decimals and symbols missing from the token metadata registry are read in the same
+    batch and recorded there. Returns {"balances": {owner: {"native": float, "tokens":
+    {token: float}}}, "tokens": {token: {"symbol", "decimals"}}, "errors": [...]};
+    tokens whose balance could not be read are reported in "errors" instead.
+    """
+    calls = []
+    for owner in owners:
+        calls.append(reader.native_balance(owner, label=("native", owner, None)))
+        for token in tokens:
+            calls.append(reader.erc20_balance(token, owner, label=("balance", owner, token)))
+    for token in tokens:
+        known = registry.peek(chain_id, token)
+        if not known or known.decimals is None:
+            calls.append(reader.erc20_decimals(token, label=("decimals", None, token)))
+        if not known or known.symbol is None:
+            calls.append(reader.erc20_symbol(token, label=("symbol", None, token)))
+
+    results = reader.execute(calls, block_identifier=block_identifier)
+
+    errors = []
+    for result in results:
+        kind, _, token = result.label
+        if kind == "decimals" and result.success:
+            registry.put(chain_id, token, decimals=result.value)
+        elif kind == "symbol" and result.success:
+            registry.put(chain_id, token, symbol=result.value)
+
+    metadata = {}
+    for token in tokens:
+        known = registry.peek(chain_id, token)
+        metadata[token] = {
+            "symbol": known.symbol if known else None,
+            "decimals": known.decimals if known else None,
+        }
+
+    balances = {owner: {"native": None, "tokens": {}} for owner in owners}
+    for result in results:
+        kind, owner, token = result.label
+        if kind == "native":
+            if result.success:
+                balances[owner]["native"] = result.value / 10 ** 18
+            else:
+                errors.append({"owner": owner, "token": "native", "error": result.error})
+        elif kind == "balance":
+            decimals = metadata[token]["decimals"]
+            if result.success and decimals is not None:
+                balances[owner]["tokens"][token] = result.value / 10 ** decimals
+            else:
+                errors.append({"owner": owner, "token": token, "error": result.error or "unknown decimals"})
+
+    return {"balances": balances, "tokens": metadata, "errors": errors}
@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("helpers.evm.nonce")
+
+NONCE_ERROR_MARKERS = (
+    "nonce too low",
+    "nonce too high",
+    "replacement transaction underpriced",
+)
+
+# The node already holds these exact signed bytes: an earlier broadcast of them landed
+ALREADY_KNOWN_MARKERS = (
+    "already known",
+    "known transaction",
+    "already imported",
+)
+
+
+def is_already_known(error: Exception) -> bool:
+    """
+    Whether a send failed only because the node already has the transaction. That is a
+    success, and the hash is keccak of the signed bytes; re-signing the same payload on
+    another nonce would broadcast the trade twice.
+    """
+    message = str(error).lower()
+    return any(marker in message for marker in ALREADY_KNOWN_MARKERS)
+
+
+class _WalletNonces:
+    """Nonce bookkeeping for a single wallet"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_nonce: Optional[int] = None
+        # nonce -> {"reserved_at": float, "tx_hash": Optional[str]}
+        self.in_flight: Dict[int, Dict[str, Any]] = {}
+        # Nonces handed back before broadcast; reused lowest-first so no gap is left behind
+        self.released: List[int] = []
+        self.last_sync = 0.0
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces per wallet locally so several transactions from the
+    same wallet can be signed and broadcast back to back.
+
+    The chain is only asked for the pending transaction count when a wallet is first
+    seen, after it has been idle for `idle_resync` seconds, when a send fails with a
+    nonce error, or when an in-flight transaction looks dropped.
+    """
+
+    def __init__(self, web3, store_path: Optional[str] = None,
+                 idle_resync: float = 60.0, drop_timeout: float = 180.0):
+        self._web3 = web3
+        self.store_path = store_path
+        self.idle_resync = idle_resync
+        self.drop_timeout = drop_timeout
+        self._wallets: Dict[str, _WalletNonces] = {}
+        self._wallets_lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._metrics = {
+            "reservations": 0,
+            "confirmed": 0,
+            "released": 0,
+            "gaps": 0,
+            "gaps_filled": 0,
+            "resyncs": 0,
+            "dropped": 0,
+        }
+        self._load()
+
+    def _wallet(self, address: str) -> _WalletNonces:
+        key = address.lower()
+        with self._wallets_lock:
+            if key not in self._wallets:
+                self._wallets[key] = _WalletNonces()
+            return self._wallets[key]
+
+    def _chain_nonce(self, address: str) -> int:
+        return self._web3.eth.get_transaction_count(self._web3.to_checksum_address(address), "pending")
+
+    def _resync(self, address: str, state: _WalletNonces, reason: str) -> None:
+        """Reset the local counter from the chain. Caller must hold state.lock."""
+        chain_nonce = self._chain_nonce(address)
+        # Anything below the chain's pending count has been accepted by the node
+        for nonce in [n for n in state.in_flight if n < chain_nonce]:
+            del state.in_flight[nonce]
+        state.released = [n for n in state.released if n >= chain_nonce]
+        broadcast = [n for n, entry in state.in_flight.items() if entry.get("tx_hash")]
+        state.next_nonce = max([chain_nonce] + [n + 1 for n in broadcast])
+        state.last_sync = time.time()
+        self._metrics["resyncs"] += 1
+        logger.debug(f"Nonce resync for {address} ({reason}): next nonce {state.next_nonce}")
+
+    def _check_dropped(self, address: str, state: _WalletNonces) -> None:
+        """Resync if a broadcast transaction has been pending for longer than drop_timeout"""
+        now = time.time()
+        stale = [
+            n for n, entry in state.in_flight.items()
+            if entry.get("tx_hash") and now - entry["reserved_at"] > self.drop_timeout
+        ]
+        if not stale:
+            return
+        chain_nonce = self._chain_nonce(address)
+        dropped = [n for n in stale if n >= chain_nonce]
+        if dropped:
+            logger.warning(f"Transactions with nonces {sorted(dropped)} for {address} look dropped, resyncing")
+            self._metrics["dropped"] += len(dropped)
+            for nonce in dropped:
+                del state.in_flight[nonce]
+        self._resync(address, state, "drop check")
+
+    def reserve(self, address: str) -> int:
+        """Reserve the next nonce for a wallet"""
+        state = self._wallet(address)
+        with state.lock:
+            idle = not state.in_flight and time.time() - state.last_sync > self.idle_resync
+            if state.next_nonce is None or idle:
+                self._resync(address, state, "initial" if state.next_nonce is None else "idle")
+            else:
+                self._check_dropped(address, state)
+
+            if state.released:
+                nonce = min(state.released)
+                state.released.remove(nonce)
+                self._metrics["gaps_filled"] += 1
+            else:
+                nonce = state.next_nonce
+                state.next_nonce += 1
+
+            state.in_flight[nonce] = {"reserved_at": time.time(), "tx_hash": None}
+            self._metrics["reservations"] += 1
+        self._save()
+        return nonce
+
+    def confirm(self, address: str, nonce: int, tx_hash: str) -> None:
+        """Record that the transaction using this nonce was accepted by the node"""
+        state = self._wallet(address)
+        with state.lock:
+            entry = state.in_flight.setdefault(nonce, {"reserved_at": time.time()})
+            entry["tx_hash"] = tx_hash
+            state.last_sync = time.time()
+            self._metrics["confirmed"] += 1
+        self._save()
+
+    def release(self, address: str, nonce: int) -> None:
+        """Hand a nonce back when its transaction was never broadcast"""
+        state = self._wallet(address)
+        with state.lock:
+            state.in_flight.pop(nonce, None)
+            self._metrics["released"] += 1
+            if state.next_nonce is not None and nonce == state.next_nonce - 1:
+                state.next_nonce -= 1
+            elif nonce not in state.released:
+                # A later nonce is already out, so this one must be reused to fill the gap
+                state.released.append(nonce)
+                self._metrics["gaps"] += 1
+        self._save()
+
+    def complete(self, address: str, nonce: int) -> None:
+        """Forget a nonce once its transaction has been mined"""
+        state = self._wallet(address)
+        with state.lock:
+            state.in_flight.pop(nonce, None)
+        self._save()
+
+    def mark_dropped(self, address: str, nonce: int) -> None:
+        """Forget a broadcast transaction that never made it into a block and resync"""
+        state = self._wallet(address)
+        with state.lock:
+            state.in_flight.pop(nonce, None)
+            self._metrics["dropped"] += 1
+            self._resync(address, state, "dropped")
+        self._save()
+
+    def handle_error(self, address: str, nonce: int, error: Exception) -> bool:
+        """
+        Release a nonce after a failed send. Returns True if the failure was a nonce
+        conflict, in which case the counter was resynced and the send can be retried.
+        An already-known error is not a failure: the reservation is kept and False is
+        returned, so callers must check is_already_known() first and never re-send.
+        """
+        if is_already_known(error):
+            return False
+        message = str(error).lower()
+        if not any(marker in message for marker in NONCE_ERROR_MARKERS):
+            self.release(address, nonce)
+            return False
+
+        state = self._wallet(address)
+        with state.lock:
+            state.in_flight.pop(nonce, None)
+            self._resync(address, state, message[:60])
+        self._save()
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return reservation, gap and resync counters plus per-wallet state"""
+        wallets = {}
+        with self._wallets_lock:
+            for address, state in self._wallets.items():
+                with state.lock:
+                    wallets[address] = {
+                        "next_nonce": state.next_nonce,
+                        "in_flight": sorted(state.in_flight),
+                        "released": sorted(state.released),
+                    }
+        return {**self._metrics, "wallets": wallets}
+
+    def _save(self) -> None:
+        if not self.store_path:
+            return
+        snapshot = {}
+        with self._wallets_lock:
+            for address, state in self._wallets.items():
+                with state.lock:
+                    if state.in_flight:
+                        snapshot[address] = {
+                            "next_nonce": state.next_nonce,
+                            "in_flight": {str(n): dict(entry) for n, entry in state.in_flight.items()},
+                        }
+        try:
+            with self._store_lock:
+                directory = os.path.dirname(self.store_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.store_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            logger.warning(f"Could not persist nonce reservations: {e}")
+
+    def _load(self) -> None:
+        """Restore in-flight reservations; wallets are resynced with the chain on first use"""
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load nonce reservations: {e}")
+            return
+
+        for address, saved in snapshot.items():
+            state = self._wallet(address)
+            # Reservations that were never broadcast did not reach the network and are dropped
+            state.in_flight = {
+                int(n): entry for n, entry in saved.get("in_flight", {}).items() if entry.get("tx_hash")
+            }
+        logger.info(f"Restored in-flight nonce reservations for {len(snapshot)} wallet(s)")
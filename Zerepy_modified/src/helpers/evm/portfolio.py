@@ -0,0 +1,150 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from src.helpers.evm.multicall import Call, MulticallReader, read_balances
+
+logger = logging.getLogger("helpers.evm.portfolio")
+
+
+class PortfolioReader:
+    """
+    Block-consistent portfolio snapshots for many wallets.
+
+    All balances are read in one batched call pinned to a single block, each token is
+    priced once per block no matter how many wallets hold it, and finished snapshots
+    are cached per block so refreshes within the same block cost one block-number call.
+    """
+
+    def __init__(self, web3, reader: MulticallReader, registry, chain_id: int,
+                 price_quoter: Callable[[str, int], Optional[float]],
+                 launchpad: Optional[str] = None, pegged: Sequence[str] = (), native_symbol: str = "S",
+                 cache_blocks: int = 16, max_price_workers: int = 8):
+        self._web3 = web3
+        self._reader = reader
+        self._registry = registry
+        self.chain_id = chain_id
+        self._price_quoter = price_quoter
+        self.launchpad = launchpad
+        # Tokens worth exactly one native unit (the wrapped native token)
+        self.pegged = {token.lower() for token in pegged}
+        self.native_symbol = native_symbol
+        self.cache_blocks = cache_blocks
+        self.max_price_workers = max_price_workers
+        self._snapshots: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._prices: "OrderedDict[int, Dict[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"snapshot_hits": 0, "snapshot_misses": 0, "price_hits": 0, "price_fetches": 0}
+
+    def _trim(self, cache: OrderedDict) -> None:
+        while len(cache) > self.cache_blocks:
+            cache.popitem(last=False)
+
+    def _curve_prices(self, tokens: List[str], block: int) -> Dict[str, Optional[float]]:
+        """Bonding-curve sell return of one token on the launchpad, batched into one call"""
+        if not self.launchpad or not tokens:
+            return {}
+        calls = []
+        for token in tokens:
+            decimals = self._registry.peek(self.chain_id, token).decimals
+            calls.append(Call(
+                self.launchpad, "calculateCurvedSellReturn(address,uint256)",
+                [self._web3.to_checksum_address(token), 10 ** decimals], label=token
+            ))
+        prices = {}
+        for result in self._reader.execute(calls, block_identifier=block):
+            if result.success and result.value:
+                prices[result.label] = result.value / 10 ** 18
+        return prices
+
+    def _token_prices(self, tokens: List[str], block: int) -> Dict[str, Optional[float]]:
+        with self._lock:
+            cached = self._prices.setdefault(block, {})
+            self._trim(self._prices)
+            missing = [token for token in tokens if token.lower() not in cached]
+            self.stats["price_hits"] += len(tokens) - len(missing)
+            self.stats["price_fetches"] += len(missing)
+
+        fetched: Dict[str, Optional[float]] = {}
+        quotable = []
+        for token in missing:
+            meta = self._registry.peek(self.chain_id, token)
+            if token.lower() in self.pegged:
+                fetched[token] = 1.0
+            elif meta and meta.decimals is not None:
+                quotable.append(token)
+            else:
+                fetched[token] = None
+
+        if quotable:
+            def quote(token):
+                try:
+                    return self._price_quoter(token, self._registry.peek(self.chain_id, token).decimals)
+                except Exception as e:
+                    logger.debug(f"Aggregator price for {token} unavailable: {e}")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=min(self.max_price_workers, len(quotable))) as pool:
+                for token, price in zip(quotable, pool.map(quote, quotable)):
+                    fetched[token] = price
+
+            # Launchpad tokens that are not routable yet are priced off the bonding curve
+            unpriced = [token for token in quotable if not fetched.get(token)]
+            try:
+                fetched.update(self._curve_prices(unpriced, block))
+            except Exception as e:
+                logger.debug(f"Curve pricing failed: {e}")
+
+        with self._lock:
+            for token, price in fetched.items():
+                cached[token.lower()] = price
+            return {token: cached.get(token.lower()) for token in tokens}
+
+    def snapshot(self, wallets: Dict[str, str], tokens: Sequence[str]) -> Dict:
+        """
+        Portfolio for each wallet. `wallets` maps the caller's label (wallet id or address)
+        to the resolved address. Values are denominated in the native token.
+        """
+        block = self._web3.eth.block_number
+        key = (block, tuple(sorted(wallets.items())), tuple(token.lower() for token in tokens))
+        with self._lock:
+            if key in self._snapshots:
+                self.stats["snapshot_hits"] += 1
+                return self._snapshots[key]
+            self.stats["snapshot_misses"] += 1
+
+        addresses = list(dict.fromkeys(wallets.values()))
+        balances = read_balances(self._reader, self._registry, self.chain_id, addresses, tokens, block_identifier=block)
+        prices = self._token_prices(list(tokens), block)
+
+        portfolios = {}
+        for label, address in wallets.items():
+            held = balances["balances"][address]
+            assets = [{"token": "native", "symbol": self.native_symbol, "balance": held["native"], "price": 1.0, "value": held["native"]}]
+            for token in tokens:
+                balance = held["tokens"].get(token)
+                price = prices.get(token)
+                assets.append({
+                    "token": token,
+                    "symbol": balances["tokens"][token]["symbol"],
+                    "balance": balance,
+                    "price": price,
+                    "value": balance * price if balance is not None and price is not None else None
+                })
+            total = sum(asset["value"] or 0 for asset in assets)
+            for asset in assets:
+                asset["weight"] = (asset["value"] or 0) / total if total else 0.0
+            portfolios[label] = {"address": address, "total_value": total, "assets": assets}
+
+        snapshot = {
+            "block_number": block,
+            "denomination": self.native_symbol,
+            "portfolios": portfolios,
+            "errors": balances["errors"]
+        }
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._trim(self._snapshots)
+        return snapshot
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("helpers.evm.quotes")
+
+
+class QuoteError(Exception):
+    """Raised when a quote handle is unknown, expired or used for a different trade"""
+    pass
+
+
+@dataclass
+class Quote:
+    quote_id: str
+    token_in: str
+    token_out: str
+    amount: float
+    route: Dict[str, Any]
+    created_at: float = field(default_factory=time.time)
+    expires_at: float = 0.0
+
+    def matches(self, token_in: str, token_out: str, amount: float) -> bool:
+        return (
+            self.token_in.lower() == token_in.lower()
+            and self.token_out.lower() == token_out.lower()
+            and float(self.amount) == float(amount)
+        )
+
+
+class QuoteStore:
+    """
+    Short-lived store of aggregator routes keyed by quote id.
+
+    A quote shown to the user is stored with its routeSummary so the swap that follows
+    can build exactly that route instead of asking the aggregator again. Identical
+    quote requests that arrive while one is in flight share its route fetch, from threads
+    (quote) or coroutines (aquote), but each caller gets a quote id of its own, since a
+    quote id can be used for one swap only.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._quotes: "OrderedDict[str, Quote]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple, Tuple[threading.Event, list]] = {}
+        self._async_in_flight: Dict[Tuple, asyncio.Future] = {}
+        self.stats = {"quotes": 0, "coalesced": 0, "used": 0, "released": 0, "expired": 0}
+
+    @staticmethod
+    def _key(token_in: str, token_out: str, amount: float) -> Tuple:
+        return (token_in.lower(), token_out.lower(), float(amount))
+
+    def _store(self, token_in: str, token_out: str, amount: float, route: Dict[str, Any]) -> Quote:
+        now = time.time()
+        quote = Quote(uuid.uuid4().hex, token_in, token_out, amount, route, created_at=now, expires_at=now + self.ttl)
+        with self._lock:
+            self._quotes[quote.quote_id] = quote
+            self.stats["quotes"] += 1
+            while len(self._quotes) > self.max_entries:
+                self._quotes.popitem(last=False)
+        return quote
+
+    def quote(self, token_in: str, token_out: str, amount: float, fetch_route: Callable[[], Dict[str, Any]]) -> Quote:
+        """Fetch and store a route, sharing one fetch between identical concurrent requests"""
+        key = self._key(token_in, token_out, amount)
+        with self._lock:
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = (threading.Event(), [])
+                self._in_flight[key] = pending
+                leader = True
+            else:
+                self.stats["coalesced"] += 1
+                leader = False
+
+        event, outcome = pending
+        if leader:
+            try:
+                outcome.append(fetch_route())
+            except Exception as e:
+                outcome.append(e)
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+        else:
+            event.wait()
+        if isinstance(outcome[0], Exception):
+            raise outcome[0]
+        return self._store(token_in, token_out, amount, outcome[0])
+
+    async def aquote(self, token_in: str, token_out: str, amount: float,
+                     fetch_route: Callable[[], Awaitable[Dict[str, Any]]]) -> Quote:
+        """asyncio version of quote()"""
+        key = self._key(token_in, token_out, amount)
+        pending = self._async_in_flight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return self._store(token_in, token_out, amount, await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_in_flight[key] = future
+        try:
+            route = await fetch_route()
+            future.set_result(route)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._async_in_flight.pop(key, None)
+        return self._store(token_in, token_out, amount, route)
+
+    def get(self, quote_id: str) -> Optional[Quote]:
+        """The stored quote, or None if it is unknown or has expired"""
+        with self._lock:
+            quote = self._quotes.get(quote_id)
+            if quote and quote.expires_at < time.time():
+                self._quotes.pop(quote_id, None)
+                self.stats["expired"] += 1
+                return None
+            return quote
+
+    def use(self, quote_id: str, token_in: str, token_out: str, amount: float) -> Quote:
+        """Take a quote for execution; it must be fresh and for the same trade, and can be taken once"""
+        with self._lock:
+            quote = self._quotes.get(quote_id)
+            if quote is not None and quote.expires_at < time.time():
+                del self._quotes[quote_id]
+                self.stats["expired"] += 1
+                quote = None
+            if quote is None:
+                raise QuoteError(f"Quote {quote_id} is unknown or expired, request a new quote")
+            if not quote.matches(token_in, token_out, amount):
+                raise QuoteError(f"Quote {quote_id} was issued for a different trade")
+            del self._quotes[quote_id]
+            self.stats["used"] += 1
+        return quote
+
+    def release(self, quote: Quote) -> None:
+        """Return a quote taken by use() whose swap was never sent, so it can be retried while fresh"""
+        with self._lock:
+            if quote.expires_at < time.time() or quote.quote_id in self._quotes:
+                return
+            self._quotes[quote.quote_id] = quote
+            self.stats["used"] -= 1
+            self.stats["released"] += 1
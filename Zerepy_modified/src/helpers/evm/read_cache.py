@@ -0,0 +1,213 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger("helpers.evm.read_cache")
+
+# Answers that cannot change for the lifetime of a connection
+PERMANENT_METHODS = frozenset({"eth_chainId", "net_version"})
+
+# State reads that are fixed for a given block; value is the index of their block parameter.
+# eth_getTransactionCount is left out: a nonce read right after our own transaction is
+# mined must not be answered from the head the transaction was sent under.
+BLOCK_SCOPED_METHODS = {
+    "eth_call": 1,
+    "eth_getBalance": 1,
+    "eth_getCode": 1,
+    "eth_getStorageAt": 2,
+    "eth_getBlockByNumber": 0,
+}
+
+_local = threading.local()
+
+
+class BlockReadCache:
+    """
+    Read-through cache of JSON-RPC reads for one chain connection, scoped to the head block.
+
+    State reads (eth_call, balances, code, storage, blocks) are keyed by method,
+    params and the current head number, so identical reads within a block are answered
+    once. The head is followed by a poller that only runs while the cache is in use, and
+    can also be pushed by the receipt watcher with on_head(). A new head drops every
+    entry. eth_chainId and net_version are kept for good. Nonces, reads against the
+    pending block, and reads made inside `with cache.bypass():`, always go to the node,
+    as does everything while `enabled` is off. Concurrent identical misses share one
+    request.
+    """
+
+    def __init__(self, block_number: Callable[[], int], poll_interval: float = 1.0,
+                 idle_timeout: float = 30.0, max_entries: int = 10000, enabled: bool = True):
+        self._block_number = block_number
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._permanent: Dict[Tuple, Dict[str, Any]] = {}
+        self._inflight: Dict[Tuple, Future] = {}
+        self._head: Optional[int] = None
+        self._last_used = 0.0
+        self._polling = False
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "permanent_hits": 0, "bypassed": 0, "invalidations": 0, "head_polls": 0}
+
+    @contextmanager
+    def bypass(self) -> Iterator[None]:
+        """Send the reads made by this thread inside the block straight to the node"""
+        previous = getattr(_local, "bypass", False)
+        _local.bypass = True
+        try:
+            yield
+        finally:
+            _local.bypass = previous
+
+    @property
+    def head(self) -> Optional[int]:
+        return self._head
+
+    def live_head(self) -> Optional[int]:
+        """The head while the poller follows it, else None; never reads the node"""
+        with self._lock:
+            return self._head if self._polling and self.enabled else None
+
+    def on_head(self, block_number: int) -> None:
+        """A new head was seen: everything read for an older block is dropped"""
+        with self._lock:
+            if self._head is not None and block_number <= self._head:
+                return
+            self._head = block_number
+            if self._entries:
+                self.stats["invalidations"] += 1
+                self._entries.clear()
+
+    def pin(self) -> Optional[int]:
+        """Learn the head before a burst of concurrent reads, so they all key on the same block"""
+        if not self.enabled:
+            return None
+        return self._current_head()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._permanent.clear()
+
+    def _current_head(self) -> Optional[int]:
+        self._last_used = time.time()
+        with self._lock:
+            start = not self._polling
+            self._polling = True
+        if start:
+            # First use after being idle: the poller was stopped, so the head may be old
+            try:
+                self.stats["head_polls"] += 1
+                self.on_head(self._block_number())
+            except Exception as e:
+                logger.debug(f"Could not read the head block: {e}")
+                with self._lock:
+                    self._polling = False
+                return None
+            threading.Thread(target=self._poll, name="read-cache-head", daemon=True).start()
+        return self._head
+
+    def _poll(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if time.time() - self._last_used >= self.idle_timeout:
+                    self._polling = False
+                    return
+            try:
+                self.stats["head_polls"] += 1
+                self.on_head(self._block_number())
+            except Exception as e:
+                logger.debug(f"Head poll failed: {e}")
+
+    @staticmethod
+    def _cacheable_block(method: str, params: Any) -> bool:
+        position = BLOCK_SCOPED_METHODS[method]
+        block = params[position] if isinstance(params, (list, tuple)) and len(params) > position else "latest"
+        return block != "pending"
+
+    def _key(self, method: str, params: Any) -> Tuple:
+        return method, json.dumps(params, sort_keys=True, default=str)
+
+    def request(self, method: str, params: Any, make_request: Callable[[str, Any], Dict[str, Any]]) -> Dict[str, Any]:
+        permanent = method in PERMANENT_METHODS
+        if not permanent and (method not in BLOCK_SCOPED_METHODS or not self._cacheable_block(method, params)):
+            return make_request(method, params)
+        if not self.enabled or getattr(_local, "bypass", False):
+            self.stats["bypassed"] += 1
+            return make_request(method, params)
+
+        if permanent:
+            key = self._key(method, params)
+            response = self._permanent.get(key)
+            if response is not None:
+                self.stats["permanent_hits"] += 1
+                return dict(response)
+        else:
+            head = self._current_head()
+            if head is None:
+                self.stats["misses"] += 1
+                return make_request(method, params)
+            key = self._key(method, params) + (head,)
+
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return dict(response)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+        if not leader:
+            return dict(future.result())
+
+        try:
+            response = make_request(method, params)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            # Errors are not cached, and neither is a read that straddled a new head
+            if "error" not in response and (permanent or key[-1] == self._head):
+                if permanent:
+                    self._permanent[key] = response
+                else:
+                    self._entries[key] = response
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        future.set_result(response)
+        return dict(response)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats["head"] = self._head
+        stats["enabled"] = self.enabled
+        return stats
+
+
+def construct_read_cache_middleware(cache: BlockReadCache):
+    """web3 middleware answering cacheable reads from `cache`; inject it at the innermost layer"""
+    def read_cache_middleware(make_request, w3):
+        def middleware(method, params):
+            return cache.request(method, params, make_request)
+        return middleware
+    return read_cache_middleware
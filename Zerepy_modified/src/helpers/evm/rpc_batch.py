@@ -0,0 +1,261 @@
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from web3._utils.encoding import Web3JsonEncoder
+
+logger = logging.getLogger("helpers.evm.rpc_batch")
+
+# Runs the functions submitted to batches; they are short sequences of RPC calls
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="rpc-batch")
+_local = threading.local()
+
+
+def _in_member() -> bool:
+    """Whether the calling thread is running a member of a batch"""
+    return getattr(_local, "batch", None) is not None
+
+
+class _Pending:
+    __slots__ = ("request", "future", "batch", "queued_at")
+
+    def __init__(self, request: Dict[str, Any], batch: Optional["RpcBatch"]):
+        self.request = request
+        self.future: Future = Future()
+        self.batch = batch
+        self.queued_at = time.monotonic()
+
+
+class RpcBatch:
+    """
+    A group of functions whose RPC calls are sent together.
+
+    Each submitted function runs on its own worker thread. Whenever every running member
+    is blocked on an RPC call, the calls go out as one JSON-RPC batch POST; a member
+    busy with something else (a Privy or Kyber request) holds the batch back for at most
+    the batcher's `batch_window`. Functions that make several calls in a row get one
+    round trip per step rather than one per call. While the batch is `open` (inside a
+    `with batcher.batch()` block) more members may still come, so the barrier waits.
+
+    A batch opened by a member of another batch (a gather inside a Preflight step) is
+    `inline`: its functions run one after another in the member's own thread and their
+    calls count towards the outer batch. Nested batches therefore never wait on the
+    shared worker pool, which they could otherwise fill with blocked members.
+    """
+
+    def __init__(self, batcher: "RpcBatcher", open: bool = False, inline: bool = False):
+        self._batcher = batcher
+        self.open = open
+        self.inline = inline
+        self.members = 0
+        self.futures: List[Future] = []
+        self.requests = 0
+        self.round_trips = 0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Run fn(*args, **kwargs) as a member of the batch; futures come back in submission order"""
+        if not self.inline:
+            with self._batcher._cond:
+                self.members += 1
+        future = self._start(fn, args, kwargs)
+        self.futures.append(future)
+        return future
+
+    def submit_many(self, calls: List[Tuple[Callable, tuple]]) -> List[Future]:
+        """Submit several (fn, args) at once, so none of them is flushed before the others start"""
+        if not self.inline:
+            with self._batcher._cond:
+                self.members += len(calls)
+        futures = [self._start(fn, args, {}) for fn, args in calls]
+        self.futures.extend(futures)
+        return futures
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn in the calling thread as a member, for callers that bring their own threads"""
+        if self.inline:
+            return fn(*args, **kwargs)
+        with self._batcher._cond:
+            self.members += 1
+        return self._run(fn, args, kwargs)
+
+    def _start(self, fn: Callable, args, kwargs) -> Future:
+        if not self.inline:
+            return _executor.submit(self._run, fn, args, kwargs)
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _run(self, fn: Callable, args, kwargs) -> Any:
+        _local.batch = self
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.batch = None
+            with self._batcher._cond:
+                self.members -= 1
+                # One member fewer may be all the barrier was waiting for
+                self._batcher._cond.notify_all()
+
+    def results(self) -> List[Any]:
+        """Results of every submitted function in submission order; raises the first error"""
+        return [future.result() for future in self.futures]
+
+
+class RpcBatcher:
+    """
+    Collects JSON-RPC reads into batch POSTs in front of a connection's RpcPool.
+
+    Reads made inside `batch()` are combined as described on RpcBatch. With a `window`
+    above zero, reads made by concurrent threads outside any batch are also held for up
+    to `window` seconds and combined with whatever else arrives. Writes never wait and
+    nodes that reject batches are asked one request at a time. `stats` counts requests
+    against round trips so the saving per action can be measured.
+    """
+
+    def __init__(self, send: Callable[[bytes], bytes], window: float = 0.0, batch_window: float = 0.005,
+                 max_batch: int = 100):
+        self._send = send
+        self.window = window
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._queue: List[_Pending] = []
+        self._leading = False
+        self._ids = itertools.count(1)
+        self.stats = {"requests": 0, "round_trips": 0, "batches": 0, "batched_requests": 0, "rejected": 0}
+
+    @contextmanager
+    def batch(self) -> Iterator[RpcBatch]:
+        """
+        Group the RPC calls of several functions:
+
+            with batcher.batch() as batch:
+                balance = batch.submit(w3.eth.get_balance, address)
+                gas_price = batch.submit(lambda: w3.eth.gas_price)
+
+        The block waits for every submitted function before it exits. Opened from inside
+        another batch's member, the batch runs inline (see RpcBatch).
+        """
+        batch = RpcBatch(self, open=True, inline=_in_member())
+        try:
+            yield batch
+        finally:
+            with self._cond:
+                batch.open = False
+                self._cond.notify_all()
+            for future in batch.futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+    def gather(self, *calls: Callable[[], Any]) -> List[Any]:
+        """Run zero-argument calls as one batch and return their results in order"""
+        with self.batch() as batch:
+            for call in calls:
+                batch.submit(call)
+        return batch.results()
+
+    def group(self) -> RpcBatch:
+        """A batch for callers that submit members in waves with submit_many (see Preflight)"""
+        return RpcBatch(self, inline=_in_member())
+
+    def request(self, method: str, params: Any) -> Dict[str, Any]:
+        """Send one JSON-RPC request, batched with its neighbours, and return the decoded response"""
+        batch = getattr(_local, "batch", None)
+        pending = _Pending({"jsonrpc": "2.0", "method": method, "params": params, "id": next(self._ids)}, batch)
+        with self._cond:
+            self.stats["requests"] += 1
+            if batch is not None:
+                batch.requests += 1
+            if batch is None and self.window <= 0:
+                lead = None
+            else:
+                self._queue.append(pending)
+                lead = not self._leading
+                self._leading = True
+                self._cond.notify_all()
+        if lead is None:
+            self._flush([pending])
+        elif lead:
+            self._lead()
+        return pending.future.result()
+
+    def _barrier_reached(self) -> bool:
+        """Every batch with queued calls has all its running members waiting in the queue"""
+        queued: Dict[RpcBatch, int] = {}
+        for pending in self._queue:
+            if pending.batch is None:
+                return False
+            queued[pending.batch] = queued.get(pending.batch, 0) + 1
+        return all(not batch.open and count >= batch.members for batch, count in queued.items())
+
+    def _lead(self) -> None:
+        # The first caller to queue sends the batch for everyone queued by then
+        with self._cond:
+            first = self._queue[0]
+            deadline = first.queued_at + (self.batch_window if first.batch is not None else self.window)
+            while len(self._queue) < self.max_batch and not self._barrier_reached():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            taken, self._queue = self._queue, []
+            self._leading = False
+        for start in range(0, len(taken), self.max_batch):
+            self._flush(taken[start:start + self.max_batch])
+
+    def _encode(self, payload: Any) -> bytes:
+        return json.dumps(payload, cls=Web3JsonEncoder).encode()
+
+    def _flush(self, chunk: List[_Pending]) -> None:
+        batches = {pending.batch for pending in chunk if pending.batch is not None}
+        try:
+            if len(chunk) == 1:
+                responses = [json.loads(self._send(self._encode(chunk[0].request)))]
+                round_trips = 1
+            else:
+                body = json.loads(self._send(self._encode([pending.request for pending in chunk])))
+                round_trips = 1
+                if not isinstance(body, list):
+                    # Batching is disabled on this node
+                    logger.debug(f"Batch request rejected ({body}), sending {len(chunk)} requests individually")
+                    self.stats["rejected"] += 1
+                    body = [json.loads(self._send(self._encode(pending.request))) for pending in chunk]
+                    round_trips += len(chunk)
+                else:
+                    self.stats["batches"] += 1
+                    self.stats["batched_requests"] += len(chunk)
+                responses = body
+        except Exception as e:
+            with self._cond:
+                self.stats["round_trips"] += 1
+            for pending in chunk:
+                pending.future.set_exception(e)
+            return
+
+        with self._cond:
+            self.stats["round_trips"] += round_trips
+            for batch in batches:
+                batch.round_trips += round_trips
+        by_id = {response.get("id"): response for response in responses if isinstance(response, dict)}
+        for pending in chunk:
+            request_id = pending.request["id"]
+            pending.future.set_result(by_id.get(request_id) or {
+                "jsonrpc": "2.0", "id": request_id,
+                "error": {"code": -32603, "message": "Request missing from the batch response"}
+            })
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self.stats)
+        stats["requests_per_round_trip"] = round(stats["requests"] / stats["round_trips"], 2) if stats["round_trips"] else None
+        return stats
@@ -0,0 +1,538 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from eth_utils import keccak
+from web3 import AsyncHTTPProvider, HTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from src.helpers.transport import get_transport
+
+logger = logging.getLogger("helpers.evm.rpc_pool")
+
+# Methods with side effects; they go to the write endpoints and are never hedged
+WRITE_METHODS = frozenset({"eth_sendRawTransaction", "eth_sendTransaction"})
+
+# Errors meaning the node already has the transaction, i.e. an earlier broadcast landed
+ALREADY_KNOWN_ERRORS = ("already known", "known transaction", "already imported", "already exists")
+
+# After a failover, the nonce may be used up by this very transaction
+NONCE_USED_ERRORS = ("nonce too low",)
+
+
+def needs_write_endpoint(method: str, params: Any) -> bool:
+    """
+    Reads that must see the pool's own broadcasts: nonces, at any block tag. A lagging
+    public node can report a count from before our last transaction (an approval just
+    mined, say) and the next one is signed with a used nonce, so these go to the write
+    endpoints like a write, unhedged and unbatched.
+    """
+    return method == "eth_getTransactionCount"
+
+
+class RpcEndpoint:
+    """Health and latency of one RPC URL, as seen by the pool"""
+
+    def __init__(self, url: str, alpha: float = 0.3):
+        self.url = url
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.hedges_won = 0
+        self.broadcasts_won = 0
+        self.down_until = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.down_until
+
+    def record_latency(self, latency: float) -> None:
+        # Exponentially weighted, so a node that slows down loses its rank within a few calls
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.consecutive_errors = 0
+        self.down_until = 0.0
+        self.record_latency(latency)
+
+    def record_failure(self, error: Exception, max_errors: int, cooldown: float) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.last_error = str(error)
+        if self.consecutive_errors >= max_errors:
+            if self.healthy:
+                logger.warning(f"RPC endpoint {self.url} marked unhealthy for {cooldown}s: {error}")
+            self.down_until = time.time() + cooldown
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "hedges_won": self.hedges_won,
+            "broadcasts_won": self.broadcasts_won,
+            "last_error": self.last_error
+        }
+
+
+class RpcPool:
+    """
+    Several RPC endpoints for one chain behind a single send().
+
+    Reads go to the healthy endpoint with the lowest latency average. When it has not
+    answered after `hedge_after` seconds, the same request is also sent to the next best
+    endpoint and whichever answers first wins; a failing endpoint is skipped straight
+    away. Endpoints that fail `max_errors` times in a row sit out for `cooldown` seconds.
+    Writes go to `write_urls` (the read endpoints if none are given) one at a time in
+    order of preference, moving on only when an endpoint cannot be reached, and are never
+    hedged. An endpoint that fails may still have taken the transaction, so after a
+    failover a reply of "already known", or "nonce too low" while the node has the
+    transaction's hash, counts as accepted. Nonce reads follow the write path.
+
+    With `fan_out`, a raw transaction is instead posted to every write endpoint at once
+    and the first node to accept it answers the call; the others keep propagating it. A
+    node replying that it already knows the transaction counts as accepting it. Which
+    endpoint accepted each transaction first is kept for the last `max_broadcasts` sends.
+    """
+
+    def __init__(self, read_urls: Sequence[str], write_urls: Optional[Sequence[str]] = None,
+                 hedge_after: Optional[float] = 0.3, max_hedges: int = 1,
+                 max_errors: int = 3, cooldown: float = 30.0, fan_out: bool = False,
+                 max_broadcasts: int = 1000):
+        if not read_urls:
+            raise ValueError("RpcPool needs at least one RPC URL")
+        self.read = [RpcEndpoint(url) for url in dict.fromkeys(read_urls)]
+        by_url = {endpoint.url: endpoint for endpoint in self.read}
+        # An URL in both sets shares its health record
+        self.write = [by_url.get(url) or RpcEndpoint(url) for url in dict.fromkeys(write_urls or read_urls)]
+        self.hedge_after = hedge_after
+        self.max_hedges = max_hedges
+        self.max_errors = max_errors
+        self.cooldown = cooldown
+        self.fan_out = fan_out
+        self.max_broadcasts = max_broadcasts
+        self._broadcasts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._background = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="rpc-pool")
+        self.stats = {"reads": 0, "writes": 0, "hedges": 0, "failovers": 0, "fan_outs": 0}
+
+    @property
+    def primary_url(self) -> str:
+        return self.read[0].url
+
+    def ranked(self, endpoints: List[RpcEndpoint], by_latency: bool = True) -> List[RpcEndpoint]:
+        """Healthy endpoints first (fastest first for reads), then the others by when they recover"""
+        with self._lock:
+            healthy = [endpoint for endpoint in endpoints if endpoint.healthy]
+            if by_latency:
+                # Endpoints without a measurement yet are tried early so they get one
+                healthy.sort(key=lambda endpoint: endpoint.latency or 0.0)
+            down = sorted((endpoint for endpoint in endpoints if not endpoint.healthy),
+                          key=lambda endpoint: endpoint.down_until)
+            return healthy + down
+
+    def _record(self, endpoint: RpcEndpoint, started: float, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            if error is None:
+                endpoint.record_success(time.perf_counter() - started)
+            else:
+                endpoint.record_failure(error, self.max_errors, self.cooldown)
+
+    def _post(self, endpoint: RpcEndpoint, data: bytes) -> bytes:
+        started = time.perf_counter()
+        try:
+            response = get_transport().post(
+                endpoint.url, data=data, headers={"Content-Type": "application/json"}, retries=0
+            )
+            response.raise_for_status()
+        except Exception as e:
+            self._record(endpoint, started, e)
+            raise
+        self._record(endpoint, started)
+        return response.content
+
+    def send(self, data: bytes, write: bool = False, pinned: bool = False) -> bytes:
+        """
+        POST an encoded JSON-RPC request (or batch) and return the raw response body.
+        `pinned` reads go to the write endpoints in order, unhedged (see needs_write_endpoint).
+        """
+        if pinned:
+            self.stats["reads"] += 1
+            return self._send_write(data)
+        if write:
+            self.stats["writes"] += 1
+            broadcast = self._broadcast_request(data)
+            if broadcast is not None:
+                return self._fan_out(data, *broadcast)
+            return self._send_write(data)
+        self.stats["reads"] += 1
+        return self._send_read(data)
+
+    @staticmethod
+    def _raw_transaction(data: bytes) -> Optional[Tuple[Any, str]]:
+        """(request id, tx hash) when `data` is an eth_sendRawTransaction request, else None"""
+        try:
+            request = json.loads(data)
+        except ValueError:
+            return None
+        if not isinstance(request, dict) or request.get("method") != "eth_sendRawTransaction":
+            return None
+        return request.get("id"), "0x" + keccak(hexstr=request["params"][0]).hex()
+
+    def _broadcast_request(self, data: bytes) -> Optional[Tuple[Any, str]]:
+        """(request id, tx hash) when `data` is a raw transaction to fan out, else None"""
+        if not self.fan_out or len(self.write) < 2:
+            return None
+        return self._raw_transaction(data)
+
+    @staticmethod
+    def _error_message(body: bytes) -> Optional[str]:
+        try:
+            response = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(response, dict) or response.get("result"):
+            return None
+        return str((response.get("error") or {}).get("message", "")).lower()
+
+    @staticmethod
+    def _accepted_body(request_id: Any, tx_hash: str) -> bytes:
+        return json.dumps({"jsonrpc": "2.0", "id": request_id, "result": tx_hash}).encode()
+
+    def _accepted(self, body: bytes, request_id: Any, tx_hash: str) -> Optional[bytes]:
+        """The response to hand back if the node took the transaction, else None"""
+        message = self._error_message(body)
+        if message is None:
+            try:
+                return body if json.loads(body).get("result") else None
+            except (ValueError, AttributeError):
+                return None
+        if any(marker in message for marker in ALREADY_KNOWN_ERRORS):
+            return self._accepted_body(request_id, tx_hash)
+        return None
+
+    @staticmethod
+    def _lookup_request(tx_hash: str) -> bytes:
+        return json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_getTransactionByHash",
+                           "params": [tx_hash]}).encode()
+
+    @staticmethod
+    def _known(body: bytes) -> bool:
+        try:
+            return bool(json.loads(body).get("result"))
+        except (ValueError, AttributeError):
+            return False
+
+    def _settle(self, endpoint: RpcEndpoint, body: bytes, request_id: Any, tx_hash: str) -> bytes:
+        """
+        Reply of a write sent after an earlier endpoint failed. That endpoint may have taken
+        the transaction before failing, so "already known", or "nonce too low" while the
+        node has this hash, mean the transaction is out.
+        """
+        accepted = self._accepted(body, request_id, tx_hash)
+        if accepted is not None:
+            return accepted
+        message = self._error_message(body) or ""
+        if any(marker in message for marker in NONCE_USED_ERRORS):
+            try:
+                if self._known(self._post(endpoint, self._lookup_request(tx_hash))):
+                    logger.info(f"Transaction {tx_hash} landed through an endpoint that failed, treating it as sent")
+                    return self._accepted_body(request_id, tx_hash)
+            except Exception as e:
+                logger.warning(f"Could not look up {tx_hash} on {endpoint.url}: {e}")
+        return body
+
+    def _record_broadcast(self, tx_hash: str, endpoint: RpcEndpoint, started: float, already_known: bool) -> None:
+        with self._lock:
+            endpoint.broadcasts_won += 1
+            self.stats["fan_outs"] += 1
+            self._broadcasts[tx_hash] = {
+                "endpoint": endpoint.url,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "already_known": already_known,
+                "at": time.time()
+            }
+            while len(self._broadcasts) > self.max_broadcasts:
+                self._broadcasts.popitem(last=False)
+        logger.debug(f"Transaction {tx_hash} accepted first by {endpoint.url}")
+
+    def accepted_by(self, tx_hash) -> Optional[Dict[str, Any]]:
+        """Which write endpoint accepted a fanned-out transaction first, and how fast"""
+        tx_hash = tx_hash.hex() if isinstance(tx_hash, (bytes, bytearray)) else str(tx_hash)
+        tx_hash = tx_hash.lower() if tx_hash.startswith("0x") else f"0x{tx_hash.lower()}"
+        with self._lock:
+            return self._broadcasts.get(tx_hash)
+
+    def _fan_out(self, data: bytes, request_id: Any, tx_hash: str) -> bytes:
+        started = time.perf_counter()
+        futures = {self._executor.submit(self._post, endpoint, data): endpoint for endpoint in self.write}
+        rejection: Optional[bytes] = None
+        error: Optional[Exception] = None
+        for future in as_completed(futures):
+            endpoint = futures[future]
+            try:
+                body = future.result()
+            except Exception as e:
+                error = e
+                continue
+            response = self._accepted(body, request_id, tx_hash)
+            if response is not None:
+                self._record_broadcast(tx_hash, endpoint, started, response is not body)
+                return response
+            rejection = rejection or body
+        # Nobody took it: surface the node's own error (nonce too low, underpriced, ...)
+        if rejection is not None:
+            return rejection
+        raise error
+
+    def _send_write(self, data: bytes) -> bytes:
+        raw = self._raw_transaction(data)
+        error: Optional[Exception] = None
+        for endpoint in self.ranked(self.write, by_latency=False):
+            if error is not None:
+                self.stats["failovers"] += 1
+                logger.warning(f"Write via {endpoint.url} after failure: {error}")
+            try:
+                body = self._post(endpoint, data)
+            except Exception as e:
+                error = e
+                continue
+            if error is not None and raw is not None:
+                return self._settle(endpoint, body, *raw)
+            return body
+        raise error
+
+    def _send_read(self, data: bytes) -> bytes:
+        candidates = self.ranked(self.read)
+        if len(candidates) == 1:
+            return self._post(candidates[0], data)
+
+        first = candidates[0]
+        pending = {}
+        hedges = 0
+        error: Optional[Exception] = None
+
+        def launch() -> None:
+            endpoint = candidates.pop(0)
+            pending[self._executor.submit(self._post, endpoint, data)] = endpoint
+
+        launch()
+        while pending:
+            can_hedge = candidates and hedges < self.max_hedges and self.hedge_after is not None
+            done, _ = wait(list(pending), timeout=self.hedge_after if can_hedge else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                hedges += 1
+                self.stats["hedges"] += 1
+                launch()
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if hedges and endpoint is not first:
+                    with self._lock:
+                        endpoint.hedges_won += 1
+                # Slower duplicates finish in the background and still update their latency
+                return result
+            if candidates:
+                self.stats["failovers"] += 1
+                launch()
+        raise error
+
+    async def _apost(self, session, endpoint: RpcEndpoint, data: bytes, **kwargs) -> bytes:
+        kwargs = {"headers": {"Content-Type": "application/json"}, **kwargs}
+        started = time.perf_counter()
+        try:
+            async with session.post(endpoint.url, data=data, **kwargs) as response:
+                response.raise_for_status()
+                body = await response.read()
+        except asyncio.CancelledError:
+            # A hedge beat it; what it took so far is a lower bound on its latency
+            with self._lock:
+                endpoint.record_latency(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            self._record(endpoint, started, e)
+            raise
+        self._record(endpoint, started)
+        return body
+
+    async def asend(self, session, data: bytes, write: bool = False, pinned: bool = False, **kwargs) -> bytes:
+        """asyncio version of send() over an aiohttp session; kwargs go to session.post"""
+        if write or pinned:
+            self.stats["writes" if write else "reads"] += 1
+            broadcast = self._broadcast_request(data) if write else None
+            if broadcast is not None:
+                return await self._afan_out(session, data, *broadcast, **kwargs)
+            raw = self._raw_transaction(data) if write else None
+            error: Optional[Exception] = None
+            for endpoint in self.ranked(self.write, by_latency=False):
+                if error is not None:
+                    self.stats["failovers"] += 1
+                try:
+                    body = await self._apost(session, endpoint, data, **kwargs)
+                except Exception as e:
+                    error = e
+                    continue
+                if error is not None and raw is not None:
+                    # The settle lookup is one short call, made only after a failover
+                    return await asyncio.to_thread(self._settle, endpoint, body, *raw)
+                return body
+            raise error
+
+        self.stats["reads"] += 1
+        candidates = self.ranked(self.read)
+        first = candidates[0]
+        pending = {}
+        hedges = 0
+        error = None
+
+        def launch() -> None:
+            endpoint = candidates.pop(0)
+            pending[asyncio.ensure_future(self._apost(session, endpoint, data, **kwargs))] = endpoint
+
+        launch()
+        try:
+            while pending:
+                can_hedge = candidates and hedges < self.max_hedges and self.hedge_after is not None
+                done, _ = await asyncio.wait(list(pending), timeout=self.hedge_after if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges += 1
+                    self.stats["hedges"] += 1
+                    launch()
+                    continue
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if hedges and endpoint is not first:
+                        with self._lock:
+                            endpoint.hedges_won += 1
+                    return task.result()
+                if candidates:
+                    self.stats["failovers"] += 1
+                    launch()
+            raise error
+        finally:
+            # Losing duplicates would otherwise outlive the caller's request
+            for task in pending:
+                task.cancel()
+
+    async def _afan_out(self, session, data: bytes, request_id: Any, tx_hash: str, **kwargs) -> bytes:
+        started = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._apost(session, endpoint, data, **kwargs)): endpoint
+                 for endpoint in self.write}
+        # Slower broadcasts are left to finish; they still help the transaction propagate
+        self._background.update(tasks)
+        for task in tasks:
+            task.add_done_callback(self._background.discard)
+        pending = set(tasks)
+        rejection: Optional[bytes] = None
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                body = task.result()
+                response = self._accepted(body, request_id, tx_hash)
+                if response is not None:
+                    self._record_broadcast(tx_hash, tasks[task], started, response is not body)
+                    return response
+                rejection = rejection or body
+        if rejection is not None:
+            return rejection
+        raise error
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hedge_after": self.hedge_after,
+                "fan_out": self.fan_out,
+                "read": [endpoint.to_dict() for endpoint in self.read],
+                "write": [endpoint.to_dict() for endpoint in self.write],
+                "stats": dict(self.stats)
+            }
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider that sends every request through an RpcPool, and reads through an
+    RpcBatcher when one is given
+    """
+
+    def __init__(self, pool: RpcPool, batcher=None, **kwargs):
+        super().__init__(pool.primary_url, **kwargs)
+        self.pool = pool
+        self.batcher = batcher
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        pinned = needs_write_endpoint(method, params)
+        if self.batcher is not None and method not in WRITE_METHODS and not pinned:
+            return self.batcher.request(method, params)
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = self.pool.send(request_data, write=method in WRITE_METHODS, pinned=pinned)
+        return self.decode_rpc_response(raw_response)
+
+
+class AsyncPooledHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that sends every request through an RpcPool on a caller-owned aiohttp session"""
+
+    def __init__(self, pool: RpcPool, session_factory, **kwargs):
+        super().__init__(pool.primary_url, **kwargs)
+        self.pool = pool
+        self._session_factory = session_factory
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        session = await self._session_factory()
+        raw_response = await self.pool.asend(session, request_data, write=method in WRITE_METHODS,
+                                             pinned=needs_write_endpoint(method, params),
+                                             **self.get_request_kwargs())
+        return self.decode_rpc_response(raw_response)
+
+
+def pool_from_config(config: Dict[str, Any], network_config: Dict[str, Any],
+                     rpc_url: Optional[str] = None) -> RpcPool:
+    """
+    RpcPool from a connection's config, falling back to the network defaults. `rpc_urls`
+    and `write_rpc_urls` list the endpoints; `rpc_url` is always the first read endpoint
+    and the default write endpoint. `broadcast_fanout` needs at least two write
+    endpoints. A connection pointed at its own node does not pick up the network's
+    public endpoints.
+    """
+    primary = rpc_url or network_config["rpc_url"]
+    extra = config.get("rpc_urls")
+    if extra is None and primary == network_config["rpc_url"]:
+        extra = network_config.get("rpc_urls")
+    read_urls = [primary] + list(extra or [])
+    write_urls = config.get("write_rpc_urls") or network_config.get("write_rpc_urls") or [primary]
+    return RpcPool(
+        read_urls,
+        write_urls,
+        hedge_after=config.get("rpc_hedge_after", 0.3),
+        max_errors=config.get("rpc_max_errors", 3),
+        cooldown=config.get("rpc_cooldown", 30.0),
+        fan_out=config.get("broadcast_fanout", False)
+    )
@@ -0,0 +1,253 @@
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from eth_account import Account
+from eth_account._utils.signing import encode_transaction, serializable_unsigned_transaction_from_dict, to_eth_v
+from eth_account._utils.typed_transactions import TypedTransaction
+from eth_keys import keys
+from hexbytes import HexBytes
+
+logger = logging.getLogger("helpers.evm.signers")
+
+# Wallet id of the opt-in SONIC_PRIVATE_KEY signer; only reachable as the default signer
+LOCAL_SIGNER = "sonic-private-key"
+
+
+class SignerError(Exception):
+    """Raised when a wallet has no usable signer or a signer is misconfigured"""
+    pass
+
+
+class TransactionSigner(ABC):
+    """
+    Signs transaction dicts for one wallet and returns the raw signed bytes ready for
+    eth_sendRawTransaction. `address` is None when it is only known remotely (Privy);
+    callers then resolve it the usual way.
+    """
+
+    kind = "abstract"
+
+    @property
+    @abstractmethod
+    def address(self) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def sign(self, tx: Dict[str, Any]) -> bytes:
+        pass
+
+    async def asign(self, tx: Dict[str, Any]) -> bytes:
+        """Local signers take microseconds, so by default the async path just calls sign()"""
+        return self.sign(tx)
+
+    def _check_sender(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        tx = dict(tx)
+        sender = tx.pop("from", None)
+        if sender and self.address and sender.lower() != self.address.lower():
+            raise SignerError(f"Transaction is from {sender} but this signer holds {self.address}")
+        return tx
+
+
+class LocalKeySigner(TransactionSigner):
+    """Signs in-process with a private key held in memory (server-owned bot and treasury wallets)"""
+
+    kind = "local"
+
+    def __init__(self, private_key: str):
+        self._account = Account.from_key(private_key)
+
+    @property
+    def address(self) -> str:
+        return self._account.address
+
+    def sign(self, tx: Dict[str, Any]) -> bytes:
+        return bytes(self._account.sign_transaction(self._check_sender(tx)).rawTransaction)
+
+
+class SoftwareHsm:
+    """
+    Stand-in for a hardware security module or cloud KMS. Keys are loaded under a label
+    and never leave the object: callers only get addresses and signatures over 32-byte
+    digests, which is the interface real devices offer. `latency` adds a fixed delay per
+    signature to mimic a network-attached device.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._keys: Dict[str, keys.PrivateKey] = {}
+        self._lock = threading.Lock()
+
+    def import_key(self, label: str, private_key: str) -> str:
+        key = keys.PrivateKey(HexBytes(private_key))
+        with self._lock:
+            self._keys[label] = key
+        return key.public_key.to_checksum_address()
+
+    def _key(self, label: str) -> keys.PrivateKey:
+        key = self._keys.get(label)
+        if key is None:
+            raise SignerError(f"No key labelled {label!r} in the HSM")
+        return key
+
+    def public_address(self, label: str) -> str:
+        return self._key(label).public_key.to_checksum_address()
+
+    def sign_digest(self, label: str, digest: bytes) -> Tuple[int, int, int]:
+        """(recovery id, r, s) of a secp256k1 signature over `digest`"""
+        if self.latency:
+            time.sleep(self.latency)
+        return self._key(label).sign_msg_hash(digest).vrs
+
+
+class HsmSigner(TransactionSigner):
+    """
+    Signs through an HSM-style device that only signs digests: the transaction is
+    serialized and hashed here, and the device's (recovery id, r, s) is encoded back into
+    the raw transaction. Anything with public_address() and sign_digest() can stand in
+    for SoftwareHsm.
+    """
+
+    kind = "hsm"
+
+    def __init__(self, hsm, label: str):
+        self._hsm = hsm
+        self.label = label
+        self._address = hsm.public_address(label)
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    def sign(self, tx: Dict[str, Any]) -> bytes:
+        unsigned = serializable_unsigned_transaction_from_dict(self._check_sender(tx))
+        recovery_id, r, s = self._hsm.sign_digest(self.label, unsigned.hash())
+        # Typed transactions carry the bare y-parity; legacy ones the EIP-155 v
+        v = recovery_id if isinstance(unsigned, TypedTransaction) else to_eth_v(recovery_id, tx.get("chainId"))
+        return bytes(encode_transaction(unsigned, vrs=(v, r, s)))
+
+
+class PrivySigner(TransactionSigner):
+    """Signs through Privy's eth_signTransaction RPC, via the connection's existing Privy calls"""
+
+    kind = "privy"
+
+    def __init__(self, wallet_id: Optional[str], sign: Callable[[Dict, Optional[str]], bytes],
+                 asign: Optional[Callable[[Dict, Optional[str]], Awaitable[bytes]]] = None):
+        self.wallet_id = wallet_id
+        self._sign = sign
+        self._asign = asign
+
+    @property
+    def address(self) -> None:
+        return None
+
+    def sign(self, tx: Dict[str, Any]) -> bytes:
+        return self._sign(tx, self.wallet_id)
+
+    async def asign(self, tx: Dict[str, Any]) -> bytes:
+        if self._asign is None:
+            raise SignerError("No async Privy signing configured")
+        return await self._asign(tx, self.wallet_id)
+
+
+class SignerRegistry:
+    """
+    Which signer each wallet uses. Server-held wallets are built from a connection's
+    `signers` config:
+
+        "signers": {
+            "treasury": {"type": "local", "key_env": "TREASURY_PRIVATE_KEY"},
+            "mm-1": {"type": "hsm", "key_env": "MM1_PRIVATE_KEY"}
+        }
+
+        "default_signer": "mm-1"
+
+    `default_signer` names the server-held wallet that signs writes giving no wallet id
+    while PRIVY_WALLET_ID is unset, i.e. the agent's own writes. A wallet id that arrives
+    with a write (privy_wallet_id) always means a Privy wallet: naming a server-held
+    wallet raises SignerError, so a caller can't sign with a key the server holds.
+    """
+
+    def __init__(self, privy: Callable[[Optional[str]], TransactionSigner]):
+        self._privy = privy
+        self._signers: Dict[str, TransactionSigner] = {}
+        self.default: Optional[str] = None
+        self.hsm = SoftwareHsm()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def register(self, wallet_id: str, signer: TransactionSigner) -> TransactionSigner:
+        with self._lock:
+            self._signers[wallet_id] = signer
+        logger.info(f"Wallet {wallet_id} signs with the {signer.kind} signer ({signer.address})")
+        return signer
+
+    def configure(self, config: Dict[str, Dict[str, Any]], default: Optional[str] = None,
+                  hsm_latency: float = 0.0) -> None:
+        self.hsm.latency = hsm_latency
+        for wallet_id, spec in (config or {}).items():
+            kind = spec.get("type", "local")
+            # Keys only ever come from the environment, never from the agent JSON
+            private_key = os.getenv(spec.get("key_env", ""), "")
+            if not private_key:
+                raise SignerError(f"Signer for wallet {wallet_id} has no key (set {spec.get('key_env') or 'key_env'})")
+            if kind == "local":
+                self.register(wallet_id, LocalKeySigner(private_key))
+            elif kind == "hsm":
+                self.hsm.import_key(wallet_id, private_key)
+                self.register(wallet_id, HsmSigner(self.hsm, wallet_id))
+            else:
+                raise SignerError(f"Unknown signer type {kind!r} for wallet {wallet_id}")
+        if default and default not in self._signers:
+            raise SignerError(f"default_signer {default!r} is not one of the configured signers")
+        self.default = default
+
+    def get(self, wallet_id: Optional[str]) -> Optional[TransactionSigner]:
+        """
+        The server-held signer for a write naming `wallet_id`: the default one when no
+        wallet is named and PRIVY_WALLET_ID is unset, otherwise None (sign with Privy).
+        """
+        if wallet_id:
+            with self._lock:
+                held = wallet_id in self._signers
+            if held:
+                raise SignerError(f"Wallet {wallet_id} is held by the server and can't be named by a caller")
+            return None
+        if self.default and not os.getenv("PRIVY_WALLET_ID"):
+            return self._signers.get(self.default)
+        return None
+
+    def signer_for(self, wallet_id: Optional[str]) -> TransactionSigner:
+        return self.get(wallet_id) or self._privy(wallet_id)
+
+    def _record(self, kind: str, started: float) -> None:
+        with self._lock:
+            entry = self.stats.setdefault(kind, {"signatures": 0, "total_ms": 0.0})
+            entry["signatures"] += 1
+            entry["total_ms"] += (time.perf_counter() - started) * 1000
+
+    def sign(self, tx: Dict[str, Any], wallet_id: Optional[str]) -> bytes:
+        signer = self.signer_for(wallet_id)
+        started = time.perf_counter()
+        signed = signer.sign(tx)
+        self._record(signer.kind, started)
+        return signed
+
+    async def asign(self, tx: Dict[str, Any], wallet_id: Optional[str]) -> bytes:
+        signer = self.signer_for(wallet_id)
+        started = time.perf_counter()
+        signed = await signer.asign(tx)
+        self._record(signer.kind, started)
+        return signed
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            wallets = {wallet_id: {"type": signer.kind, "address": signer.address}
+                       for wallet_id, signer in self._signers.items()}
+            stats = {kind: {**entry, "avg_ms": round(entry["total_ms"] / entry["signatures"], 3)}
+                     for kind, entry in self.stats.items()}
+        return {"wallets": wallets, "default": self.default, "signing": stats}
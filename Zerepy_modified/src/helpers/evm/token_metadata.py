@@ -0,0 +1,196 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from web3 import Web3
+
+from src.constants.abi import ERC20_ABI
+
+logger = logging.getLogger("helpers.evm.token_metadata")
+
+
+@dataclass
+class TokenMetadata:
+    address: str
+    decimals: Optional[int] = None
+    symbol: Optional[str] = None
+
+
+class TokenMetadataRegistry:
+    """
+    Shared registry of immutable ERC-20 metadata (decimals, symbol).
+
+    Lookups go through an in-memory LRU backed by a small SQLite file, so a token's
+    decimals are read over RPC once per machine rather than on every quote and trade.
+    totalSupply does change, so it is only held in memory for `supply_ttl` seconds.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 2048, supply_ttl: float = 30.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.supply_ttl = supply_ttl
+        self._entries: "OrderedDict[Tuple[int, str], TokenMetadata]" = OrderedDict()
+        self._supply: Dict[Tuple[int, str], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"hits": 0, "db_hits": 0, "rpc_fetches": 0}
+        if db_path:
+            self._open_db()
+
+    def _open_db(self) -> None:
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_metadata ("
+                "chain_id INTEGER, address TEXT, decimals INTEGER, symbol TEXT, "
+                "PRIMARY KEY (chain_id, address))"
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Token metadata store unavailable, using memory only: {e}")
+            self._db = None
+
+    def _lookup(self, chain_id: int, address: str) -> Optional[TokenMetadata]:
+        """Memory, then SQLite. Caller must hold the lock."""
+        key = (chain_id, address.lower())
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT decimals, symbol FROM token_metadata WHERE chain_id = ? AND address = ?", key
+        ).fetchone()
+        if not row:
+            return None
+        self.stats["db_hits"] += 1
+        entry = TokenMetadata(address=Web3.to_checksum_address(address), decimals=row[0], symbol=row[1])
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: Tuple[int, str], entry: TokenMetadata) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def peek(self, chain_id: int, address: str) -> Optional[TokenMetadata]:
+        """Metadata already known locally, without touching the chain"""
+        with self._lock:
+            return self._lookup(chain_id, address)
+
+    def put(self, chain_id: int, address: str, decimals: Optional[int] = None, symbol: Optional[str] = None) -> TokenMetadata:
+        """Record metadata learned elsewhere (e.g. a batched read); missing fields are kept"""
+        key = (chain_id, address.lower())
+        with self._lock:
+            entry = self._lookup(chain_id, address) or TokenMetadata(address=Web3.to_checksum_address(address))
+            if decimals is not None:
+                entry.decimals = int(decimals)
+            if symbol is not None:
+                entry.symbol = symbol
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO token_metadata (chain_id, address, decimals, symbol) VALUES (?, ?, ?, ?)",
+                        (chain_id, key[1], entry.decimals, entry.symbol)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not persist token metadata for {address}: {e}")
+            return entry
+
+    def _contract(self, web3: Web3, address: str):
+        return web3.eth.contract(address=Web3.to_checksum_address(address), abi=ERC20_ABI)
+
+    def decimals(self, web3: Web3, chain_id: int, address: str) -> int:
+        """Token decimals, read over RPC only the first time a token is seen"""
+        with self._lock:
+            entry = self._lookup(chain_id, address)
+        if entry and entry.decimals is not None:
+            return entry.decimals
+        self.stats["rpc_fetches"] += 1
+        decimals = self._contract(web3, address).functions.decimals().call()
+        return self.put(chain_id, address, decimals=decimals).decimals
+
+    def symbol(self, web3: Web3, chain_id: int, address: str) -> Optional[str]:
+        """Token symbol, or None if the contract does not expose a string symbol"""
+        with self._lock:
+            entry = self._lookup(chain_id, address)
+        if entry and entry.symbol is not None:
+            return entry.symbol
+        self.stats["rpc_fetches"] += 1
+        try:
+            symbol = self._contract(web3, address).functions.symbol().call()
+        except Exception as e:
+            logger.debug(f"Could not read symbol for {address}: {e}")
+            return None
+        return self.put(chain_id, address, symbol=symbol).symbol
+
+    def get(self, web3: Web3, chain_id: int, address: str) -> TokenMetadata:
+        """Decimals and symbol for a token"""
+        self.decimals(web3, chain_id, address)
+        self.symbol(web3, chain_id, address)
+        with self._lock:
+            return self._lookup(chain_id, address)
+
+    def total_supply(self, web3: Web3, chain_id: int, address: str) -> int:
+        """Raw totalSupply, cached in memory for supply_ttl seconds"""
+        key = (chain_id, address.lower())
+        cached = self._supply.get(key)
+        if cached and time.time() - cached[1] < self.supply_ttl:
+            return cached[0]
+        supply = self._contract(web3, address).functions.totalSupply().call()
+        self._supply[key] = (supply, time.time())
+        return supply
+
+    def prefetch(self, web3: Web3, chain_id: int, addresses: Iterable[str], multicall=None) -> Dict[str, TokenMetadata]:
+        """
+        Fill the registry for several tokens, only reading the ones not known yet.
+        With a MulticallReader all missing decimals and symbols are read in one batch.
+        """
+        addresses = list(addresses)
+        if multicall is not None:
+            calls = []
+            for address in addresses:
+                known = self.peek(chain_id, address)
+                if not known or known.decimals is None:
+                    calls.append(multicall.erc20_decimals(address, label=("decimals", address)))
+                if not known or known.symbol is None:
+                    calls.append(multicall.erc20_symbol(address, label=("symbol", address)))
+            for result in multicall.execute(calls) if calls else []:
+                kind, address = result.label
+                if result.success:
+                    self.put(chain_id, address, **{kind: result.value})
+            return {address: self.peek(chain_id, address) for address in addresses}
+
+        result = {}
+        for address in addresses:
+            try:
+                result[address] = self.get(web3, chain_id, address)
+            except Exception as e:
+                logger.warning(f"Could not prefetch metadata for {address}: {e}")
+        return result
+
+
+_registry: Optional[TokenMetadataRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_token_registry(db_path: Optional[str] = ".zerepy/token_metadata.sqlite") -> TokenMetadataRegistry:
+    """Return the process-wide token metadata registry shared by all chain connections"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TokenMetadataRegistry(db_path=db_path)
+        return _registry
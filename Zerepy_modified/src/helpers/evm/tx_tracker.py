@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from web3.exceptions import TimeExhausted
+
+logger = logging.getLogger("helpers.evm.tx_tracker")
+
+PENDING = "pending"
+MINED = "mined"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+
+@dataclass
+class TxJob:
+    job_id: str
+    kind: str
+    tx_hash: str
+    wallet: Optional[str] = None
+    nonce: Optional[int] = None
+    status: str = PENDING
+    submitted_at: float = field(default_factory=time.time)
+    mined_at: Optional[float] = None
+    block_number: Optional[int] = None
+    gas_used: Optional[int] = None
+    explorer_url: Optional[str] = None
+    result: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # Every hash broadcast for this nonce, oldest first; tx_hash is the latest or the mined one
+    tx_hashes: List[str] = field(default_factory=list)
+    replacements: int = 0
+    # Write endpoint that accepted the first broadcast, when it was fanned out
+    broadcast_via: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status != PENDING
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class TxTracker:
+    """
+    Follows broadcast transactions in the background so callers can return as soon as a
+    transaction is sent.
+
+    Each tracked transaction becomes a job with its own id. Receipts come from the
+    connection's shared PendingTxWatcher; when one arrives the job's decoder runs on it
+    (for example to pull the TokenCreated address out of the logs) and the nonce is
+    released. Finished jobs are kept, oldest evicted first, so clients can read the
+    outcome later by job id or transaction hash.
+
+    Jobs tracked with a `replace` callback are fee-bumped when they sit unmined for
+    `stuck_blocks` blocks: the callback re-signs the same nonce with higher fees and
+    returns the new hash, which joins the job. Whichever hash is mined completes the
+    job and the others stop being watched.
+    """
+
+    def __init__(self, watcher, nonce_manager=None, timeout: float = 300.0, max_jobs: int = 10000,
+                 stuck_blocks: int = 10, max_replacements: int = 3):
+        self._watcher = watcher
+        self._nonce_manager = nonce_manager
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.stuck_blocks = stuck_blocks
+        self.max_replacements = max_replacements
+        self._jobs: "OrderedDict[str, TxJob]" = OrderedDict()
+        self._by_hash: Dict[str, str] = {}
+        self._decoders: Dict[str, Callable[[Any], Dict[str, Any]]] = {}
+        self._observers: Dict[str, Callable[[Any], None]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._replacers: Dict[str, Callable[[int], Any]] = {}
+        self._sent_block: Dict[str, Optional[int]] = {}
+        self._replacing: set = set()
+        self._replace_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tx-replace")
+        self._lock = threading.Lock()
+        self.stats = {"tracked": 0, "mined": 0, "failed": 0, "timeout": 0, "replaced": 0, "replace_errors": 0}
+        watcher.add_head_listener(self._on_head)
+
+    @staticmethod
+    def _normalize_hash(tx_hash) -> str:
+        tx_hash = tx_hash.hex() if isinstance(tx_hash, (bytes, bytearray)) else str(tx_hash)
+        tx_hash = tx_hash.lower()
+        return tx_hash if tx_hash.startswith("0x") else f"0x{tx_hash}"
+
+    def track(self, kind: str, tx_hash, wallet: Optional[str] = None, nonce: Optional[int] = None,
+              decode: Optional[Callable[[Any], Dict[str, Any]]] = None,
+              explorer_url: Optional[str] = None,
+              replace: Optional[Callable[[int], Any]] = None,
+              broadcast_via: Optional[str] = None,
+              observe: Optional[Callable[[Any], None]] = None) -> TxJob:
+        """
+        Start following a broadcast transaction and return its job. `decode` is called
+        with the receipt of a successful transaction and its dict becomes the job result.
+        `replace(attempt)` re-sends the same nonce with bumped fees and returns the new hash.
+        `observe` sees every receipt, reverted ones included (the gas cache learns from it).
+        """
+        job = TxJob(
+            job_id=uuid.uuid4().hex,
+            kind=kind,
+            tx_hash=self._normalize_hash(tx_hash),
+            wallet=wallet,
+            nonce=nonce,
+            explorer_url=explorer_url,
+            broadcast_via=broadcast_via
+        )
+        job.tx_hashes.append(job.tx_hash)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._by_hash[job.tx_hash] = job.job_id
+            self._futures[job.job_id] = Future()
+            if decode is not None:
+                self._decoders[job.job_id] = decode
+            if observe is not None:
+                self._observers[job.job_id] = observe
+            if replace is not None:
+                self._replacers[job.job_id] = replace
+                self._sent_block[job.job_id] = self._watcher.last_block
+            self.stats["tracked"] += 1
+            self._evict()
+        self._watch(job, job.tx_hash)
+        logger.debug(f"Tracking {kind} transaction {job.tx_hash} as job {job.job_id}")
+        return job
+
+    def _watch(self, job: TxJob, tx_hash: str) -> None:
+        self._watcher.watch(tx_hash, self.timeout, callback=lambda future: self._on_receipt(job, tx_hash, future))
+
+    def _evict(self) -> None:
+        # Only finished jobs are evicted; pending ones are still being followed
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:excess]:
+            job = self._jobs.pop(job_id)
+            self._futures.pop(job_id, None)
+            for tx_hash in job.tx_hashes:
+                self._by_hash.pop(tx_hash, None)
+
+    def get(self, job_id: str) -> Optional[TxJob]:
+        """A job by job id or transaction hash (any of its replacements)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._jobs.get(self._by_hash.get(self._normalize_hash(job_id), ""))
+            return job
+
+    def get_many(self, job_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Status of several jobs at once; unknown ids map to None"""
+        result = {}
+        for job_id in job_ids:
+            job = self.get(job_id)
+            result[job_id] = job.to_dict() if job else None
+        return result
+
+    def pending(self) -> List[TxJob]:
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.done]
+
+    def wait(self, job: TxJob, timeout: float = 120.0):
+        """
+        Block until the job is mined, whichever of its hashes made it, and return that
+        receipt (also for reverted transactions). Raises TimeExhausted otherwise.
+        """
+        try:
+            return self._futures[job.job_id].result(timeout)
+        except FutureTimeoutError:
+            raise TimeExhausted(f"Transaction {job.tx_hash} is not in the chain after {timeout} seconds")
+
+    def on_done(self, job: TxJob, callback: Callable[[TxJob], None]) -> None:
+        """Call `callback(job)` once the job is mined, failed or timed out (at once if it already is)"""
+        with self._lock:
+            future = self._futures.get(job.job_id)
+        if future is None:
+            callback(job)
+            return
+        future.add_done_callback(lambda _: callback(job))
+
+    async def wait_async(self, job: TxJob, timeout: float = 120.0):
+        """asyncio version of wait()"""
+        future = asyncio.wrap_future(self._futures[job.job_id])
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(f"Transaction {job.tx_hash} is not in the chain after {timeout} seconds")
+
+    def _finish(self, job: TxJob, status: str, receipt=None, error: Optional[str] = None) -> None:
+        result = {}
+        if receipt is not None and status == MINED:
+            decode = self._decoders.get(job.job_id)
+            if decode is not None:
+                try:
+                    result = decode(receipt) or {}
+                except Exception as e:
+                    logger.warning(f"Could not decode receipt of {job.tx_hash}: {e}")
+                    error = f"Receipt decoding failed: {e}"
+
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            if receipt is not None:
+                job.mined_at = time.time()
+                job.block_number = receipt.get("blockNumber")
+                job.gas_used = receipt.get("gasUsed")
+            self._decoders.pop(job.job_id, None)
+            self._replacers.pop(job.job_id, None)
+            self._sent_block.pop(job.job_id, None)
+            observe = self._observers.pop(job.job_id, None)
+            future = self._futures.get(job.job_id)
+            self.stats[status] += 1
+
+        if receipt is not None and observe is not None:
+            try:
+                observe(receipt)
+            except Exception as e:
+                logger.warning(f"Receipt observer failed for {job.tx_hash}: {e}")
+
+        if receipt is not None and self._nonce_manager and job.wallet and job.nonce is not None:
+            self._nonce_manager.complete(job.wallet, job.nonce)
+        if future is not None and not future.done():
+            if receipt is not None:
+                future.set_result(receipt)
+            else:
+                future.set_exception(TimeExhausted(error or f"Transaction {job.tx_hash} was not mined"))
+        logger.info(f"{job.kind} transaction {job.tx_hash} {status}")
+
+    def _on_receipt(self, job: TxJob, tx_hash: str, future) -> None:
+        if future.cancelled():
+            return
+        try:
+            receipt = future.result()
+        except Exception as e:
+            # An older hash timing out means nothing while a replacement is still pending
+            if not job.done and tx_hash == job.tx_hash:
+                self._finish(job, TIMEOUT, error=str(e))
+            return
+
+        with self._lock:
+            if job.done:
+                return
+            job.tx_hash = tx_hash
+            superseded = [other for other in job.tx_hashes if other != tx_hash]
+        # Only one transaction per nonce can be mined; the others are dead
+        for other in superseded:
+            self._watcher.forget(other)
+        if receipt.get("status") == 1:
+            self._finish(job, MINED, receipt)
+        else:
+            self._finish(job, FAILED, receipt, error="Transaction reverted on-chain")
+
+    def _on_head(self, block_number: int) -> None:
+        with self._lock:
+            stuck = []
+            for job_id, sent_block in self._sent_block.items():
+                if sent_block is None:
+                    self._sent_block[job_id] = block_number
+                elif block_number - sent_block >= self.stuck_blocks and job_id not in self._replacing:
+                    stuck.append(self._jobs[job_id])
+            for job in stuck:
+                self._replacing.add(job.job_id)
+        for job in stuck:
+            self._replace_pool.submit(self._replace, job, block_number)
+
+    def _replace(self, job: TxJob, block_number: int) -> None:
+        try:
+            with self._lock:
+                replace = self._replacers.get(job.job_id)
+                if replace is None or job.done:
+                    return
+                if job.replacements >= self.max_replacements:
+                    # Out of bumps: keep watching what was sent, without replacing again
+                    self._replacers.pop(job.job_id, None)
+                    self._sent_block.pop(job.job_id, None)
+                    return
+                attempt = job.replacements + 1
+            try:
+                new_hash = self._normalize_hash(replace(attempt))
+            except Exception as e:
+                # "nonce too low" and friends usually mean an earlier hash was just mined
+                self.stats["replace_errors"] += 1
+                logger.warning(f"Replacing {job.kind} transaction {job.tx_hash} failed: {e}")
+                with self._lock:
+                    if job.job_id in self._sent_block:
+                        self._sent_block[job.job_id] = block_number
+                return
+
+            with self._lock:
+                if job.done:
+                    return
+                logger.info(f"{job.kind} transaction {job.tx_hash} stuck for {self.stuck_blocks} blocks, replaced by {new_hash}")
+                job.replacements = attempt
+                job.tx_hash = new_hash
+                job.tx_hashes.append(new_hash)
+                self._by_hash[new_hash] = job.job_id
+                self._sent_block[job.job_id] = block_number
+                self.stats["replaced"] += 1
+            self._watch(job, new_hash)
+        finally:
+            with self._lock:
+                self._replacing.discard(job.job_id)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+
+from src.helpers.transport import get_transport
+
+logger = logging.getLogger("helpers.evm.tx_watcher")
+
+
+@dataclass
+class _Watch:
+    tx_hash: str
+    deadline: float
+    future: Future = field(default_factory=Future)
+
+
+class PendingTxWatcher:
+    """
+    One receipt poller shared by every pending transaction of a chain connection.
+
+    A single daemon thread follows the chain head with eth_blockNumber. Each time a new
+    block appears, the receipts of all pending hashes are requested in one JSON-RPC
+    batch POST (chunked by `batch_size`), and the futures of mined transactions are
+    resolved with web3-formatted receipts. RPC load therefore grows with blocks per
+    second rather than with the number of transactions being waited on. Nodes that
+    reject batch requests are queried hash by hash instead. With an RpcPool the polls
+    go through the pool's fastest healthy endpoint rather than `rpc_url` alone.
+    """
+
+    def __init__(self, rpc_url: str, poll_interval: float = 1.0, timeout: float = 300.0, batch_size: int = 100,
+                 pool=None):
+        self.rpc_url = rpc_url
+        self._pool = pool
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._watches: Dict[str, _Watch] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_block: Optional[int] = None
+        self._head_listeners: List[Callable[[int], None]] = []
+        self._early_head_listeners: List[Callable[[int], None]] = []
+        self._request_id = 0
+        self.stats = {"heads": 0, "batches": 0, "receipts_checked": 0, "resolved": 0, "timeouts": 0, "rpc_calls": 0}
+
+    @staticmethod
+    def _normalize_hash(tx_hash) -> str:
+        tx_hash = tx_hash.hex() if isinstance(tx_hash, (bytes, bytearray)) else str(tx_hash)
+        tx_hash = tx_hash.lower()
+        return tx_hash if tx_hash.startswith("0x") else f"0x{tx_hash}"
+
+    def watch(self, tx_hash, timeout: Optional[float] = None,
+              callback: Optional[Callable[[Future], None]] = None) -> Future:
+        """
+        Future resolved with the receipt of `tx_hash`, or failed with TimeExhausted after
+        `timeout` seconds. Callers watching the same hash share one future; `callback` is
+        attached to it as a done callback.
+        """
+        tx_hash = self._normalize_hash(tx_hash)
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            watch = self._watches.get(tx_hash)
+            if watch is None:
+                watch = _Watch(tx_hash, deadline)
+                self._watches[tx_hash] = watch
+            else:
+                watch.deadline = max(watch.deadline, deadline)
+            self._ensure_thread()
+        self._wakeup.set()
+        if callback is not None:
+            watch.future.add_done_callback(callback)
+        return watch.future
+
+    def wait(self, tx_hash, timeout: float = 120.0):
+        """Block until the receipt of `tx_hash` is available; drop-in for wait_for_transaction_receipt"""
+        try:
+            return self.watch(tx_hash, timeout).result(timeout)
+        except FutureTimeoutError:
+            raise TimeExhausted(f"Transaction {self._normalize_hash(tx_hash)} is not in the chain after {timeout} seconds")
+
+    async def wait_async(self, tx_hash, timeout: float = 120.0):
+        """asyncio version of wait()"""
+        future = asyncio.wrap_future(self.watch(tx_hash, timeout))
+        try:
+            # shield: a cancelled caller must not cancel the future other waiters share
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(f"Transaction {self._normalize_hash(tx_hash)} is not in the chain after {timeout} seconds")
+
+    def forget(self, tx_hash) -> None:
+        """Stop watching a hash that can no longer be mined (it was replaced); its future is cancelled"""
+        with self._lock:
+            watch = self._watches.pop(self._normalize_hash(tx_hash), None)
+        if watch is not None:
+            watch.future.cancel()
+
+    def add_head_listener(self, listener: Callable[[int], None], early: bool = False) -> None:
+        """
+        Call `listener(block_number)` on the watcher thread for every new head seen while
+        hashes are pending. Early listeners run before that block's receipts are handed
+        out (a read cache must be invalidated before waiters wake up), the others after.
+        """
+        (self._early_head_listeners if early else self._head_listeners).append(listener)
+
+    @property
+    def last_block(self) -> Optional[int]:
+        return self._last_block
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._watches)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="tx-watcher", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+
+    def _rpc(self, payload):
+        self.stats["rpc_calls"] += 1
+        if self._pool is not None:
+            return json.loads(self._pool.send(json.dumps(payload).encode()))
+        response = get_transport().post(self.rpc_url, json=payload, idempotent=True)
+        response.raise_for_status()
+        return response.json()
+
+    def _request(self, method: str, params: List[Any]) -> Dict[str, Any]:
+        self._request_id += 1
+        return {"jsonrpc": "2.0", "id": self._request_id, "method": method, "params": params}
+
+    def _block_number(self) -> int:
+        response = self._rpc(self._request("eth_blockNumber", []))
+        return int(response["result"], 16)
+
+    def _fetch_receipts(self, hashes: List[str]) -> Dict[str, Optional[dict]]:
+        receipts = {}
+        for start in range(0, len(hashes), self.batch_size):
+            chunk = hashes[start:start + self.batch_size]
+            batch = [self._request("eth_getTransactionReceipt", [tx_hash]) for tx_hash in chunk]
+            requests_by_id = {request["id"]: tx_hash for request, tx_hash in zip(batch, chunk)}
+            response = self._rpc(batch)
+            self.stats["batches"] += 1
+            if not isinstance(response, list):
+                # Batching is disabled on this node
+                logger.debug(f"Batch receipt request rejected ({response}), querying individually")
+                response = [{**self._rpc(request), "id": request["id"]} for request in batch]
+            for item in response:
+                tx_hash = requests_by_id.get(item.get("id"))
+                if tx_hash is not None and item.get("result"):
+                    receipts[tx_hash] = item["result"]
+            self.stats["receipts_checked"] += len(chunk)
+        return receipts
+
+    def _check(self) -> None:
+        with self._lock:
+            hashes = list(self._watches)
+        if not hashes:
+            return
+        receipts = self._fetch_receipts(hashes)
+        now = time.time()
+        resolved = []
+        with self._lock:
+            for tx_hash in hashes:
+                watch = self._watches.get(tx_hash)
+                if watch is None:
+                    continue
+                if tx_hash in receipts or watch.deadline < now:
+                    resolved.append(self._watches.pop(tx_hash))
+        # Futures are completed outside the lock because done callbacks run inline
+        for watch in resolved:
+            if watch.tx_hash in receipts:
+                self.stats["resolved"] += 1
+                watch.future.set_result(AttributeDict.recursive(receipt_formatter(receipts[watch.tx_hash])))
+            else:
+                self.stats["timeouts"] += 1
+                watch.future.set_exception(TimeExhausted(f"Transaction {watch.tx_hash} is not in the chain after its timeout"))
+
+    def _run(self) -> None:
+        while not self._stopped:
+            if not self.pending_count():
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                block = self._block_number()
+                if self._last_block is None or block > self._last_block:
+                    self._last_block = block
+                    self.stats["heads"] += 1
+                    for listener in self._early_head_listeners:
+                        listener(block)
+                    self._check()
+                    for listener in self._head_listeners:
+                        listener(block)
+                else:
+                    self._expire()
+            except Exception as e:
+                logger.warning(f"Receipt watcher poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def _expire(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [tx_hash for tx_hash, watch in self._watches.items() if watch.deadline < now]
+            expired = [self._watches.pop(tx_hash) for tx_hash in expired]
+        for watch in expired:
+            self.stats["timeouts"] += 1
+            watch.future.set_exception(TimeExhausted(f"Transaction {watch.tx_hash} is not in the chain after its timeout"))
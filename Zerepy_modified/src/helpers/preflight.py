@@ -0,0 +1,164 @@
+import asyncio
+import inspect
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger("helpers.preflight")
+
+# Shared by every pre-flight run; steps are short blocking I/O calls
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="preflight")
+
+
+class Preflight:
+    """
+    Dependency graph of the independent reads that precede signing a transaction.
+
+    Each step names the steps it needs; a step starts as soon as its dependencies have
+    finished and receives their results as positional arguments, so the graph takes as
+    long as its longest path instead of the sum of all steps. Per-step wall time is
+    recorded for the action result. If steps fail, the error of the first failing step
+    in declaration order is raised, so user-facing messages do not depend on timing.
+
+    With an RpcBatcher, the steps of each wave run as one batch group, so the RPC reads
+    of steps that become ready together go out in a single JSON-RPC batch POST.
+    """
+
+    def __init__(self, name: str = "preflight", batcher=None):
+        self.name = name
+        self._batcher = batcher
+        self._group = None
+        self._steps: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.after: Dict[str, float] = {}
+        self.elapsed = 0.0
+
+    def step(self, name: str, fn: Callable, *deps: str) -> "Preflight":
+        unknown = [dep for dep in deps if dep not in self._steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' depends on undeclared steps: {', '.join(unknown)}")
+        self._steps[name] = (fn, deps)
+        return self
+
+    def _ready(self, done: set, started: set) -> List[str]:
+        return [
+            name for name, (_, deps) in self._steps.items()
+            if name not in started and all(dep in done for dep in deps)
+        ]
+
+    def _timed(self, name: str, fn: Callable, args: List[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def _raise_first(self, errors: Dict[str, Exception]) -> None:
+        for name in self._steps:
+            if name in errors:
+                logger.debug(f"{self.name}: step '{name}' failed: {errors[name]}")
+                raise errors[name]
+
+    def run(self) -> Dict[str, Any]:
+        """Run the graph on the shared thread pool and return every step's result"""
+        start = time.perf_counter()
+        done, started, errors = set(), set(), {}
+        running = {}
+        self._group = self._batcher.group() if self._batcher is not None else None
+        while True:
+            if not errors:
+                ready = self._ready(done, started)
+                started.update(ready)
+                calls = [(self._timed, (name, self._steps[name][0], [self.results[dep] for dep in self._steps[name][1]]))
+                         for name in ready]
+                if self._group is not None:
+                    futures = self._group.submit_many(calls)
+                else:
+                    futures = [_executor.submit(fn, *args) for fn, args in calls]
+                running.update(zip(futures, ready))
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    self.results[name] = future.result()
+                    done.add(name)
+                except Exception as e:
+                    errors[name] = e
+        self.elapsed = (time.perf_counter() - start) * 1000
+        self._raise_first(errors)
+        return self.results
+
+    async def _atimed(self, name: str, fn: Callable, args: List[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    async def arun(self) -> Dict[str, Any]:
+        """Run the graph as asyncio tasks; steps may be plain functions or coroutines"""
+        start = time.perf_counter()
+        done, started, errors = set(), set(), {}
+        running = {}
+        while True:
+            if not errors:
+                for name in self._ready(done, started):
+                    fn, deps = self._steps[name]
+                    started.add(name)
+                    running[asyncio.ensure_future(self._atimed(name, fn, [self.results[dep] for dep in deps]))] = name
+            if not running:
+                break
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                name = running.pop(task)
+                try:
+                    self.results[name] = task.result()
+                    done.add(name)
+                except Exception as e:
+                    errors[name] = e
+        self.elapsed = (time.perf_counter() - start) * 1000
+        self._raise_first(errors)
+        return self.results
+
+    def measure(self, name: str, fn: Callable, *args, **kwargs) -> Any:
+        """Time a step that runs after the graph (approval, signing, receipt)"""
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.after[name] = (time.perf_counter() - start) * 1000
+
+    async def ameasure(self, name: str, awaitable) -> Any:
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.after[name] = (time.perf_counter() - start) * 1000
+
+    def report(self) -> Dict[str, Any]:
+        """Per-step milliseconds, the graph's wall time and what running it serially would have cost"""
+        report = {
+            "steps": {name: round(ms, 1) for name, ms in self.timings.items()},
+            "total_ms": round(self.elapsed, 1),
+            "serial_ms": round(sum(self.timings.values()), 1),
+            "after": {name: round(ms, 1) for name, ms in self.after.items()}
+        }
+        if self._group is not None:
+            report["rpc"] = {"requests": self._group.requests, "round_trips": self._group.round_trips}
+        return report
+
+    def summary(self) -> str:
+        """One-line timing breakdown for string action results"""
+        line = f"⏱️ Pre-flight {self.elapsed:.0f}ms (" + ", ".join(
+            f"{name} {ms:.0f}ms" for name, ms in self.timings.items()
+        ) + ")"
+        if self.after:
+            line += "; " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.after.items())
+        return line
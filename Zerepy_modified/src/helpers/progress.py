@@ -0,0 +1,49 @@
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger("helpers.progress")
+
+# Stages a write action passes through, in order
+ROUTED = "routed"
+APPROVED = "approved"
+SIGNED = "signed"
+BROADCAST = "broadcast"
+MINED = "mined"
+FAILED = "failed"
+
+Reporter = Callable[[str, Dict[str, Any]], None]
+
+_reporter: contextvars.ContextVar[Optional[Reporter]] = contextvars.ContextVar("progress_reporter", default=None)
+
+
+@contextmanager
+def reporting(reporter: Reporter) -> Iterator[None]:
+    """
+    Send the progress of whatever runs inside the block to `reporter(stage, details)`.
+    Being a context variable it follows asyncio tasks; sync code reached through
+    ConnectionManager.perform_action_async sees it too, since the caller's context is
+    carried into the worker thread.
+    """
+    token = _reporter.set(reporter)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
+
+
+def current() -> Optional[Reporter]:
+    """The active reporter, for callbacks that fire later on other threads (receipts)"""
+    return _reporter.get()
+
+
+def report(stage: str, reporter: Optional[Reporter] = None, **details: Any) -> None:
+    """Report a stage to `reporter`, or the active one; a no-op outside reporting()"""
+    reporter = reporter or _reporter.get()
+    if reporter is None:
+        return
+    try:
+        reporter(stage, details)
+    except Exception as e:
+        logger.warning(f"Progress reporter failed on {stage}: {e}")
@@ -0,0 +1,204 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("helpers.scheduler")
+
+RUNNING = "running"
+PAUSED = "paused"
+STOPPED = "stopped"
+
+
+@dataclass
+class ScheduledTask:
+    """
+    One recurring agent task. `run` returns a truthy value on success. The task runs
+    every `interval` seconds (a callable is asked again before each wait, so the
+    interval can follow the time of day), stretched or shrunk by up to `jitter` of
+    itself, and `retry_delay` seconds after a failure. A task with a `trigger` also
+    runs whenever that event is fired; with no interval it runs on triggers only.
+    """
+    name: str
+    run: Callable[[], Any]
+    interval: Optional[Any] = None
+    jitter: float = 0.1
+    trigger: Optional[str] = None
+    retry_delay: float = 60.0
+    initial_delay: Optional[float] = None
+
+    def next_delay(self, succeeded: bool = True) -> Optional[float]:
+        if not succeeded:
+            return self.retry_delay
+        interval = self.interval() if callable(self.interval) else self.interval
+        if interval is None:
+            return None
+        return max(0.0, interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+@dataclass
+class _Worker:
+    task: ScheduledTask
+    state: str = STOPPED
+    wake: threading.Event = field(default_factory=threading.Event)
+    thread: Optional[threading.Thread] = None
+    generation: int = 0
+    run_lock: threading.Lock = field(default_factory=threading.Lock)
+    triggered: bool = False
+    busy: bool = False
+    next_run: Optional[float] = None
+    runs: int = 0
+    failures: int = 0
+    last_run: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class TaskScheduler:
+    """
+    Runs each task on its own worker thread, so independent tasks overlap while a task
+    never overlaps itself. Workers block on an Event with the time left until their next
+    run as timeout: nothing polls, and an idle scheduler costs no CPU. start(), stop(),
+    pause() and fire() set the Event so the worker re-reads its state straight away.
+    """
+
+    def __init__(self, tasks: List[ScheduledTask]):
+        self._workers: Dict[str, _Worker] = {task.name: _Worker(task) for task in tasks}
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return any(worker.state != STOPPED for worker in self._workers.values())
+
+    def _worker(self, name: str) -> _Worker:
+        worker = self._workers.get(name)
+        if worker is None:
+            raise KeyError(f"Unknown task: {name}")
+        return worker
+
+    def start(self, name: Optional[str] = None) -> None:
+        """Start (or resume) one task, or all of them"""
+        for worker in [self._worker(name)] if name else list(self._workers.values()):
+            with self._lock:
+                if worker.state == PAUSED:
+                    worker.state = RUNNING
+                    worker.wake.set()
+                    continue
+                if worker.state == RUNNING:
+                    continue
+                # A fresh event and generation, so a stopped run still finishing cannot carry on
+                worker.state = RUNNING
+                worker.generation += 1
+                worker.wake = threading.Event()
+                worker.thread = threading.Thread(target=self._loop, args=(worker, worker.generation, worker.wake),
+                                                 name=f"task-{worker.task.name}", daemon=True)
+            worker.thread.start()
+            logger.info(f"Task {worker.task.name} started")
+
+    def pause(self, name: Optional[str] = None) -> None:
+        """Keep the worker but skip runs until start() is called again"""
+        for worker in [self._worker(name)] if name else list(self._workers.values()):
+            with self._lock:
+                if worker.state == RUNNING:
+                    worker.state = PAUSED
+                    worker.wake.set()
+                    logger.info(f"Task {worker.task.name} paused")
+
+    def stop(self, name: Optional[str] = None, timeout: float = 5.0) -> None:
+        """Stop workers; a run in progress is allowed to finish within `timeout`"""
+        workers = [self._worker(name)] if name else list(self._workers.values())
+        for worker in workers:
+            with self._lock:
+                worker.state = STOPPED
+                worker.wake.set()
+        for worker in workers:
+            if worker.thread and worker.thread is not threading.current_thread():
+                worker.thread.join(timeout)
+            logger.info(f"Task {worker.task.name} stopped")
+
+    def fire(self, event: str) -> List[str]:
+        """Wake every task triggered by `event`; returns their names"""
+        woken = []
+        with self._lock:
+            for worker in self._workers.values():
+                if worker.task.trigger == event and worker.state == RUNNING:
+                    worker.triggered = True
+                    worker.wake.set()
+                    woken.append(worker.task.name)
+        return woken
+
+    def _loop(self, worker: _Worker, generation: int, wake: threading.Event) -> None:
+        task = worker.task
+        delay = task.initial_delay
+        if delay is None:
+            # Spread the first runs out instead of firing every task at once
+            interval = task.next_delay()
+            delay = random.uniform(0, interval * task.jitter) if interval else None
+        worker.next_run = time.time() + delay if delay is not None else None
+
+        while True:
+            timeout = max(0.0, worker.next_run - time.time()) if worker.next_run is not None else None
+            wake.wait(timeout)
+            with self._lock:
+                wake.clear()
+                state = worker.state if worker.generation == generation else STOPPED
+                triggered, worker.triggered = worker.triggered, False
+            if state == STOPPED:
+                return
+            if state == PAUSED:
+                # Sleep until resumed or stopped, then wait out the rest of the interval
+                while worker.state == PAUSED and worker.generation == generation:
+                    wake.wait()
+                    wake.clear()
+                continue
+            if not triggered and (worker.next_run is None or time.time() < worker.next_run):
+                continue
+
+            succeeded = self._run(worker)
+            delay = task.next_delay(succeeded)
+            if worker.generation == generation:
+                worker.next_run = time.time() + delay if delay is not None else None
+
+    def _run(self, worker: _Worker) -> bool:
+        # A restarted task waits for a run left over from before the stop
+        with worker.run_lock:
+            started = time.time()
+            worker.busy = True
+            try:
+                succeeded = bool(worker.task.run())
+                worker.last_error = None if succeeded else "Task reported failure"
+            except Exception as e:
+                logger.error(f"Task {worker.task.name} failed: {e}")
+                succeeded = False
+                worker.last_error = str(e)
+            finally:
+                worker.busy = False
+            worker.runs += 1
+            worker.failures += 0 if succeeded else 1
+            worker.last_run = started
+            worker.last_duration = round(time.time() - started, 3)
+        return succeeded
+
+    def describe(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        tasks = []
+        for worker in self._workers.values():
+            task = worker.task
+            interval = task.interval() if callable(task.interval) else task.interval
+            tasks.append({
+                "name": task.name,
+                "state": worker.state,
+                "busy": worker.busy,
+                "interval": round(interval, 1) if interval is not None else None,
+                "trigger": task.trigger,
+                "next_run_in": round(max(0.0, worker.next_run - now), 1)
+                if worker.next_run is not None and worker.state == RUNNING else None,
+                "runs": worker.runs,
+                "failures": worker.failures,
+                "last_run": worker.last_run,
+                "last_duration": worker.last_duration,
+                "last_error": worker.last_error
+            })
+        return tasks
@@ -6,10 +6,10 @@ from solana.rpc.commitment import Confirmed
 
 from src.constants import LAMPORTS_PER_SOL
 from src.types import JupiterTokenData
+from src.helpers.transport import get_transport
 
 from solders.keypair import Keypair  # type: ignore
 from solders.pubkey import Pubkey  # type: ignore
-import requests
 
 from spl.token.async_client import AsyncToken
 from spl.token.instructions import get_associated_token_address
@@ -58,7 +58,7 @@ class SolanaReadHelper:
         url = f"https://api.jup.ag/price/v2?ids={token_address}"
 
         try:
-            with requests.get(url) as response:
+            with get_transport().get(url) as response:
                 response.raise_for_status()
                 data = response.json()
                 price = data.get("data", {}).get(token_address, {}).get("price")
@@ -75,7 +75,7 @@ class SolanaReadHelper:
         ticker: str,
     ) -> str:
         try:
-            response = requests.get(
+            response = get_transport().get(
                 f"https://api.dexscreener.com/latest/dex/search?q={ticker}"
             )
             response.raise_for_status()
@@ -110,7 +110,7 @@ class SolanaReadHelper:
         address: str,
     ) -> str:
         try:
-            response = requests.get(
+            response = get_transport().get(
                 "https://tokens.jup.ag/tokens?tags=verified",
                 headers={"Content-Type": "application/json"},
             )
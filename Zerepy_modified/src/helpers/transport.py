@@ -0,0 +1,255 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger("helpers.transport")
+
+# Methods that can be replayed without side effects
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Connection settings for one upstream host"""
+    pool_size: int = 10
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    retries: int = 2
+    backoff: float = 0.25
+    backoff_max: float = 8.0
+    http2: bool = False
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+DEFAULT_POLICIES = {
+    "aggregator-api.kyberswap.com": HostPolicy(pool_size=32, read_timeout=15.0),
+    "api.privy.io": HostPolicy(pool_size=32, read_timeout=15.0),
+    "api.dexscreener.com": HostPolicy(pool_size=4),
+    "api.jup.ag": HostPolicy(pool_size=4),
+    "tokens.jup.ag": HostPolicy(pool_size=2, read_timeout=60.0),
+    "discord.com": HostPolicy(pool_size=4),
+}
+
+
+class _Http2Response:
+    """The parts of requests.Response callers use, backed by an httpx response"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.content = response.content
+        self.text = response.text
+        self.url = str(response.url)
+        self.ok = response.status_code < 400
+
+    def json(self, **kwargs):
+        return self._response.json(**kwargs)
+
+    def iter_lines(self, **kwargs):
+        return iter(self.content.splitlines())
+
+    def close(self) -> None:
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HttpTransport:
+    """
+    Shared HTTP client for every REST integration.
+
+    Each upstream host gets its own keep-alive session sized by its HostPolicy, every
+    request gets default connect/read timeouts, and idempotent requests are retried on
+    connection errors and 429/5xx responses with jittered exponential backoff (honouring
+    Retry-After). Hosts whose policy enables http2 use an httpx client when httpx and h2
+    are installed, and fall back to HTTP/1.1 keep-alive otherwise.
+    """
+
+    def __init__(self, default_policy: HostPolicy = HostPolicy(), policies: Optional[Dict[str, HostPolicy]] = None):
+        self.default_policy = default_policy
+        self._policies: Dict[str, HostPolicy] = dict(DEFAULT_POLICIES if policies is None else policies)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._http2_clients: Dict[str, "httpx.Client"] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return (urlsplit(url).netloc or url).lower()
+
+    def policy(self, url: str) -> HostPolicy:
+        return self._policies.get(self._host(url), self.default_policy)
+
+    def configure(self, url: str, **overrides) -> HostPolicy:
+        """Override the policy of the host in `url` (a bare host works too); resets its session"""
+        host = self._host(url)
+        with self._lock:
+            policy = replace(self._policies.get(host, self.default_policy), **overrides)
+            self._policies[host] = policy
+            session = self._sessions.pop(host, None)
+            client = self._http2_clients.pop(host, None)
+        if session:
+            session.close()
+        if client:
+            client.close()
+        return policy
+
+    def session(self, url: str) -> requests.Session:
+        """The pooled keep-alive session for the host in `url`"""
+        host = self._host(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                policy = self._policies.get(host, self.default_policy)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.pool_size, pool_block=False)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+                self.stats[host] = {"requests": 0, "retries": 0, "errors": 0}
+            return session
+
+    def _http2_client(self, url: str, policy: HostPolicy):
+        if not policy.http2 or httpx is None:
+            return None
+        host = self._host(url)
+        with self._lock:
+            client = self._http2_clients.get(host)
+            if client is None:
+                try:
+                    client = httpx.Client(
+                        http2=True,
+                        limits=httpx.Limits(max_connections=policy.pool_size, max_keepalive_connections=policy.pool_size),
+                        timeout=httpx.Timeout(policy.read_timeout, connect=policy.connect_timeout)
+                    )
+                except ImportError:
+                    # httpx is installed without the h2 extra
+                    logger.warning(f"HTTP/2 requested for {host} but h2 is not installed, using HTTP/1.1")
+                    self._policies[host] = replace(policy, http2=False)
+                    return None
+                self._http2_clients[host] = client
+            return client
+
+    def _backoff(self, policy: HostPolicy, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), policy.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: uniform between 0 and the exponential ceiling
+        return random.uniform(0, min(policy.backoff_max, policy.backoff * 2 ** attempt))
+
+    def _send(self, method: str, url: str, policy: HostPolicy, **kwargs):
+        client = None if kwargs.get("stream") else self._http2_client(url, policy)
+        if client is None:
+            return self.session(url).request(method, url, **kwargs)
+
+        timeout = kwargs.pop("timeout")
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        kwargs.pop("stream", None)
+        if "data" in kwargs and isinstance(kwargs["data"], (str, bytes)):
+            kwargs["content"] = kwargs.pop("data")
+        elif kwargs.get("data") == {}:
+            kwargs.pop("data")
+        try:
+            return _Http2Response(client.request(method, url, timeout=timeout, **kwargs))
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e))
+
+    def request(self, method: str, url: str, retries: Optional[int] = None,
+                idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pooled session. `timeout` defaults to the host
+        policy. Only idempotent methods are retried unless `idempotent=True` is passed for
+        a request that is known to be safe to replay; `retries=0` disables retrying.
+        """
+        method = method.upper()
+        policy = self.policy(url)
+        kwargs.setdefault("timeout", policy.timeout)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        max_retries = (policy.retries if retries is None else retries) if idempotent else 0
+
+        self.session(url)
+        host_stats = self.stats[self._host(url)]
+        attempt = 0
+        while True:
+            host_stats["requests"] += 1
+            try:
+                response = self._send(method, url, policy, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    host_stats["errors"] += 1
+                    raise
+                delay = self._backoff(policy, attempt)
+                logger.debug(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                    return response
+                delay = self._backoff(policy, attempt, response.headers.get("Retry-After"))
+                logger.debug(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+            host_stats["retries"] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            clients = list(self._http2_clients.values())
+            self._sessions.clear()
+            self._http2_clients.clear()
+        for session in sessions:
+            session.close()
+        for client in clients:
+            client.close()
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the process-wide HTTP transport"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
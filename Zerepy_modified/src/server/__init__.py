@@ -1,7 +1,8 @@
-import uvicorn
-from .app import create_app
-
 def start_server(host: str = "0.0.0.0", port: int = 8000):
     """Start the ZerePy server"""
+    # Imported here so the server's helper modules can be used without loading the app
+    import uvicorn
+    from .app import create_app
+
     app = create_app()
-    uvicorn.run(app, host=host, port=port)
\ No newline at end of file
+    uvicorn.run(app, host=host, port=port)
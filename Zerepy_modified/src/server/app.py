@@ -1,13 +1,23 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import json
 import logging
+import os
 import asyncio
 import signal
-import threading
+import uuid
+import weakref
 from pathlib import Path
 from src.cli import ZerePyCLI
+from src.helpers import progress
+from src.helpers.scheduler import TaskScheduler
+from src.server.events import EventHub
+from src.server.executor import ActionExecutor, Overloaded
+from src.server.idempotency import IdempotencyConflict, IdempotencyStore
 from web3 import Web3
 
 logging.basicConfig(
@@ -16,12 +26,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger("server/app")
 
+# Most items a single /agent/actions request may carry
+MAX_BATCH_ACTIONS = 200
+
+class ActionFailed(Exception):
+    """
+    An action that ran but did not complete, for a reason a retry may not hit again (an
+    RPC, Privy or Kyber failure). It is not stored under the request's Idempotency-Key.
+    """
+    pass
+
 class ActionRequest(BaseModel):
     """Request model for agent actions"""
     connection: str
     action: str
     params: Optional[List[str]] = []
 
+class ActionBatchRequest(BaseModel):
+    """Request model for running several agent actions at once"""
+    actions: List[ActionRequest]
+    stream: Optional[bool] = False
+
+def prepare_action(action_request: ActionRequest) -> None:
+    """Validate and normalise action params before they reach the connection"""
+    # Special handling for swap actions to prevent silent failures
+    if action_request.connection == "sonic" and action_request.action == "swap":
+        logger.info(f"Processing swap request: {action_request.params}")
+        if len(action_request.params) < 5:
+            raise ValueError("Insufficient parameters for swap action")
+
+        # Convert addresses to checksum format
+        action_request.params[0] = Web3.to_checksum_address(action_request.params[0])
+        action_request.params[1] = Web3.to_checksum_address(action_request.params[1])
+
+class SwapQuoteRequest(BaseModel):
+    """Request model for Sonic swap quotes"""
+    token_in: str
+    token_out: str
+    amount: float
+
+class PortfolioRequest(BaseModel):
+    """Request model for Sonic portfolio snapshots"""
+    wallets: List[str]
+    tokens: Optional[List[str]] = None
+
+class TxStatusRequest(BaseModel):
+    """Request model for batch transaction status queries"""
+    ids: List[str]
+
 class ServerState:
     """Simple state management for the server"""
     _instance = None
@@ -30,9 +82,16 @@ class ServerState:
         if cls._instance is None:
             cls._instance = super(ServerState, cls).__new__(cls)
             cls._instance.cli = ZerePyCLI()
-            cls._instance.agent_running = False
-            cls._instance.agent_task = None
-            cls._instance._stop_event = threading.Event()
+            cls._instance.scheduler = None
+            cls._instance._executor = None
+            cls._instance._events = None
+            cls._instance._balance_sources = weakref.WeakSet()
+            # Outlives agent reloads: a retried write must not run again under a new agent
+            cls._instance.idempotency = IdempotencyStore(
+                max_entries=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+                ttl=float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600))),
+                store_path=os.getenv("IDEMPOTENCY_STORE", ".zerepy/idempotency.json") or None
+            )
             # Load default agent if available
             try:
                 cls._instance.cli._load_default_agent()
@@ -40,47 +99,59 @@ class ServerState:
                 logger.error(f"Failed to load default agent: {e}")
         return cls._instance
 
-    def _run_agent_loop(self):
-        """Run agent loop in a separate thread"""
-        try:
-            log_once = False
-            while not self._stop_event.is_set():
-                if self.cli.agent:
-                    try:
-                        if not log_once:
-                            logger.info("Loop logic not implemented")
-                            log_once = True
-
-                    except Exception as e:
-                        logger.error(f"Error in agent action: {e}")
-                        if self._stop_event.wait(timeout=30):
-                            break
-        except Exception as e:
-            logger.error(f"Error in agent loop thread: {e}")
-        finally:
-            self.agent_running = False
-            logger.info("Agent loop stopped")
+    @property
+    def agent_running(self) -> bool:
+        return self.scheduler is not None and self.scheduler.running
 
-    async def start_agent_loop(self):
-        """Start the agent loop in background thread"""
+    @property
+    def executor(self) -> ActionExecutor:
+        """Bounded per-connection lanes for the loaded agent's actions"""
+        if self._executor is None:
+            self._executor = ActionExecutor(self.cli.agent.connection_manager)
+        return self._executor
+
+    def reset_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def events(self) -> EventHub:
+        """Streaming fan-out; first used from a request handler, so it binds to the server's loop"""
+        if self._events is None:
+            self._events = EventHub(asyncio.get_running_loop())
+        return self._events
+
+    def publish_balances(self, connection) -> None:
+        """Forward a connection's balance updates to wallet topics (once per connection object)"""
+        if connection in self._balance_sources:
+            return
+        events = self.events
+        connection.add_balance_listener(
+            lambda update: events.publish(f"wallet:{update['address'].lower()}", "balance", update)
+        )
+        self._balance_sources.add(connection)
+
+    async def get_scheduler(self) -> TaskScheduler:
+        """The loaded agent's task scheduler, built on first use"""
         if not self.cli.agent:
             raise ValueError("No agent loaded")
-        
+        if self.scheduler is None:
+            # Setting up the LLM provider may call out to it, so keep it off the event loop
+            self.scheduler = TaskScheduler(await asyncio.to_thread(self.cli.agent.scheduled_tasks))
+        return self.scheduler
+
+    async def start_agent_loop(self):
+        """Start every agent task on its own schedule"""
         if self.agent_running:
             raise ValueError("Agent already running")
-
-        self.agent_running = True
-        self._stop_event.clear()
-        self.agent_task = threading.Thread(target=self._run_agent_loop)
-        self.agent_task.start()
+        scheduler = await self.get_scheduler()
+        scheduler.start()
 
     async def stop_agent_loop(self):
-        """Stop the agent loop"""
-        if self.agent_running:
-            self._stop_event.set()
-            if self.agent_task:
-                self.agent_task.join(timeout=5)
-            self.agent_running = False
+        """Stop every agent task, letting runs in progress finish"""
+        if self.scheduler is not None:
+            await asyncio.to_thread(self.scheduler.stop)
 
 class ZerePyServer:
     def __init__(self):
@@ -89,6 +160,26 @@ class ZerePyServer:
         self.setup_routes()
 
     def setup_routes(self):
+        @self.app.on_event("startup")
+        async def warm_caches():
+            """Warm the Privy wallet cache in the background so the first trades skip the lookup"""
+            if not self.state.cli.agent:
+                return
+            sonic = self.state.cli.agent.connection_manager.connections.get("sonic")
+            if sonic:
+                asyncio.create_task(asyncio.to_thread(sonic.warm_privy_wallets))
+
+        @self.app.on_event("shutdown")
+        async def close_clients():
+            """Stop agent tasks and close pooled async HTTP sessions"""
+            await self.state.stop_agent_loop()
+            self.state.reset_executor()
+            if not self.state.cli.agent:
+                return
+            sonic = self.state.cli.agent.connection_manager.connections.get("sonic")
+            if sonic and sonic._async_client is not None:
+                await sonic._async_client.close()
+
         @self.app.get("/")
         async def root():
             """Server status endpoint"""
@@ -116,6 +207,10 @@ class ZerePyServer:
         async def load_agent(name: str):
             """Load a specific agent"""
             try:
+                # The running tasks belong to the previous agent
+                await self.state.stop_agent_loop()
+                self.state.scheduler = None
+                self.state.reset_executor()
                 self.state.cli._load_agent_from_file(name)
                 return {
                     "status": "success",
@@ -142,37 +237,273 @@ class ZerePyServer:
                 raise HTTPException(status_code=500, detail=str(e))
 
         @self.app.post("/agent/action")
-        async def agent_action(action_request: ActionRequest):
-            """Execute a single agent action"""
+        async def agent_action(action_request: ActionRequest,
+                               idempotency_key: Optional[str] = Header(None),
+                               x_action_id: Optional[str] = Header(None)):
+            """
+            Execute a single agent action. Writes sent with an Idempotency-Key header run
+            at most once per key: retries wait for or replay the first outcome. Only
+            successes and rejected requests are kept; a run that failed frees the key.
+            Progress is published to the action:<id> stream of /events, where the id is
+            the X-Action-Id header, else the Idempotency-Key, else a generated one
+            (returned in the X-Action-Id response header).
+            """
             if not self.state.cli.agent:
                 raise HTTPException(status_code=400, detail="No agent loaded")
-            
+
+            action_id = x_action_id or idempotency_key or uuid.uuid4().hex
+            events = self.state.events
+            topic = f"action:{action_id}"
+            about = {"action_id": action_id, "connection": action_request.connection, "action": action_request.action}
+
+            def report(stage, details):
+                # Called from worker and watcher threads as well as the loop
+                data = {**about, "stage": stage, **details}
+                events.publish(topic, "progress", data, keep=True)
+                if details.get("wallet"):
+                    events.publish(f"wallet:{details['wallet'].lower()}", "progress", data)
+
+            async def execute():
+                # Only completed outcomes are returned, and so stored under an Idempotency-Key:
+                # a success or a request that can never succeed. Anything else raises, which
+                # frees the key for a retry; Overloaded too, as the action never ran.
+                try:
+                    prepare_action(action_request)
+                except Exception as e:
+                    logger.error(f"Action rejected: {str(e)}")
+                    events.publish(topic, "result", {**about, "status": "error", "code": 400, "detail": str(e)}, keep=True)
+                    return 400, {"detail": str(e)}
+
+                try:
+                    with progress.reporting(report):
+                        result = await self.state.executor.perform(
+                            action_request.connection,
+                            action_request.action,
+                            action_request.params
+                        )
+                except Overloaded as e:
+                    events.publish(topic, "result", {**about, "status": "error", "code": 429, "detail": str(e)}, keep=True)
+                    raise
+                except Exception as e:
+                    logger.error(f"Action failed: {str(e)}")
+                    events.publish(topic, "result", {**about, "status": "error", "code": 400, "detail": str(e)}, keep=True)
+                    raise ActionFailed(str(e)) from e
+
+                if result is None:
+                    # The connection logged why (node, Privy or Kyber trouble); a retry may succeed
+                    detail = "Swap failed silently - check token approval and balance"
+                    events.publish(topic, "result", {**about, "status": "error", "code": 400, "detail": detail}, keep=True)
+                    raise ActionFailed(detail)
+
+                events.publish(topic, "result", {**about, "status": "success", "result": result}, keep=True)
+                return 200, {"status": "success", "result": result}
+
+            replayed = False
+            try:
+                if idempotency_key and not self.state.cli.agent.connection_manager.is_read_only(
+                        action_request.connection, action_request.action):
+                    fingerprint = IdempotencyStore.fingerprint(
+                        action_request.connection, action_request.action, action_request.params)
+                    status_code, body, replayed = await self.state.idempotency.run(idempotency_key, fingerprint, execute)
+                    if replayed:
+                        logger.info(f"Replaying {action_request.action} for Idempotency-Key {idempotency_key}")
+                else:
+                    status_code, body = await execute()
+            except Overloaded as e:
+                logger.warning(str(e))
+                raise HTTPException(status_code=429, detail=str(e),
+                                    headers={"Retry-After": str(e.retry_after), "X-Action-Id": action_id})
+            except IdempotencyConflict as e:
+                logger.warning(f"Idempotency-Key {e.key}: {e}")
+                raise HTTPException(status_code=409, detail=str(e))
+            except ActionFailed as e:
+                raise HTTPException(status_code=400, detail=str(e), headers={"X-Action-Id": action_id})
+
+            headers = {"X-Action-Id": action_id}
+            if replayed:
+                headers["Idempotent-Replayed"] = "true"
+            if status_code != 200:
+                raise HTTPException(status_code=status_code, detail=body["detail"], headers=headers)
+            return JSONResponse(jsonable_encoder(body), headers=headers)
+
+        @self.app.post("/agent/actions")
+        async def agent_actions(batch_request: ActionBatchRequest):
+            """
+            Run several read-only actions concurrently, each under the same lane limits as
+            /agent/action. Returns per-item results and errors in request order, or with
+            stream=true one NDJSON line per item as it completes (each carries its index).
+            Writes are refused item by item: they go to /agent/action, which keys them
+            with an Idempotency-Key and reports their progress on /events.
+            """
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+            if len(batch_request.actions) > MAX_BATCH_ACTIONS:
+                raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ACTIONS} actions per request")
+
+            manager = self.state.cli.agent.connection_manager
+            items, invalid = [], {}
+            for index, action_request in enumerate(batch_request.actions):
+                try:
+                    if not manager.is_read_only(action_request.connection, action_request.action):
+                        raise ValueError(f"{action_request.action} is a write; send it to /agent/action")
+                    prepare_action(action_request)
+                except Exception as e:
+                    invalid[index] = {"index": index, "status": "error", "code": 400, "detail": str(e)}
+                items.append((action_request.connection, action_request.action, action_request.params))
+            runnable = [index for index in range(len(items)) if index not in invalid]
+
+            async def outcomes():
+                for outcome in invalid.values():
+                    yield outcome
+                async for outcome in self.state.executor.run_batch([items[index] for index in runnable]):
+                    # run_batch numbers the runnable items; map back to the request's positions
+                    yield {**outcome, "index": runnable[outcome["index"]]}
+
+            if batch_request.stream:
+                async def ndjson():
+                    async for outcome in outcomes():
+                        yield json.dumps(outcome, default=str) + "\n"
+                return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+            results = [outcome async for outcome in outcomes()]
+            results.sort(key=lambda outcome: outcome["index"])
+            return {"status": "success", "results": results}
+
+        @self.app.get("/events")
+        async def event_stream(request: Request,
+                               action: List[str] = Query(default=[]),
+                               wallet: List[str] = Query(default=[]),
+                               connection: str = "sonic"):
+            """
+            Server-Sent Events for the given action ids and wallets (Privy wallet ids or
+            addresses), e.g. /events?action=<id>&wallet=<id>. Streams `progress` events
+            (stages routed, approved, signed, broadcast, mined or failed), a `result` event
+            per action and `balance` events whenever a wallet's balances change; a wallet's
+            current balances are sent first once known.
+            """
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+            if not action and not wallet:
+                raise HTTPException(status_code=400, detail="Name at least one action or wallet")
+
+            source = self.state.cli.agent.connection_manager.connections.get(connection)
+            if wallet and not hasattr(source, "watch_wallet"):
+                raise HTTPException(status_code=400, detail=f"Connection {connection} has no wallet stream")
+
+            if wallet:
+                self.state.publish_balances(source)
+            addresses = []
+            try:
+                for name in wallet:
+                    # Privy wallet ids may need a lookup, so resolve off the loop
+                    addresses.append(await asyncio.to_thread(source.watch_wallet, name))
+            except Exception as e:
+                for address in addresses:
+                    source.unwatch_wallet(address)
+                raise HTTPException(status_code=400, detail=f"Could not watch wallet: {e}")
+
+            events = self.state.events
+            subscription = events.subscribe(
+                [f"action:{action_id}" for action_id in action] +
+                [f"wallet:{address.lower()}" for address in addresses]
+            )
+            for address in addresses:
+                latest = source.latest_balances(address)
+                if latest is not None:
+                    events.send(subscription, "balance", {"topic": f"wallet:{address.lower()}", **latest})
+
+            async def frames():
+                try:
+                    async for frame in subscription.frames():
+                        if await request.is_disconnected():
+                            break
+                        yield frame
+                finally:
+                    events.unsubscribe(subscription)
+                    for address in addresses:
+                        source.unwatch_wallet(address)
+
+            return StreamingResponse(frames(), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        @self.app.get("/agent/queues")
+        async def action_queues():
+            """Queue depth, wait and service times of every action lane, for capacity planning"""
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+            return {"status": "success", "lanes": self.state.executor.metrics(),
+                    "idempotency": self.state.idempotency.metrics(),
+                    "events": self.state.events.metrics()}
+
+        @self.app.post("/sonic/quote")
+        async def sonic_swap_quote(quote_request: SwapQuoteRequest):
+            """Quote a swap and return a quote id that /agent/action swap can execute as-is"""
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+
+            sonic = self.state.cli.agent.connection_manager.connections.get("sonic")
+            if not sonic:
+                raise HTTPException(status_code=400, detail="Sonic connection not configured")
+
+            try:
+                result = await sonic.async_client.get_swap_quote(
+                    Web3.to_checksum_address(quote_request.token_in),
+                    Web3.to_checksum_address(quote_request.token_out),
+                    quote_request.amount
+                )
+                return {"status": "success", "result": json.loads(result)["result"]}
+            except Exception as e:
+                logger.error(f"Swap quote failed: {str(e)}")
+                raise HTTPException(status_code=400, detail=str(e))
+
+        @self.app.post("/sonic/portfolio")
+        async def sonic_portfolio(portfolio_request: PortfolioRequest):
+            """Balances, S value and weights for several wallets, read at a single block"""
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+
+            sonic = self.state.cli.agent.connection_manager.connections.get("sonic")
+            if not sonic:
+                raise HTTPException(status_code=400, detail="Sonic connection not configured")
+
             try:
-                # Special handling for swap actions to prevent silent failures
-                if action_request.connection == "sonic" and action_request.action == "swap":
-                    logger.info(f"Processing swap request: {action_request.params}")
-                    if len(action_request.params) < 5:
-                        raise ValueError("Insufficient parameters for swap action")
-                    
-                    # Convert addresses to checksum format
-                    action_request.params[0] = Web3.to_checksum_address(action_request.params[0])
-                    action_request.params[1] = Web3.to_checksum_address(action_request.params[1])
-                
                 result = await asyncio.to_thread(
-                    self.state.cli.agent.perform_action,
-                    connection=action_request.connection,
-                    action=action_request.action,
-                    params=action_request.params
+                    sonic.portfolio_snapshot,
+                    portfolio_request.wallets,
+                    portfolio_request.tokens
                 )
-                
-                if result is None:
-                    raise ValueError("Swap failed silently - check token approval and balance")
-                    
                 return {"status": "success", "result": result}
             except Exception as e:
-                logger.error(f"Action failed: {str(e)}")
+                logger.error(f"Portfolio snapshot failed: {str(e)}")
                 raise HTTPException(status_code=400, detail=str(e))
 
+        @self.app.get("/tx/{job_id}")
+        async def tx_status(job_id: str):
+            """Status and decoded result of a transaction sent with wait=false, by job id or tx hash"""
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+
+            sonic = self.state.cli.agent.connection_manager.connections.get("sonic")
+            if not sonic:
+                raise HTTPException(status_code=400, detail="Sonic connection not configured")
+
+            job = sonic._tracker.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail=f"Unknown job or transaction: {job_id}")
+            return {"status": "success", "result": job.to_dict()}
+
+        @self.app.post("/tx/status")
+        async def tx_status_batch(status_request: TxStatusRequest):
+            """Status of several tracked transactions at once; unknown ids map to null"""
+            if not self.state.cli.agent:
+                raise HTTPException(status_code=400, detail="No agent loaded")
+
+            sonic = self.state.cli.agent.connection_manager.connections.get("sonic")
+            if not sonic:
+                raise HTTPException(status_code=400, detail="Sonic connection not configured")
+
+            return {"status": "success", "result": sonic._tracker.get_many(status_request.ids)}
+
         @self.app.post("/agent/start")
         async def start_agent():
             """Start the agent loop"""
@@ -194,6 +525,40 @@ class ZerePyServer:
             except Exception as e:
                 raise HTTPException(status_code=400, detail=str(e))
 
+        @self.app.get("/agent/tasks")
+        async def list_tasks():
+            """State, schedule and last outcome of every agent task"""
+            try:
+                scheduler = await self.state.get_scheduler()
+                return {"status": "success", "tasks": scheduler.describe()}
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        @self.app.post("/agent/tasks/{name}/{command}")
+        async def control_task(name: str, command: str):
+            """Start, stop or pause a single agent task (start also resumes a paused one)"""
+            if command not in ("start", "stop", "pause"):
+                raise HTTPException(status_code=404, detail=f"Unknown task command: {command}")
+            try:
+                scheduler = await self.state.get_scheduler()
+                if command == "stop":
+                    await asyncio.to_thread(scheduler.stop, name)
+                else:
+                    getattr(scheduler, command)(name)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e.args[0]))
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            task = next(task for task in scheduler.describe() if task["name"] == name)
+            return {"status": "success", "task": task}
+
+        @self.app.post("/agent/triggers/{event}")
+        async def fire_trigger(event: str):
+            """Run every running task whose "trigger" is `event` now"""
+            if self.state.scheduler is None:
+                raise HTTPException(status_code=400, detail="Agent tasks are not running")
+            return {"status": "success", "tasks": self.state.scheduler.fire(event)}
+
 def create_app():
     server = ZerePyServer()
     return server.app
\ No newline at end of file
@@ -1,5 +1,6 @@
+import json
 import requests
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
 class ZerePyClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
@@ -32,14 +33,57 @@ class ZerePyClient:
         """List available connections"""
         return self._make_request("GET", "/connections")
 
-    def perform_action(self, connection: str, action: str, params: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Execute an agent action"""
+    def perform_action(self, connection: str, action: str, params: Optional[List[str]] = None,
+                       idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Execute an agent action; retries of a write with the same idempotency_key run it only once"""
         data = {
             "connection": connection,
             "action": action,
             "params": params or []
         }
-        return self._make_request("POST", "/agent/action", json=data)
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return self._make_request("POST", "/agent/action", json=data, headers=headers)
+
+    def perform_actions(self, actions: List[Tuple[str, str, Optional[List[str]]]]) -> List[Dict[str, Any]]:
+        """Execute several read-only (connection, action, params) at once; per-item outcomes in order"""
+        data = {"actions": [{"connection": c, "action": a, "params": p or []} for c, a, p in actions]}
+        return self._make_request("POST", "/agent/actions", json=data).get("results", [])
+
+    def stream_actions(self, actions: List[Tuple[str, str, Optional[List[str]]]]) -> Iterator[Dict[str, Any]]:
+        """Like perform_actions, but yield each outcome as soon as the server finishes it"""
+        data = {"actions": [{"connection": c, "action": a, "params": p or []} for c, a, p in actions],
+                "stream": True}
+        url = f"{self.base_url}/agent/actions"
+        try:
+            with requests.post(url, json=data, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {str(e)}")
+
+    def stream_events(self, actions: Optional[List[str]] = None,
+                      wallets: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Follow /events: yields {"event": ..., **data} for action progress and wallet balance changes"""
+        params = {"action": actions or [], "wallet": wallets or []}
+        url = f"{self.base_url}/events"
+        try:
+            with requests.get(url, params=params, stream=True) as response:
+                response.raise_for_status()
+                event = "message"
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        yield {"event": event, **json.loads(line[5:])}
+                        event = "message"
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {str(e)}")
+
+    def get_queues(self) -> Dict[str, Any]:
+        """Queue depth and wait times of the server's action lanes"""
+        return self._make_request("GET", "/agent/queues").get("lanes", {})
 
     def start_agent(self) -> Dict[str, Any]:
         """Start the agent loop"""
@@ -47,4 +91,24 @@ class ZerePyClient:
 
     def stop_agent(self) -> Dict[str, Any]:
         """Stop the agent loop"""
-        return self._make_request("POST", "/agent/stop")
\ No newline at end of file
+        return self._make_request("POST", "/agent/stop")
+
+    def list_tasks(self) -> List[Dict[str, Any]]:
+        """List agent tasks with their schedule and state"""
+        return self._make_request("GET", "/agent/tasks").get("tasks", [])
+
+    def start_task(self, name: str) -> Dict[str, Any]:
+        """Start or resume a single agent task"""
+        return self._make_request("POST", f"/agent/tasks/{name}/start")
+
+    def stop_task(self, name: str) -> Dict[str, Any]:
+        """Stop a single agent task"""
+        return self._make_request("POST", f"/agent/tasks/{name}/stop")
+
+    def pause_task(self, name: str) -> Dict[str, Any]:
+        """Pause a single agent task"""
+        return self._make_request("POST", f"/agent/tasks/{name}/pause")
+
+    def fire_trigger(self, event: str) -> Dict[str, Any]:
+        """Run the tasks triggered by an event now"""
+        return self._make_request("POST", f"/agent/triggers/{event}")
@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import json
+import logging
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("server/events")
+
+
+class Subscription:
+    """
+    One streaming client's view of the hub: a bounded queue of ready-to-send SSE frames.
+    A client that falls `queue_size` frames behind loses its oldest frames (counted in
+    `dropped`) rather than slowing the hub or other clients down.
+    """
+
+    def __init__(self, topics: Iterable[str], queue_size: int):
+        self.topics = list(topics)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def push(self, frame: str) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(frame)
+
+    async def frames(self, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """Frames as they arrive, with an SSE comment every `heartbeat` idle seconds to keep proxies open"""
+        while True:
+            try:
+                yield await asyncio.wait_for(self._queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+
+class EventHub:
+    """
+    Fan-out of server events to Server-Sent Events clients, by topic:
+
+        action:<action id>   progress stages of one /agent/action call and its result
+        wallet:<address>     balance changes and action progress of one wallet
+
+    publish() may be called from any thread (action workers, the receipt watcher, the
+    balance watcher); the fan-out itself runs on the server's event loop. Each event is
+    serialized once into an SSE frame that every subscriber of the topic shares, so the
+    cost per extra client is one queue append. Topics published with keep=True retain
+    their last `history` frames, replayed to clients that subscribe after the action
+    started; at most `max_topics` such topics are kept.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int = 256, history: int = 32,
+                 max_topics: int = 1024):
+        self._loop = loop
+        self.queue_size = queue_size
+        self.history = history
+        self.max_topics = max_topics
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def publish(self, topic: str, event: str, data: Dict[str, Any], keep: bool = False) -> None:
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._fanout(topic, event, data, keep)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._fanout, topic, event, data, keep)
+
+    def _fanout(self, topic: str, event: str, data: Dict[str, Any], keep: bool) -> None:
+        subscribers = self._subscribers.get(topic)
+        if not subscribers and not keep:
+            return
+        payload = json.dumps({"topic": topic, **data}, default=str)
+        frame = f"id: {next(self._ids)}\nevent: {event}\ndata: {payload}\n\n"
+        self.stats["published"] += 1
+        if keep:
+            frames = self._history.get(topic)
+            if frames is None:
+                frames = self._history[topic] = deque(maxlen=self.history)
+                while len(self._history) > self.max_topics:
+                    self._history.popitem(last=False)
+            frames.append(frame)
+        for subscription in subscribers or ():
+            dropped = subscription.dropped
+            subscription.push(frame)
+            self.stats["delivered"] += 1
+            self.stats["dropped"] += subscription.dropped - dropped
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Must be called on the event loop; replays the kept frames of the topics first"""
+        subscription = Subscription(topics, self.queue_size)
+        replay: List[str] = []
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+            replay.extend(self._history.get(topic, ()))
+        # Frame ids are increasing, so this restores publication order across topics
+        for frame in sorted(replay, key=lambda frame: int(frame.split("\n", 1)[0][4:])):
+            subscription.push(frame)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def send(self, subscription: Subscription, event: str, data: Dict[str, Any]) -> None:
+        """Queue an event for one subscriber only (the current state when it joins)"""
+        subscription.push(f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n")
+
+    def metrics(self) -> Dict[str, Any]:
+        clients = {subscription for subscribers in self._subscribers.values() for subscription in subscribers}
+        return {**self.stats, "clients": len(clients), "topics": len(self._subscribers),
+                "kept_topics": len(self._history)}
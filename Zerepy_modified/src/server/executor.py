@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import math
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("server/executor")
+
+READ = "read"
+WRITE = "write"
+
+# Lane sizes when a connection's config has no "executor" block
+DEFAULT_LANES = {
+    READ: {"limit": 16, "queue": 256},
+    WRITE: {"limit": 4, "queue": 64},
+}
+
+
+class Overloaded(Exception):
+    """A lane's queue is full; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Too many queued actions for {lane}, retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Lane:
+    """
+    A bounded slice of server capacity: at most `limit` actions run at once, on the
+    lane's own threads when they are sync, and at most `queue` more wait for a slot.
+    Past that, run() raises Overloaded instead of queueing without bound. Wait and
+    service times of recent actions are kept for metrics and the Retry-After estimate.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = queue
+        self._slots = asyncio.Semaphore(limit)
+        self._threads = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"action-{name.replace('/', '-')}")
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self._waits = deque(maxlen=1000)
+        self._service = deque(maxlen=200)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new arrival has probably drained"""
+        service = statistics.mean(self._service) if self._service else 1.0
+        return max(1, math.ceil(service * (self.waiting + 1) / self.limit))
+
+    async def run(self, call: Callable[[Executor], Awaitable[Any]]) -> Any:
+        """Await call(lane_threads) once a slot is free"""
+        queued = time.monotonic()
+        # Only callers that have to wait for a slot count against the queue
+        must_wait = self._slots.locked()
+        if must_wait and self.waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise Overloaded(self.name, self.retry_after())
+
+        self.stats["submitted"] += 1
+        if must_wait:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            if must_wait:
+                self.waiting -= 1
+
+        started = time.monotonic()
+        self._waits.append(started - queued)
+        self.active += 1
+        try:
+            result = await call(self._threads)
+            self.stats["completed"] += 1
+            return result
+        except BaseException:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.active -= 1
+            self._service.append(time.monotonic() - started)
+            self._slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        pick = lambda q: round(waits[min(len(waits) - 1, int(len(waits) * q))] * 1000, 1) if waits else None
+        return {
+            **self.stats,
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "wait_ms_p50": pick(0.50),
+            "wait_ms_p95": pick(0.95),
+            "service_ms_avg": round(statistics.mean(self._service) * 1000, 1) if self._service else None,
+            "retry_after": self.retry_after() if self.waiting else None
+        }
+
+
+class ActionExecutor:
+    """
+    Runs /agent/action calls in per-connection lanes instead of the shared default
+    executor, so a burst of slow signed writes on one connection cannot starve cheap
+    reads or other connections. Every connection gets a read lane and a write lane;
+    actions named in the connection's config get lanes of their own. Sizes come from an
+    "executor" block in the connection's config:
+
+        "executor": {
+            "read": {"limit": 16, "queue": 256},
+            "write": {"limit": 4, "queue": 64},
+            "actions": {"swap": {"limit": 2, "queue": 20}}
+        }
+
+    Lanes are created on first use, on the server's event loop.
+    """
+
+    def __init__(self, connection_manager):
+        self._manager = connection_manager
+        self._lanes: Dict[str, Lane] = {}
+
+    def _config(self, connection_name: str) -> Dict[str, Any]:
+        connection = self._manager.connections.get(connection_name)
+        return (getattr(connection, "config", None) or {}).get("executor", {})
+
+    def lane(self, connection_name: str, action_name: str) -> Lane:
+        config = self._config(connection_name)
+        kind = READ if self._manager.is_read_only(connection_name, action_name) else WRITE
+        if action_name in config.get("actions", {}):
+            name, sizes = f"{connection_name}/{action_name}", config["actions"][action_name]
+        else:
+            name, sizes = f"{connection_name}/{kind}", config.get(kind, {})
+        lane = self._lanes.get(name)
+        if lane is None:
+            sizes = {**DEFAULT_LANES[kind], **sizes}
+            lane = self._lanes[name] = Lane(name, int(sizes["limit"]), int(sizes["queue"]))
+        return lane
+
+    async def perform(self, connection_name: str, action_name: str, params: List[Any]) -> Optional[Any]:
+        """perform_action_async inside the action's lane; raises Overloaded when it is full"""
+        return await self.lane(connection_name, action_name).run(
+            lambda threads: self._manager.perform_action_async(connection_name, action_name, params, executor=threads)
+        )
+
+    async def _perform_shared_read(self, connection_name: str, action_name: str, params: List[Any], group) -> Optional[Any]:
+        """A batch read on the sync path, as a member of the batch's RPC group"""
+        manager = self._manager
+        return await self.lane(connection_name, action_name).run(
+            lambda threads: asyncio.get_running_loop().run_in_executor(
+                threads, lambda: group.run(manager.perform_action, connection_name, action_name, params)
+            )
+        )
+
+    async def _item(self, index: int, connection_name: str, action_name: str, params: List[Any],
+                    groups: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        try:
+            group = groups.get(connection_name)
+            if group is not None and self._manager.is_read_only(connection_name, action_name):
+                result = await self._perform_shared_read(connection_name, action_name, params, group)
+            else:
+                result = await self.perform(connection_name, action_name, params)
+            if result is None:
+                return index, {"index": index, "status": "error", "code": 400, "detail": "Action failed - check the server log"}
+            return index, {"index": index, "status": "success", "result": result}
+        except Overloaded as e:
+            return index, {"index": index, "status": "error", "code": 429, "detail": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"Batch item {index} ({connection_name} {action_name}) failed: {e}")
+            return index, {"index": index, "status": "error", "code": 400, "detail": str(e)}
+
+    async def run_batch(self, items: List[Tuple[str, str, List[Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run (connection, action, params) items concurrently, each in its own lane, and
+        yield their outcomes as they complete (every outcome carries its index). Read-only
+        items on connections with an RPC batcher take the sync path so they share the
+        block read cache, pinned to one head, and go out in combined batch POSTs.
+        Identical read-only items run once.
+        """
+        groups: Dict[str, Any] = {}
+        for connection_name in {connection_name for connection_name, action_name, _ in items
+                                if self._manager.is_read_only(connection_name, action_name)}:
+            connection = self._manager.connections.get(connection_name)
+            batcher = getattr(connection, "_batcher", None)
+            if batcher is None:
+                continue
+            groups[connection_name] = batcher.group()
+            read_cache = getattr(connection, "_read_cache", None)
+            if read_cache is not None:
+                await asyncio.to_thread(read_cache.pin)
+
+        # Index of the first occurrence of each read, and the indexes that repeat it
+        first_of: Dict[Tuple[str, str, str], int] = {}
+        followers: Dict[int, List[int]] = {}
+        pending = set()
+        for index, (connection_name, action_name, params) in enumerate(items):
+            if self._manager.is_read_only(connection_name, action_name):
+                key = (connection_name, action_name, json.dumps(params, default=str))
+                if key in first_of:
+                    followers[first_of[key]].append(index)
+                    continue
+                first_of[key] = index
+                followers[index] = []
+            pending.add(asyncio.ensure_future(self._item(index, connection_name, action_name, params, groups)))
+
+        try:
+            for next_done in asyncio.as_completed(pending):
+                index, outcome = await next_done
+                yield outcome
+                for other in followers.get(index, ()):
+                    yield {**outcome, "index": other}
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: lane.metrics() for name, lane in sorted(self._lanes.items())}
+
+    def shutdown(self) -> None:
+        for lane in self._lanes.values():
+            lane._threads.shutdown(wait=False)
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("server/idempotency")
+
+PENDING = "pending"
+DONE = "done"
+# Started before a restart and never finished: it may or may not have gone on chain
+INTERRUPTED = "interrupted"
+
+
+class IdempotencyConflict(Exception):
+    """The key was used before, for a different request or one whose outcome is unknown"""
+
+    def __init__(self, key: str, detail: str):
+        super().__init__(detail)
+        self.key = key
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    state: str = PENDING
+    status_code: Optional[int] = None
+    body: Any = None
+    created: float = field(default_factory=time.time)
+    done: Optional[asyncio.Future] = None
+
+
+class IdempotencyStore:
+    """
+    Remembers write actions by the client's Idempotency-Key, so a retried swap or sell
+    is answered from the first attempt instead of running again.
+
+    The first request with a key runs; requests with the same key that arrive while it
+    is running wait for it, and later ones get its stored (status_code, body) back
+    without touching Kyber, Privy or the RPC. A key reused with a different request is a
+    conflict. Outcomes are kept for `ttl` seconds, at most `max_entries` of them (oldest
+    first out). With `store_path` they survive restarts; a write that was still running
+    when the server stopped comes back as interrupted, since it may have been broadcast,
+    and is reported as a conflict rather than run a second time. The file is written from
+    a worker thread, one write at a time, with the changes made during a write folded
+    into the next one.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 24 * 3600, store_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store_path = store_path
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._store_lock = threading.Lock()
+        # Resolved once a write that includes the latest changes has finished
+        self._next_write: Optional[asyncio.Future] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {"executed": 0, "replayed": 0, "joined": 0, "conflicts": 0, "evicted": 0}
+        self._load()
+
+    @staticmethod
+    def fingerprint(*request: Any) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.state == PENDING or (entry.created >= cutoff and len(self._entries) <= self.max_entries):
+                break
+            del self._entries[key]
+            self.stats["evicted"] += 1
+
+    async def run(self, key: str, fingerprint: str,
+                  execute: Callable[[], Awaitable[Tuple[int, Any]]]) -> Tuple[int, Any, bool]:
+        """
+        (status_code, body, replayed) for the request under `key`. `execute` returns the
+        (status_code, body) to store; it raises for outcomes that must not be stored,
+        such as a full queue or a failed node, Privy or Kyber call, which then lets the
+        next retry run.
+        """
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self.stats["conflicts"] += 1
+                raise IdempotencyConflict(key, "Idempotency-Key was already used for a different request")
+            if entry.state == INTERRUPTED:
+                self.stats["conflicts"] += 1
+                raise IdempotencyConflict(key, "A request with this Idempotency-Key was interrupted by a restart; "
+                                               "check the wallet before retrying with a new key")
+            if entry.state == PENDING:
+                self.stats["joined"] += 1
+                status_code, body = await asyncio.shield(entry.done)
+                return status_code, body, True
+            self.stats["replayed"] += 1
+            self._entries.move_to_end(key)
+            return entry.status_code, entry.body, True
+
+        entry = self._entries[key] = _Entry(fingerprint, done=asyncio.get_running_loop().create_future())
+        self.stats["executed"] += 1
+        saved = self._save()
+        if saved is not None:
+            # The running mark must be on disk before the action can broadcast anything
+            await asyncio.shield(saved)
+        # Run detached, so a client that disconnects does not cancel it under the requests waiting on it
+        task = asyncio.ensure_future(execute())
+        try:
+            status_code, body = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            task.add_done_callback(lambda finished: self._finish(key, entry, finished))
+            raise
+        except BaseException as e:
+            self._forget(key, entry, e)
+            raise
+        self._store(key, entry, status_code, body)
+        return status_code, body, False
+
+    def _finish(self, key: str, entry: _Entry, task: asyncio.Future) -> None:
+        if task.cancelled() or task.exception() is not None:
+            self._forget(key, entry, task.exception() or asyncio.CancelledError())
+        else:
+            self._store(key, entry, *task.result())
+
+    def _store(self, key: str, entry: _Entry, status_code: int, body: Any) -> None:
+        entry.state, entry.status_code, entry.body = DONE, status_code, body
+        entry.done.set_result((status_code, body))
+        self._save()
+
+    def _forget(self, key: str, entry: _Entry, error: BaseException) -> None:
+        """Nothing was stored; requests waiting on the key get the same error and the key is free again"""
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.done.set_exception(error)
+        # Waiters are optional, don't warn about an exception nobody retrieved
+        entry.done.exception()
+        self._save()
+
+    def metrics(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for entry in self._entries.values():
+            states[entry.state] = states.get(entry.state, 0) + 1
+        return {**self.stats, "keys": len(self._entries), **states, "persistent": bool(self.store_path)}
+
+    def _save(self) -> Optional[asyncio.Future]:
+        """Schedule a write of the keys to `store_path`; returns a future for when it is on disk"""
+        if not self.store_path:
+            return None
+        if self._next_write is None:
+            self._next_write = asyncio.get_running_loop().create_future()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_pending())
+        return self._next_write
+
+    async def _write_pending(self) -> None:
+        while self._next_write is not None:
+            written, self._next_write = self._next_write, None
+            # The snapshot is taken on the loop; serialising and writing it is not
+            snapshot = [[key, entry.fingerprint, entry.state, entry.status_code, entry.body, entry.created]
+                        for key, entry in self._entries.items()]
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+            finally:
+                if not written.done():
+                    written.set_result(None)
+
+    def _write(self, snapshot) -> None:
+        try:
+            with self._store_lock:
+                directory = os.path.dirname(self.store_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.store_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f, default=str)
+                os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            logger.warning(f"Could not persist idempotency keys: {e}")
+
+    def _load(self) -> None:
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load idempotency keys: {e}")
+            return
+        cutoff = time.time() - self.ttl
+        for key, fingerprint, state, status_code, body, created in snapshot:
+            if created < cutoff:
+                continue
+            self._entries[key] = _Entry(fingerprint, INTERRUPTED if state == PENDING else state,
+                                        status_code, body, created)
+        logger.info(f"Restored {len(self._entries)} idempotency key(s)")
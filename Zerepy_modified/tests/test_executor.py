@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.server.executor import DEFAULT_LANES, ActionExecutor, Lane, Overloaded
+
+
+class FakeManager:
+    """Connection manager whose actions return "<action>:<params>"; get-* actions are reads"""
+
+    def __init__(self, config=None, gate=None, batcher=None, read_cache=None):
+        self.connections = {"sonic": SimpleNamespace(config=config or {}, _batcher=batcher, _read_cache=read_cache)}
+        self.gate = gate
+        self.threads = []
+        self.performed = []
+
+    def is_read_only(self, connection_name, action_name):
+        return action_name.startswith("get-")
+
+    def perform_action(self, connection_name, action_name, params):
+        self.threads.append(threading.current_thread().name)
+        self.performed.append((action_name, params))
+        if self.gate is not None:
+            self.gate.wait(5)
+        return f"{action_name}:{','.join(params)}"
+
+    async def perform_action_async(self, connection_name, action_name, params, executor=None):
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, self.perform_action, connection_name, action_name, params
+        )
+
+
+def test_lane_runs_at_most_limit_actions_at_once():
+    async def main():
+        lane, running, peak = Lane("sonic/write", limit=2, queue=10), [0], [0]
+
+        async def action(threads):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+        await asyncio.gather(*(lane.run(action) for _ in range(6)))
+        return lane, peak[0]
+
+    lane, peak = asyncio.run(main())
+    assert peak == 2
+    assert lane.stats["completed"] == 6 and lane.metrics()["peak_queue_depth"] == 4
+
+
+def test_full_queue_is_rejected_with_a_retry_after():
+    async def main():
+        lane, release = Lane("sonic/write", limit=1, queue=1), asyncio.Event()
+        running = asyncio.ensure_future(lane.run(lambda threads: release.wait()))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(lane.run(lambda threads: release.wait()))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as rejected:
+            await lane.run(lambda threads: release.wait())
+        release.set()
+        await asyncio.gather(running, queued)
+        return lane, rejected.value
+
+    lane, error = asyncio.run(main())
+    assert error.lane == "sonic/write" and error.retry_after >= 1
+    assert lane.stats["rejected"] == 1 and lane.stats["completed"] == 2
+
+
+def test_retry_after_covers_the_queue_ahead():
+    lane = Lane("sonic/write", limit=2, queue=10)
+    lane._service.extend([4.0, 4.0])
+    lane.waiting = 3
+    # Three waiting plus the newcomer, two at a time, four seconds each
+    assert lane.retry_after() == 8
+    assert Lane("sonic/read", limit=4, queue=10).retry_after() == 1
+
+
+def test_failures_free_the_slot():
+    async def main():
+        lane = Lane("sonic/read", limit=1, queue=0)
+
+        async def fail(threads):
+            raise RuntimeError("rpc down")
+
+        with pytest.raises(RuntimeError):
+            await lane.run(fail)
+        await lane.run(lambda threads: asyncio.sleep(0))
+        return lane
+
+    lane = asyncio.run(main())
+    assert lane.stats["failed"] == 1 and lane.stats["completed"] == 1
+
+
+def test_actions_get_read_write_or_their_own_lanes():
+    manager = FakeManager({"executor": {"write": {"limit": 2}, "actions": {"swap": {"limit": 1, "queue": 3}}}})
+    executor = ActionExecutor(manager)
+    read, write, swap = (executor.lane("sonic", action) for action in ("get-balance", "transfer", "swap"))
+    assert (read.name, read.limit, read.max_queue) == ("sonic/read", DEFAULT_LANES["read"]["limit"], 256)
+    assert (write.name, write.limit, write.max_queue) == ("sonic/write", 2, DEFAULT_LANES["write"]["queue"])
+    assert (swap.name, swap.limit, swap.max_queue) == ("sonic/swap", 1, 3)
+    assert executor.lane("sonic", "transfer") is write
+
+
+def test_perform_runs_sync_actions_on_the_lane_threads():
+    manager = FakeManager()
+    executor = ActionExecutor(manager)
+    assert asyncio.run(executor.perform("sonic", "transfer", ["S", "1"])) == "transfer:S,1"
+    assert manager.threads[0].startswith("action-sonic-write")
+    executor.shutdown()
+
+
+def test_perform_raises_overloaded_once_the_action_lane_is_full():
+    gate = threading.Event()
+    manager = FakeManager({"executor": {"actions": {"swap": {"limit": 1, "queue": 0}}}}, gate=gate)
+    executor = ActionExecutor(manager)
+
+    async def main():
+        first = asyncio.ensure_future(executor.perform("sonic", "swap", ["S", "USDC", "1"]))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await executor.perform("sonic", "swap", ["S", "USDC", "2"])
+        # Other actions on the connection are unaffected
+        reads = executor.perform("sonic", "get-balance", ["S"])
+        gate.set()
+        return await reads, await first
+
+    assert asyncio.run(main()) == ("get-balance:S", "swap:S,USDC,1")
+    assert executor.metrics()["sonic/swap"]["rejected"] == 1
+    executor.shutdown()
+
+
+class FakeGroup:
+    """RpcBatch group stand-in: records which calls ran as its members"""
+
+    def __init__(self):
+        self.members = []
+
+    def run(self, fn, *args):
+        self.members.append(args[1])
+        return fn(*args)
+
+
+class FakeReadCache:
+    def __init__(self):
+        self.pins = 0
+
+    def pin(self):
+        self.pins += 1
+        return 100
+
+
+def run_batch(executor, items):
+    async def main():
+        return [outcome async for outcome in executor.run_batch(items)]
+
+    return sorted(asyncio.run(main()), key=lambda outcome: outcome["index"])
+
+
+def test_batch_reads_share_one_rpc_group_pinned_to_one_head():
+    group, read_cache = FakeGroup(), FakeReadCache()
+    manager = FakeManager(batcher=SimpleNamespace(group=lambda: group), read_cache=read_cache)
+    outcomes = run_batch(ActionExecutor(manager), [
+        ("sonic", "get-balance", ["S"]),
+        ("sonic", "get-token-by-ticker", ["USDC"]),
+        ("sonic", "transfer", ["0xabc", "1"]),
+    ])
+    assert [outcome["result"] for outcome in outcomes] == ["get-balance:S", "get-token-by-ticker:USDC", "transfer:0xabc,1"]
+    assert sorted(group.members) == ["get-balance", "get-token-by-ticker"]
+    assert read_cache.pins == 1
+
+
+def test_identical_reads_in_a_batch_run_once_but_writes_do_not():
+    manager = FakeManager()
+    outcomes = run_batch(ActionExecutor(manager), [
+        ("sonic", "get-balance", ["S"]),
+        ("sonic", "transfer", ["0xabc", "1"]),
+        ("sonic", "get-balance", ["S"]),
+        ("sonic", "transfer", ["0xabc", "1"]),
+    ])
+    assert [outcome["index"] for outcome in outcomes] == [0, 1, 2, 3]
+    assert outcomes[0]["result"] == outcomes[2]["result"] == "get-balance:S"
+    assert sorted(manager.performed) == [("get-balance", ["S"]), ("transfer", ["0xabc", "1"]), ("transfer", ["0xabc", "1"])]
+
+
+def test_a_full_lane_fails_only_its_item():
+    gate = threading.Event()
+    manager = FakeManager({"executor": {"actions": {"swap": {"limit": 1, "queue": 0}}}}, gate=gate)
+    threading.Timer(0.1, gate.set).start()
+    outcomes = run_batch(ActionExecutor(manager), [
+        ("sonic", "swap", ["S", "USDC", "1"]),
+        ("sonic", "swap", ["S", "USDC", "2"]),
+        ("sonic", "get-balance", ["S"]),
+    ])
+    assert [outcome["status"] for outcome in outcomes] == ["success", "error", "success"]
+    assert outcomes[1]["code"] == 429 and outcomes[1]["retry_after"] >= 1
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.helpers.evm.fees import (
+    DEFAULT_TIERS, GWEI, FeeOracle, bump_fees, legacy_fees, snapshot_from_history, suggest
+)
+
+PERCENTILES = [10, 50, 90]
+
+
+def history(rewards, ratios, base_fees, oldest=100):
+    return {
+        "oldestBlock": oldest,
+        "gasUsedRatio": ratios,
+        "baseFeePerGas": base_fees,
+        "reward": rewards,
+    }
+
+
+class FakeEth:
+    def __init__(self, fee_history=None, error=None):
+        self._history = fee_history
+        self._error = error
+        self.reads = 0
+
+    def fee_history(self, blocks, newest, percentiles):
+        self.reads += 1
+        if self._error is not None:
+            raise self._error
+        return self._history
+
+    def get_block(self, block):
+        return {"number": 7, "baseFeePerGas": 3 * GWEI}
+
+
+def oracle(eth, **kwargs):
+    return FeeOracle(SimpleNamespace(eth=eth), **kwargs)
+
+
+def test_tips_are_the_median_of_each_percentile_over_non_empty_blocks():
+    snapshot = snapshot_from_history(history(
+        rewards=[[1, 10, 100], [2, 20, 200], [9999, 9999, 9999], [3, 30, 300]],
+        ratios=[0.5, 0.4, 0.0, 0.6],
+        base_fees=[10, 11, 12, 13, 14],
+    ), PERCENTILES)
+    # The empty third block's rewards are ignored
+    assert snapshot.rewards == {10: 2, 50: 20, 90: 200}
+    assert snapshot.block_number == 103
+    assert snapshot.next_base_fee == 14
+
+
+def test_tiers_scale_base_fee_and_tip_at_their_percentile():
+    snapshot = snapshot_from_history(history(
+        rewards=[[GWEI, 2 * GWEI, 4 * GWEI]], ratios=[0.5], base_fees=[8 * GWEI, 8 * GWEI],
+    ), PERCENTILES)
+    assert suggest(snapshot, DEFAULT_TIERS["eco"]) == (9 * GWEI + GWEI, GWEI)
+    assert suggest(snapshot, DEFAULT_TIERS["normal"]) == (12 * GWEI + 2 * GWEI, 2 * GWEI)
+    assert suggest(snapshot, DEFAULT_TIERS["fast"]) == (16 * GWEI + 4 * GWEI, 4 * GWEI)
+
+
+def test_fast_tips_at_least_one_gwei():
+    snapshot = snapshot_from_history(history(
+        rewards=[[0, 0, 10]], ratios=[0.1], base_fees=[GWEI, GWEI],
+    ), PERCENTILES)
+    assert suggest(snapshot, DEFAULT_TIERS["fast"]) == (2 * GWEI + GWEI, GWEI)
+    assert suggest(snapshot, DEFAULT_TIERS["eco"])[1] == 0
+
+
+def test_snapshot_is_shared_until_it_goes_stale():
+    eth = FakeEth(history([[1, 2, 3]], [0.5], [GWEI, GWEI]))
+    fees = oracle(eth, max_age=60)
+    assert fees.fees("eco") != fees.fees("fast")
+    assert fees.peek() is not None
+    assert eth.reads == 1
+    fees.max_age = 0
+    fees.fees()
+    assert eth.reads == 2
+
+
+def test_snapshot_is_kept_until_the_head_moves_past_its_block():
+    head = [100]
+    eth = FakeEth(history([[1, 2, 3]], [0.5], [GWEI, GWEI], oldest=100))
+    fees = oracle(eth, max_age=0, head=lambda: head[0])
+    fees.fees()
+    assert fees.peek() is not None
+    assert eth.reads == 1
+    head[0] = 101
+    assert fees.peek() is None
+    fees.fees()
+    assert eth.reads == 2
+    # Without a known head the snapshot is only good for max_age
+    head[0] = None
+    assert fees.peek() is None
+
+
+def test_nodes_without_fee_history_fall_back_to_the_legacy_policy():
+    fees = oracle(FakeEth(error=ValueError("method not found")))
+    assert fees.fees("fast") == legacy_fees(3 * GWEI) == (7 * GWEI, GWEI)
+    assert fees.stats["fallbacks"] == 1
+
+
+def test_unknown_speed_is_rejected():
+    with pytest.raises(ValueError, match="Unknown fee speed"):
+        oracle(FakeEth(), default_speed="turbo")
+    with pytest.raises(ValueError, match="Unknown fee speed"):
+        oracle(FakeEth()).tier("turbo")
+
+
+def test_bump_raises_fee_and_tip_by_the_factor_rounding_up():
+    assert bump_fees(10 * GWEI, 2 * GWEI) == (11.25 * GWEI, 2.25 * GWEI)
+    assert bump_fees(9, 9, factor=1.1) == (10, 10)
+
+
+def test_bump_lifts_to_the_floor():
+    assert bump_fees(10 * GWEI, GWEI, floor=(20 * GWEI, 3 * GWEI)) == (20 * GWEI, 3 * GWEI)
+
+
+def test_bump_raises_a_zero_tip():
+    max_fee, max_priority_fee = bump_fees(10, 0)
+    assert max_priority_fee == 1 and max_fee >= max_priority_fee
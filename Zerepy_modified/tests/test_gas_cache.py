@@ -0,0 +1,85 @@
+from src.connections.sonic_connection import SonicConnection
+from src.helpers.evm.gas_cache import GasLimitCache
+
+TOKEN = "0x" + "11" * 20
+SPENDER = "0x" + "22" * 20
+MINT = {"to": SPENDER, "data": "0xa0712d68" + "00" * 32}
+
+
+def learn(cache, tx, gas_used=50000, times=5):
+    key = cache.key(tx)
+    for _ in range(times):
+        cache.observe(key, {"status": 1, "gasUsed": gas_used})
+    return key
+
+
+def test_stable_call_shape_is_learned():
+    cache = GasLimitCache(min_samples=5)
+    key = learn(cache, MINT)
+    assert cache.lookup(key) == 50000
+
+
+def test_too_few_samples_are_estimated():
+    cache = GasLimitCache(min_samples=5)
+    key = learn(cache, MINT, times=4)
+    assert cache.lookup(key) is None
+    assert cache.stats["misses"] == 1
+
+
+def test_input_dependent_costs_never_settle():
+    cache = GasLimitCache(min_samples=5, max_spread=0.25)
+    key = cache.key({"to": SPENDER, "data": "0xe21fd0e9"})
+    for gas_used in (100000, 110000, 120000, 250000, 400000):
+        cache.observe(key, {"status": 1, "gasUsed": gas_used})
+    assert cache.lookup(key) is None
+
+
+def test_key_ignores_arguments_but_not_target_or_token():
+    assert GasLimitCache.key(MINT) == GasLimitCache.key({**MINT, "data": MINT["data"][:10] + "ff" * 32})
+    assert GasLimitCache.key(MINT) != GasLimitCache.key({**MINT, "to": TOKEN})
+    assert GasLimitCache.key(MINT, TOKEN) != GasLimitCache.key(MINT)
+
+
+def test_erc20_approve_and_transfer_are_always_estimated():
+    cache = GasLimitCache(min_samples=5)
+    for selector in ("0x095ea7b3", "0xa9059cbb"):
+        tx = {"to": TOKEN, "data": selector + "00" * 64}
+        assert cache.key(tx) is None
+        learn(cache, tx)
+        assert cache.lookup(cache.key(tx)) is None
+    assert cache.metrics()["keys"] == 0
+
+
+def test_revert_drops_samples():
+    cache = GasLimitCache(min_samples=5)
+    key = learn(cache, {"to": SPENDER, "data": "0xa0712d68"})
+    cache.observe(key, {"status": 0, "gasUsed": 21000})
+    assert cache.lookup(key) is None
+
+
+def test_disabled_cache_always_estimates():
+    cache = GasLimitCache(min_samples=5, enabled=False)
+    assert cache.lookup(learn(cache, MINT)) is None
+
+
+def test_samples_survive_a_restart(tmp_path):
+    path = str(tmp_path / "gas.json")
+    key = learn(GasLimitCache(min_samples=5, store_path=path), MINT)
+    assert GasLimitCache(min_samples=5, store_path=path).lookup(key) == 50000
+
+
+def test_stored_approve_samples_are_not_restored(tmp_path):
+    path = tmp_path / "gas.json"
+    path.write_text('[[["%s", "0x095ea7b3", null], [46000, 46000, 46000, 46000, 46000]]]' % TOKEN)
+    cache = GasLimitCache(min_samples=5, store_path=str(path))
+    assert cache.metrics()["keys"] == 0
+
+
+def test_call_behind_a_pending_approval_uses_learned_then_route_then_default_gas():
+    connection = object.__new__(SonicConnection)
+    connection._gas_cache = GasLimitCache(min_samples=5)
+    key = connection._gas_cache.key(MINT)
+    assert connection._gas_behind_approval(key) == 500000
+    assert connection._gas_behind_approval(key, route_gas=200000) == 300000
+    learn(connection._gas_cache, MINT)
+    assert connection._gas_behind_approval(key, route_gas=200000) == 60000
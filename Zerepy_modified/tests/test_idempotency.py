@@ -0,0 +1,115 @@
+import asyncio
+import shutil
+import threading
+import time
+
+import pytest
+
+from src.server.idempotency import IdempotencyConflict, IdempotencyStore
+
+
+class Action:
+    """Counts executions; each one returns its own number"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return 200, {"status": "success", "run": self.runs}
+
+
+def test_retry_is_replayed_without_running_again():
+    async def main():
+        store, action = IdempotencyStore(), Action()
+        fingerprint = store.fingerprint("sonic", "swap", ["S", "USDC", "1"])
+        first = await store.run("key-1", fingerprint, action)
+        retry = await store.run("key-1", fingerprint, action)
+        return store, action, first, retry
+
+    store, action, first, retry = asyncio.run(main())
+    assert action.runs == 1
+    assert first == (200, {"status": "success", "run": 1}, False)
+    assert retry == (200, {"status": "success", "run": 1}, True)
+    assert store.stats["replayed"] == 1
+
+
+def test_concurrent_duplicates_wait_for_the_first_run():
+    async def main():
+        store, action = IdempotencyStore(), Action(delay=0.01)
+        return action, await asyncio.gather(*(store.run("key-1", "f", action) for _ in range(5)))
+
+    action, results = asyncio.run(main())
+    assert action.runs == 1
+    assert [replayed for _, _, replayed in results].count(False) == 1
+
+
+def test_key_reused_for_another_request_conflicts():
+    async def main():
+        store = IdempotencyStore()
+        await store.run("key-1", store.fingerprint("swap", "1"), Action())
+        with pytest.raises(IdempotencyConflict):
+            await store.run("key-1", store.fingerprint("swap", "2"), Action())
+        return store
+
+    assert asyncio.run(main()).stats["conflicts"] == 1
+
+
+def test_failure_that_is_not_stored_frees_the_key():
+    async def main():
+        store, action = IdempotencyStore(), Action()
+        with pytest.raises(RuntimeError):
+            await store.run("key-1", "f", Action(error=RuntimeError("lane full")))
+        return await store.run("key-1", "f", action)
+
+    assert asyncio.run(main())[2] is False
+
+
+def test_write_running_at_restart_comes_back_as_a_conflict(tmp_path):
+    path, crashed = tmp_path / "keys.json", tmp_path / "crashed.json"
+
+    async def interrupted():
+        store, action = IdempotencyStore(store_path=str(path)), Action(delay=10)
+        task = asyncio.ensure_future(store.run("key-1", "f", action))
+        # The action only starts once the key is on disk as running
+        while not action.runs:
+            await asyncio.sleep(0.001)
+        # What a process killed while the write is in flight leaves on disk
+        shutil.copy(path, crashed)
+        task.cancel()
+
+    async def after_restart():
+        with pytest.raises(IdempotencyConflict, match="interrupted"):
+            await IdempotencyStore(store_path=str(crashed)).run("key-1", "f", Action())
+
+    asyncio.run(interrupted())
+    asyncio.run(after_restart())
+
+
+def test_saves_run_off_the_loop_and_coalesce(tmp_path, monkeypatch):
+    path = tmp_path / "keys.json"
+    store = IdempotencyStore(store_path=str(path))
+    loop_thread, writes = threading.get_ident(), []
+    write = store._write
+
+    def slow_write(snapshot):
+        writes.append(threading.get_ident())
+        time.sleep(0.01)
+        write(snapshot)
+
+    monkeypatch.setattr(store, "_write", slow_write)
+
+    async def main():
+        await asyncio.gather(*(store.run(f"key-{index}", "f", Action()) for index in range(20)))
+        await store._save()
+
+    asyncio.run(main())
+    assert loop_thread not in writes
+    # 40 saves (running and done for each key) folded into a few writes
+    assert len(writes) < 10
+    assert IdempotencyStore(store_path=str(path)).metrics()["done"] == 20
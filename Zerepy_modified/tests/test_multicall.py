@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+from eth_abi import encode
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from src.helpers.evm.multicall import MulticallReader, is_execution_error, read_balances
+from src.helpers.evm.token_metadata import TokenMetadataRegistry
+
+OWNER = "0x" + "aa" * 20
+GOOD, BAD = "0x" + "11" * 20, "0x" + "22" * 20
+
+# What the fake chain answers per function selector
+ANSWERS = {
+    Web3.keccak(text="balanceOf(address)")[:4]: encode(["uint256"], [5 * 10 ** 18]),
+    Web3.keccak(text="getEthBalance(address)")[:4]: encode(["uint256"], [2 * 10 ** 18]),
+    Web3.keccak(text="decimals()")[:4]: encode(["uint8"], [18]),
+    Web3.keccak(text="symbol()")[:4]: encode(["string"], ["GOOD"]),
+}
+
+
+class FakeAggregate:
+    """aggregate3 that reverts as a whole when a call targets BAD, or raises `error` for every batch"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.batches = []
+
+    def aggregate3(self, calls):
+        def call(block_identifier):
+            self.batches.append(len(calls))
+            if self.error is not None:
+                raise self.error
+            if any(target == Web3.to_checksum_address(BAD) for target, _, _ in calls):
+                raise ContractLogicError("execution reverted")
+            return [(True, ANSWERS[bytes(data[:4])]) for _, _, data in calls]
+        return SimpleNamespace(call=call)
+
+
+def reader(functions, **kwargs):
+    contract = SimpleNamespace(functions=functions)
+    web3 = SimpleNamespace(eth=SimpleNamespace(contract=lambda address, abi: contract))
+    return MulticallReader(web3, **kwargs)
+
+
+def test_revert_is_bisected_to_the_bad_call():
+    multicall = reader(FakeAggregate())
+    calls = [MulticallReader.erc20_balance(token, OWNER) for token in (GOOD, GOOD, BAD, GOOD)]
+    results = multicall.execute(calls)
+    assert [result.success for result in results] == [True, True, False, True]
+    assert results[0].value == 5 * 10 ** 18
+    assert multicall.stats["bisections"] > 0
+
+
+def test_transport_errors_are_raised_without_bisecting():
+    functions = FakeAggregate(error=requests.Timeout("read timed out"))
+    multicall = reader(functions)
+    with pytest.raises(requests.Timeout):
+        multicall.execute([MulticallReader.erc20_balance(GOOD, OWNER) for _ in range(8)])
+    assert functions.batches == [8]
+    assert multicall.stats["bisections"] == 0
+
+
+@pytest.mark.parametrize("error, expected", [
+    (ContractLogicError("execution reverted"), True),
+    (ValueError({"code": -32000, "message": "out of gas"}), True),
+    (ValueError({"code": -32005, "message": "limit exceeded"}), False),
+    (requests.ConnectionError("reset"), False),
+    (requests.exceptions.JSONDecodeError("bad", "", 0), False),
+])
+def test_is_execution_error(error, expected):
+    assert is_execution_error(error) is expected
+
+
+def test_calls_are_chunked_by_count():
+    functions = FakeAggregate()
+    multicall = reader(functions, max_calls=3)
+    results = multicall.execute([MulticallReader.erc20_balance(GOOD, OWNER) for _ in range(7)])
+    assert functions.batches == [3, 3, 1]
+    assert len(results) == 7 and all(result.success for result in results)
+
+
+def test_undecodable_result_fails_only_that_call(monkeypatch):
+    multicall = reader(FakeAggregate())
+    # A one-byte answer cannot decode as a string
+    monkeypatch.setitem(ANSWERS, Web3.keccak(text="symbol()")[:4], b"\x01")
+    results = multicall.execute([MulticallReader.erc20_symbol(GOOD), MulticallReader.erc20_decimals(GOOD)])
+    assert [result.success for result in results] == [False, True]
+    assert "decode" in results[0].error
+
+
+def test_read_balances_records_token_metadata(tmp_path):
+    functions = FakeAggregate()
+    multicall = reader(functions)
+    registry = TokenMetadataRegistry(db_path=str(tmp_path / "tokens.sqlite"))
+
+    snapshot = read_balances(multicall, registry, 146, [OWNER], [GOOD])
+    assert snapshot["balances"][OWNER] == {"native": 2.0, "tokens": {GOOD: 5.0}}
+    assert snapshot["tokens"][GOOD] == {"symbol": "GOOD", "decimals": 18}
+    assert snapshot["errors"] == []
+
+    # Metadata is known now, so the next read only asks for balances
+    read_balances(multicall, registry, 146, [OWNER], [GOOD])
+    assert functions.batches == [4, 2]
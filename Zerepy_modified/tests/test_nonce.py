@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from eth_utils import keccak
+from web3 import Web3
+
+from src.connections.sonic_connection import SonicConnection
+from src.helpers.evm.nonce import NonceManager, is_already_known
+
+
+class FakeEth:
+    def __init__(self, pending: int = 0, send_errors=()):
+        self.pending = pending
+        self.send_errors = list(send_errors)
+        self.sent = []
+
+    def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == "pending"
+        return self.pending
+
+    def send_raw_transaction(self, raw):
+        self.sent.append(raw)
+        if self.send_errors:
+            raise self.send_errors.pop(0)
+        return keccak(raw)
+
+
+def fake_web3(**kwargs):
+    return SimpleNamespace(eth=FakeEth(**kwargs), to_checksum_address=Web3.to_checksum_address)
+
+
+class FakeSigners:
+    def sign(self, tx, wallet_id):
+        return f"signed:{tx['nonce']}".encode()
+
+
+def sonic(web3):
+    connection = object.__new__(SonicConnection)
+    connection._web3 = web3
+    connection._nonce_manager = NonceManager(web3)
+    connection._signers = FakeSigners()
+    return connection
+
+
+WALLET = "0x000000000000000000000000000000000000dEaD"
+
+
+def test_reserves_consecutive_nonces():
+    manager = NonceManager(fake_web3(pending=7))
+    assert [manager.reserve(WALLET) for _ in range(3)] == [7, 8, 9]
+
+
+def test_released_nonce_fills_gap():
+    manager = NonceManager(fake_web3(pending=0))
+    first, second = manager.reserve(WALLET), manager.reserve(WALLET)
+    manager.release(WALLET, first)
+    assert manager.reserve(WALLET) == first
+    assert manager.reserve(WALLET) == second + 1
+
+
+def test_nonce_too_low_resyncs():
+    web3 = fake_web3(pending=0)
+    manager = NonceManager(web3)
+    nonce = manager.reserve(WALLET)
+    web3.eth.pending = 5
+    assert manager.handle_error(WALLET, nonce, ValueError({"message": "nonce too low"}))
+    assert manager.reserve(WALLET) == 5
+
+
+def test_already_known_is_not_a_nonce_conflict():
+    error = ValueError({"code": -32000, "message": "already known"})
+    assert is_already_known(error)
+    web3 = fake_web3(pending=3)
+    manager = NonceManager(web3)
+    nonce = manager.reserve(WALLET)
+    assert manager.handle_error(WALLET, nonce, error) is False
+    # The reservation stays in flight, so the next send cannot reuse it
+    assert manager.reserve(WALLET) == nonce + 1
+
+
+def test_sign_and_send_treats_already_known_as_sent():
+    web3 = fake_web3(pending=4, send_errors=[ValueError({"message": "already known"})])
+    connection = sonic(web3)
+    tx = {"to": WALLET, "value": 1}
+
+    tx_hash = connection._sign_and_send(tx, WALLET)
+
+    assert web3.eth.sent == [b"signed:4"]
+    assert tx_hash == keccak(b"signed:4")
+    assert connection._nonce_manager.get_metrics()["wallets"][WALLET.lower()]["in_flight"] == [4]
+
+
+def test_sign_and_send_retries_nonce_conflicts_once():
+    web3 = fake_web3(pending=4, send_errors=[ValueError({"message": "nonce too low"})])
+    connection = sonic(web3)
+    send = web3.eth.send_raw_transaction
+
+    def send_after_other_sender(raw):
+        # Another process used nonces 4 and 5 meanwhile
+        web3.eth.pending = 6
+        return send(raw)
+
+    web3.eth.send_raw_transaction = send_after_other_sender
+
+    tx_hash = connection._sign_and_send({"to": WALLET, "value": 1}, WALLET)
+
+    assert web3.eth.sent == [b"signed:4", b"signed:6"]
+    assert tx_hash == keccak(b"signed:6")
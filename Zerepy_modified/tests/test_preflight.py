@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.helpers.preflight import Preflight
+
+
+def test_dependents_get_their_dependencies_results():
+    graph = Preflight()
+    graph.step("balance", lambda: 10)
+    graph.step("decimals", lambda: 2)
+    graph.step("amount", lambda balance, decimals: balance * 10 ** decimals, "balance", "decimals")
+    assert graph.run()["amount"] == 1000
+
+
+def test_independent_steps_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    graph = Preflight()
+    for name in ("a", "b", "c"):
+        # Each step only finishes once all three are running at the same time
+        graph.step(name, barrier.wait)
+    graph.run()
+    assert set(graph.timings) == {"a", "b", "c"}
+
+
+def test_a_step_starts_only_after_its_dependencies():
+    order = []
+    graph = Preflight()
+    graph.step("slow", lambda: time.sleep(0.02) or order.append("slow"))
+    graph.step("fast", lambda: order.append("fast"))
+    graph.step("last", lambda slow, fast: order.append("last"), "slow", "fast")
+    graph.run()
+    assert order == ["fast", "slow", "last"]
+
+
+def test_failure_skips_dependents_and_raises_the_first_declared_error():
+    ran = []
+    graph = Preflight()
+    graph.step("late_failure", lambda: time.sleep(0.02) or (_ for _ in ()).throw(ValueError("late")))
+    graph.step("early_failure", lambda: (_ for _ in ()).throw(KeyError("early")))
+    graph.step("dependent", lambda value: ran.append(value), "early_failure")
+    with pytest.raises(ValueError, match="late"):
+        graph.run()
+    assert ran == []
+
+
+def test_undeclared_dependency_is_rejected():
+    with pytest.raises(ValueError, match="undeclared"):
+        Preflight().step("amount", lambda balance: balance, "balance")
+
+
+def test_arun_mixes_coroutines_and_plain_functions():
+    async def balance():
+        await asyncio.sleep(0.01)
+        return 3
+
+    graph = Preflight()
+    graph.step("balance", balance)
+    graph.step("decimals", lambda: 1)
+    graph.step("amount", lambda balance, decimals: balance * 10 ** decimals, "balance", "decimals")
+    assert asyncio.run(graph.arun())["amount"] == 30
+
+
+def test_arun_raises_the_first_declared_error():
+    async def fail(message):
+        raise RuntimeError(message)
+
+    graph = Preflight()
+    graph.step("first", lambda: fail("first"))
+    graph.step("second", lambda: fail("second"))
+    with pytest.raises(RuntimeError, match="first"):
+        asyncio.run(graph.arun())
+
+
+def test_report_and_summary_include_measured_steps():
+    graph = Preflight("swap")
+    graph.step("balance", lambda: 1)
+    graph.run()
+    assert graph.measure("sign", lambda value: value + 1, 1) == 2
+    report = graph.report()
+    assert set(report["steps"]) == {"balance"} and set(report["after"]) == {"sign"}
+    assert report["serial_ms"] >= 0
+    summary = graph.summary()
+    assert summary.startswith("⏱️ Pre-flight") and "balance" in summary and "sign" in summary
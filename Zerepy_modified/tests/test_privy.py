@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from src.helpers.evm import privy
+from src.helpers.evm.privy import PrivyError, PrivyWalletCache
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setenv("PRIVY_APP_ID", "app")
+    monkeypatch.setenv("PRIVY_APP_SECRET", "secret")
+
+
+def fetcher(cache, addresses=None, gate=None, error=None):
+    """Replace the Privy lookup of `cache`; returns the list of wallet ids fetched"""
+    fetched = []
+
+    def fetch(wallet_id):
+        fetched.append(wallet_id)
+        if gate is not None:
+            gate.wait(5)
+        if error is not None:
+            raise error
+        return (addresses or {}).get(wallet_id, f"0x{wallet_id}")
+
+    cache._fetch = fetch
+    return fetched
+
+
+def test_lookups_are_cached_until_the_ttl():
+    cache = PrivyWalletCache(ttl=60)
+    fetched = fetcher(cache)
+    assert cache.get_address("w1") == "0xw1"
+    assert cache.get_address("w1") == "0xw1"
+    assert fetched == ["w1"]
+
+    cache._entries["w1"]["fetched_at"] -= 61
+    cache.get_address("w1")
+    assert fetched == ["w1", "w1"]
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache, gate = PrivyWalletCache(), threading.Event()
+    fetched = fetcher(cache, gate=gate)
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.get_address, "w1") for _ in range(8)]
+        deadline = time.time() + 5
+        while cache.stats["shared"] < 7 and time.time() < deadline:
+            time.sleep(0.001)
+        gate.set()
+        assert {future.result() for future in futures} == {"0xw1"}
+    assert fetched == ["w1"]
+
+
+def test_a_failed_fetch_reaches_every_waiter_and_is_not_cached():
+    cache, gate = PrivyWalletCache(), threading.Event()
+    fetcher(cache, gate=gate, error=PrivyError("Privy API error: 500"))
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_address, "w1") for _ in range(4)]
+        deadline = time.time() + 5
+        while cache.stats["shared"] < 3 and time.time() < deadline:
+            time.sleep(0.001)
+        gate.set()
+        for future in futures:
+            with pytest.raises(PrivyError):
+                future.result()
+
+    fetched = fetcher(cache)
+    assert cache.get_address("w1") == "0xw1"
+    assert fetched == ["w1"]
+
+
+def test_warm_up_pages_through_the_wallet_listing(monkeypatch):
+    pages = {
+        None: {"data": [{"id": "w1", "address": "0x1"}, {"id": "w2", "address": "0x2"}], "next_cursor": "c1"},
+        "c1": {"data": [{"id": "w3", "address": "0x3"}, {"id": "broken"}], "next_cursor": None},
+    }
+    requested = []
+
+    def get(url, params=None, **kwargs):
+        requested.append(params.get("cursor"))
+        return SimpleNamespace(ok=True, json=lambda: pages[params.get("cursor")])
+
+    monkeypatch.setattr(privy, "get_transport", lambda: SimpleNamespace(get=get))
+    cache = PrivyWalletCache()
+    fetched = fetcher(cache)
+
+    assert cache.warm_up(page_size=2) == 3
+    assert requested == [None, "c1"]
+    assert [cache.get_address(wallet_id) for wallet_id in ("w1", "w2", "w3")] == ["0x1", "0x2", "0x3"]
+    assert fetched == []
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "privy_wallets.json")
+    cache = PrivyWalletCache(store_path=path)
+    fetcher(cache)
+    cache.get_address("w1")
+
+    restored = PrivyWalletCache(store_path=path)
+    fetched = fetcher(restored)
+    assert restored.get_address("w1") == "0xw1"
+    assert fetched == []
+
+    restored.invalidate("w1")
+    assert "w1" not in PrivyWalletCache(store_path=path)._entries
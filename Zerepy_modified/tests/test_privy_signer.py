@@ -0,0 +1,80 @@
+import base64
+import json
+import threading
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from src.helpers.evm import privy
+from src.helpers.evm.privy import PrivyAuthorizationSigner, PrivyError
+
+
+def authorization_key():
+    """A fresh P-256 key in Privy's "wallet-auth:<base64 PKCS#8>" form"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return key.public_key(), "wallet-auth:" + "".join(pem.strip().splitlines()[1:-1])
+
+
+def test_payload_is_canonical_json():
+    _, key = authorization_key()
+    signer = PrivyAuthorizationSigner(key)
+    body = {"method": "eth_signTransaction", "params": {"transaction": {"to": "0xabc", "nonce": 1}}}
+    url = "https://api.privy.io/v1/wallets/w1/rpc/"
+
+    expected = json.dumps({"version": 1, "method": "POST", "url": url.rstrip("/"), "body": body,
+                           "headers": {"privy-app-id": "app"}}, sort_keys=True, separators=(",", ":"))
+    assert signer.serialize("POST", url, body, "app") == expected.encode()
+
+
+def test_signature_verifies_with_the_public_key():
+    public_key, key = authorization_key()
+    signer = PrivyAuthorizationSigner(key)
+    body = {"chain_type": "ethereum"}
+    signature = base64.b64decode(signer.sign("POST", "https://api.privy.io/v1/wallets", body, "app"))
+    public_key.verify(signature, signer.serialize("POST", "https://api.privy.io/v1/wallets", body, "app"),
+                      ec.ECDSA(hashes.SHA256()))
+
+
+def test_reload_swaps_the_key():
+    _, first = authorization_key()
+    second_public, second = authorization_key()
+    signer = PrivyAuthorizationSigner(first)
+    signer.reload(second)
+    signature = base64.b64decode(signer.sign("POST", "https://x", {}, "app"))
+    second_public.verify(signature, signer.serialize("POST", "https://x", {}, "app"), ec.ECDSA(hashes.SHA256()))
+
+
+def test_missing_key_is_reported(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("PRIVY_AUTHORIZATION_KEY", raising=False)
+    with pytest.raises(PrivyError):
+        PrivyAuthorizationSigner()
+
+
+def test_only_an_explicit_reload_lets_dotenv_override_the_environment(monkeypatch):
+    _, key = authorization_key()
+    monkeypatch.setenv("PRIVY_AUTHORIZATION_KEY", key)
+    overrides = []
+    monkeypatch.setattr(privy, "load_dotenv", lambda override=False: overrides.append(override))
+
+    signer = PrivyAuthorizationSigner()
+    assert overrides == [False]
+    signer.reload()
+    assert overrides == [False, True]
+
+
+def test_first_signer_use_does_not_wait_on_the_wallet_cache(monkeypatch):
+    _, key = authorization_key()
+    monkeypatch.setenv("PRIVY_AUTHORIZATION_KEY", key)
+    monkeypatch.setattr(privy, "load_dotenv", lambda override=False: None)
+    monkeypatch.setattr(privy, "_signer", None)
+    created = threading.Event()
+
+    with privy._wallet_cache_lock:
+        thread = threading.Thread(target=lambda: privy.get_authorization_signer() and created.set())
+        thread.start()
+        assert created.wait(5)
+    thread.join()
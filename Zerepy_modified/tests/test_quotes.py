@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from web3 import Web3
+
+from src.connections.sonic_connection import SonicConnection
+from src.helpers.evm.quotes import QuoteError, QuoteStore
+
+TOKEN_IN, TOKEN_OUT = "0x" + "11" * 20, "0x" + "22" * 20
+
+
+def test_concurrent_quotes_share_one_fetch_but_not_the_quote_id():
+    store, release, fetches = QuoteStore(), threading.Event(), []
+
+    def fetch_route():
+        fetches.append(1)
+        release.wait(5)
+        return {"routeSummary": {"amountOut": "42"}}
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(store.quote, TOKEN_IN, TOKEN_OUT, 1.5, fetch_route) for _ in range(4)]
+        deadline = time.time() + 5
+        while store.stats["coalesced"] < 3 and time.time() < deadline:
+            time.sleep(0.001)
+        release.set()
+        quotes = [future.result() for future in futures]
+
+    assert len(fetches) == 1
+    assert len({quote.quote_id for quote in quotes}) == 4
+    assert all(quote.route == {"routeSummary": {"amountOut": "42"}} for quote in quotes)
+    # Every caller can execute its own quote
+    for quote in quotes:
+        assert store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 1.5) is quote
+
+
+def test_async_quotes_share_one_fetch_but_not_the_quote_id():
+    store, fetches = QuoteStore(), []
+
+    async def fetch_route():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return {"routeSummary": {}}
+
+    async def main():
+        return await asyncio.gather(*(store.aquote(TOKEN_IN, TOKEN_OUT, 2, fetch_route) for _ in range(3)))
+
+    quotes = asyncio.run(main())
+    assert len(fetches) == 1
+    assert len({quote.quote_id for quote in quotes}) == 3
+
+
+def test_failed_fetch_reaches_every_waiter_and_stores_nothing():
+    store = QuoteStore()
+
+    def fetch_route():
+        raise RuntimeError("aggregator down")
+
+    with pytest.raises(RuntimeError):
+        store.quote(TOKEN_IN, TOKEN_OUT, 1, fetch_route)
+    assert store.stats["quotes"] == 0
+
+
+def test_quote_can_be_used_once_even_when_raced():
+    store = QuoteStore()
+    quote = store.quote(TOKEN_IN, TOKEN_OUT, 1, lambda: {"routeSummary": {}})
+
+    def take():
+        try:
+            return store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 1)
+        except QuoteError:
+            return None
+
+    with ThreadPoolExecutor(8) as pool:
+        taken = [result for result in pool.map(lambda _: take(), range(8)) if result is not None]
+    assert taken == [quote]
+
+
+def test_expired_quote_is_rejected():
+    store = QuoteStore(ttl=0.01)
+    quote = store.quote(TOKEN_IN, TOKEN_OUT, 1, lambda: {"routeSummary": {}})
+    time.sleep(0.02)
+    with pytest.raises(QuoteError, match="unknown or expired"):
+        store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 1)
+    assert store.stats["expired"] == 1
+
+
+def test_quote_for_another_trade_is_rejected_and_kept():
+    store = QuoteStore()
+    quote = store.quote(TOKEN_IN, TOKEN_OUT, 1, lambda: {"routeSummary": {}})
+    with pytest.raises(QuoteError, match="different trade"):
+        store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 2)
+    assert store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 1) is quote
+
+
+def test_released_quote_can_be_used_again_until_it_expires():
+    store = QuoteStore(ttl=0.05)
+    quote = store.quote(TOKEN_IN, TOKEN_OUT, 1, lambda: {"routeSummary": {}})
+    store.release(store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 1))
+    assert store.use(quote.quote_id, TOKEN_IN, TOKEN_OUT, 1) is quote
+    time.sleep(0.06)
+    store.release(quote)
+    assert store.get(quote.quote_id) is None
+    assert store.stats["used"] == 1 and store.stats["released"] == 1
+
+
+def test_swap_that_fails_before_sending_hands_its_quote_back():
+    connection = object.__new__(SonicConnection)
+    connection._quotes = QuoteStore()
+    connection._batcher = None
+    connection._web3 = Web3()
+    connection._fee_params = lambda speed: (2, 1)
+    connection._get_encoded_swap_data = lambda summary, slippage, wallet_id: "0x"
+
+    def no_wallet(wallet_id):
+        raise ValueError("Privy wallet not found")
+
+    connection._get_privy_wallet_address = no_wallet
+    native = connection.NATIVE_TOKEN = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+    quote = connection._quotes.quote(native, TOKEN_OUT, 1, lambda: {"routeSummary": {}, "routerAddress": TOKEN_OUT})
+    with pytest.raises(ValueError, match="Privy wallet not found"):
+        connection.swap(native, TOKEN_OUT, 1, privy_wallet_id="wallet-1", quote_id=quote.quote_id)
+    assert connection._quotes.get(quote.quote_id) is quote
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from src.helpers.evm.read_cache import BlockReadCache
+
+
+class Node:
+    """Counts the requests that reach it; answers with the current call number"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, method, params):
+        self.calls.append(method)
+        return {"jsonrpc": "2.0", "id": len(self.calls), "result": hex(len(self.calls))}
+
+
+def cache(head=100):
+    return BlockReadCache(lambda: head, poll_interval=60.0)
+
+
+def test_reads_are_shared_within_a_block():
+    node, reads = Node(), cache()
+    first = reads.request("eth_getBalance", ["0xabc", "latest"], node)
+    assert reads.request("eth_getBalance", ["0xabc", "latest"], node) == first
+    assert node.calls == ["eth_getBalance"]
+
+
+def test_new_head_invalidates_entries():
+    node, reads = Node(), cache()
+    first = reads.request("eth_call", [{"to": "0xabc"}, "latest"], node)
+    reads.on_head(101)
+    assert reads.request("eth_call", [{"to": "0xabc"}, "latest"], node) != first
+    assert reads.stats["invalidations"] == 1
+    # An older head arriving late changes nothing
+    reads.on_head(100)
+    assert reads.head == 101
+
+
+def test_live_head_is_only_known_while_the_poller_runs():
+    node, reads = Node(), cache()
+    assert reads.live_head() is None
+    reads.request("eth_getBalance", ["0xabc", "latest"], node)
+    assert reads.live_head() == 100
+    reads.enabled = False
+    assert reads.live_head() is None
+
+
+def test_pending_bypassed_and_errors_are_not_cached():
+    node, reads = Node(), cache()
+    reads.request("eth_getBalance", ["0xabc", "pending"], node)
+    reads.request("eth_getBalance", ["0xabc", "pending"], node)
+    with reads.bypass():
+        reads.request("eth_getBalance", ["0xabc", "latest"], node)
+    assert len(node.calls) == 3
+
+    failing = lambda method, params: {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "boom"}}
+    reads.request("eth_getCode", ["0xabc", "latest"], failing)
+    reads.request("eth_getCode", ["0xabc", "latest"], node)
+    assert node.calls[-1] == "eth_getCode"
+
+
+def test_nonces_are_never_cached():
+    node, reads = Node(), cache()
+    for _ in range(2):
+        reads.request("eth_getTransactionCount", ["0xabc", "latest"], node)
+    assert node.calls == ["eth_getTransactionCount"] * 2
+
+
+def test_chain_id_is_kept_across_heads():
+    node, reads = Node(), cache()
+    first = reads.request("eth_chainId", [], node)
+    reads.on_head(101)
+    assert reads.request("eth_chainId", [], node) == first
+    assert node.calls == ["eth_chainId"]
+
+
+def test_concurrent_identical_misses_share_one_request():
+    gate, node, reads = threading.Event(), Node(), cache()
+
+    def slow_node(method, params):
+        gate.wait(5)
+        return node(method, params)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(reads.request("eth_getBalance", ["0xabc", "latest"], slow_node)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while reads.stats["hits"] + reads.stats["misses"] < 4 and time.time() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert node.calls == ["eth_getBalance"]
+    assert len({result["result"] for result in results}) == 1
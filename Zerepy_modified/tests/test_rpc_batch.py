@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.helpers.evm.rpc_batch import RpcBatcher
+
+
+class FakeNode:
+    """send() for the batcher: answers every request with "<method>:<param>" and records each POST"""
+
+    def __init__(self, reject_batches=False, drop_ids=(), error=None):
+        self.reject_batches = reject_batches
+        self.drop_ids = set(drop_ids)
+        self.error = error
+        self.posts = []
+        self._lock = threading.Lock()
+
+    def answer(self, request):
+        return {"jsonrpc": "2.0", "id": request["id"], "result": f"{request['method']}:{request['params'][0]}"}
+
+    def __call__(self, data):
+        payload = json.loads(data)
+        with self._lock:
+            self.posts.append(payload)
+        if self.error is not None:
+            raise self.error
+        if not isinstance(payload, list):
+            return json.dumps(self.answer(payload)).encode()
+        if self.reject_batches:
+            return json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch disabled"}}).encode()
+        return json.dumps([self.answer(request) for request in payload if request["id"] not in self.drop_ids]).encode()
+
+    def sizes(self):
+        return [len(post) if isinstance(post, list) else 1 for post in self.posts]
+
+
+def read(batcher, param, method="eth_getBalance"):
+    return lambda: batcher.request(method, [param])["result"]
+
+
+def test_calls_of_a_batch_go_out_together_once_every_member_is_waiting():
+    node = FakeNode()
+    # A long window: only the barrier can release the batch quickly
+    batcher = RpcBatcher(node, batch_window=5.0)
+    started = time.perf_counter()
+    results = batcher.gather(read(batcher, "a"), read(batcher, "b"), read(batcher, "c"))
+    assert time.perf_counter() - started < 1.0
+    assert results == ["eth_getBalance:a", "eth_getBalance:b", "eth_getBalance:c"]
+    assert node.sizes() == [3]
+    assert batcher.stats["round_trips"] == 1 and batcher.stats["batched_requests"] == 3
+
+
+def test_sequential_calls_cost_one_round_trip_per_step():
+    node = FakeNode()
+    batcher = RpcBatcher(node, batch_window=5.0)
+
+    def two_steps(param):
+        batcher.request("eth_getBalance", [param])
+        return batcher.request("eth_getTransactionCount", [param])["result"]
+
+    assert batcher.gather(lambda: two_steps("a"), lambda: two_steps("b")) == [
+        "eth_getTransactionCount:a", "eth_getTransactionCount:b"
+    ]
+    assert node.sizes() == [2, 2]
+
+
+def test_a_busy_member_holds_the_batch_back_only_for_the_batch_window():
+    node = FakeNode()
+    batcher = RpcBatcher(node, batch_window=0.05)
+
+    def busy():
+        time.sleep(0.5)
+        return batcher.request("eth_getBalance", ["late"])["result"]
+
+    started = time.perf_counter()
+    with batcher.batch() as batch:
+        quick = batch.submit(read(batcher, "quick"))
+        batch.submit(busy)
+        assert quick.result(timeout=0.4) == "eth_getBalance:quick"
+    assert time.perf_counter() - started >= 0.5
+    assert node.sizes() == [1, 1]
+
+
+def test_nodes_that_reject_batches_are_asked_one_request_at_a_time():
+    node = FakeNode(reject_batches=True)
+    batcher = RpcBatcher(node, batch_window=5.0)
+    assert batcher.gather(read(batcher, "a"), read(batcher, "b")) == ["eth_getBalance:a", "eth_getBalance:b"]
+    assert node.sizes() == [2, 1, 1]
+    assert batcher.stats["rejected"] == 1 and batcher.stats["round_trips"] == 3
+
+
+def test_a_request_missing_from_the_response_gets_an_error_of_its_own():
+    node = FakeNode(drop_ids={2})
+    batcher = RpcBatcher(node, batch_window=5.0)
+    with batcher.batch() as batch:
+        batch.submit_many([(batcher.request, ("eth_getBalance", [param])) for param in "ab"])
+    responses = {response["id"]: response for response in batch.results()}
+    assert "result" in responses[1]
+    assert responses[2]["error"]["message"] == "Request missing from the batch response"
+    assert node.sizes() == [2]
+
+
+def test_large_batches_are_split_into_max_batch_posts():
+    node = FakeNode()
+    batcher = RpcBatcher(node, batch_window=5.0, max_batch=2)
+    results = batcher.gather(*(read(batcher, str(index)) for index in range(5)))
+    assert results == [f"eth_getBalance:{index}" for index in range(5)]
+    assert sum(node.sizes()) == 5 and max(node.sizes()) == 2
+
+
+def test_a_transport_error_fails_every_call_of_the_post():
+    node = FakeNode(error=ConnectionError("refused"))
+    batcher = RpcBatcher(node, batch_window=5.0)
+    with batcher.batch() as batch:
+        batch.submit(read(batcher, "a"))
+        batch.submit(read(batcher, "b"))
+    for future in batch.futures:
+        with pytest.raises(ConnectionError):
+            future.result()
+    assert len(node.posts) == 1
+
+
+def test_reads_outside_a_batch_are_sent_at_once_without_a_window():
+    node = FakeNode()
+    batcher = RpcBatcher(node)
+    assert read(batcher, "a")() == "eth_getBalance:a"
+    assert node.posts == [{"jsonrpc": "2.0", "method": "eth_getBalance", "params": ["a"], "id": 1}]
+
+
+def test_nested_gathers_run_inline_instead_of_filling_the_worker_pool():
+    node = FakeNode()
+    batcher = RpcBatcher(node, batch_window=0.05)
+    started, lock, all_busy = [], threading.Lock(), threading.Event()
+
+    def step(param):
+        # Every worker of the pool is busy with a step before any step gathers
+        with lock:
+            started.append(param)
+            if len(started) == 32:
+                all_busy.set()
+        all_busy.wait()
+        # A step that gathers reads of its own, as connection methods inside a Preflight do
+        return batcher.gather(read(batcher, param + "1"), read(batcher, param + "2"))
+
+    # Submitted to the pool, the nested reads would queue behind the steps that wait for them
+    outcome = []
+    worker = threading.Thread(target=lambda: outcome.append(
+        batcher.gather(*(lambda param=str(index): step(param) for index in range(40)))), daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive()
+    assert outcome[0][3] == ["eth_getBalance:31", "eth_getBalance:32"]
+    assert batcher.stats["requests"] == 80 and batcher.stats["batches"] >= 1
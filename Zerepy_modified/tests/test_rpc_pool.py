@@ -0,0 +1,268 @@
+import json
+import time
+
+import pytest
+from eth_utils import keccak
+from web3 import Web3
+
+from src.helpers.evm.rpc_pool import (
+    PooledHTTPProvider, RpcEndpoint, RpcPool, needs_write_endpoint, pool_from_config
+)
+
+
+RAW_TX = "0x" + "ab" * 40
+TX_HASH = "0x" + keccak(hexstr=RAW_TX).hex()
+
+
+def request(method, params, request_id=7):
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}).encode()
+
+
+def reply(result=None, error=None, request_id=7):
+    body = {"jsonrpc": "2.0", "id": request_id}
+    body.update({"error": {"code": -32000, "message": error}} if error else {"result": result})
+    return json.dumps(body).encode()
+
+
+def timed_pool(monkeypatch, answers, urls=("http://a", "http://b"), **kwargs):
+    """RpcPool whose posts answer from answers[url] = (delay, body or exception)"""
+    pool = RpcPool(list(urls), **kwargs)
+    calls = []
+
+    def post(endpoint, data):
+        calls.append(endpoint.url)
+        delay, answer = answers[endpoint.url]
+        time.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(pool, "_post", post)
+    return pool, calls
+
+
+def scripted_pool(monkeypatch, script, **kwargs):
+    """RpcPool whose posts answer from script[url]: a list of bodies or exceptions per endpoint"""
+    pool = RpcPool(["http://a", "http://b"], **kwargs)
+    calls = []
+
+    def post(endpoint, data):
+        calls.append((endpoint.url, json.loads(data)["method"]))
+        answer = script[endpoint.url].pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(pool, "_post", post)
+    return pool, calls
+
+
+def test_slow_read_is_hedged_and_the_faster_answer_wins(monkeypatch):
+    pool, calls = timed_pool(monkeypatch, {
+        "http://a": (0.5, reply(result="0x1")),
+        "http://b": (0.0, reply(result="0x2")),
+    }, hedge_after=0.05)
+    started = time.perf_counter()
+    body = json.loads(pool.send(request("eth_blockNumber", [])))
+    assert body["result"] == "0x2"
+    assert time.perf_counter() - started < 0.4
+    assert calls == ["http://a", "http://b"]
+    assert pool.stats["hedges"] == 1 and pool.read[1].hedges_won == 1
+
+
+def test_fast_read_is_not_hedged(monkeypatch):
+    pool, calls = timed_pool(monkeypatch, {
+        "http://a": (0.0, reply(result="0x1")),
+        "http://b": (0.0, reply(result="0x2")),
+    }, hedge_after=0.2)
+    assert json.loads(pool.send(request("eth_blockNumber", [])))["result"] == "0x1"
+    assert calls == ["http://a"] and pool.stats["hedges"] == 0
+
+
+def test_failed_read_moves_to_the_next_endpoint_without_waiting(monkeypatch):
+    pool, calls = timed_pool(monkeypatch, {
+        "http://a": (0.0, ConnectionError("refused")),
+        "http://b": (0.0, reply(result="0x2")),
+    }, hedge_after=5.0)
+    assert json.loads(pool.send(request("eth_blockNumber", [])))["result"] == "0x2"
+    assert pool.stats["failovers"] == 1
+
+
+def test_reads_fail_when_every_endpoint_fails(monkeypatch):
+    pool, _ = timed_pool(monkeypatch, {
+        "http://a": (0.0, ConnectionError("a down")),
+        "http://b": (0.0, ConnectionError("b down")),
+    })
+    with pytest.raises(ConnectionError):
+        pool.send(request("eth_blockNumber", []))
+
+
+def test_writes_fail_over_in_order_and_are_never_hedged(monkeypatch):
+    pool, calls = timed_pool(monkeypatch, {
+        "http://a": (0.1, ConnectionError("refused")),
+        "http://b": (0.0, reply(result="0xhash")),
+    }, hedge_after=0.0)
+    body = json.loads(pool.send(request("eth_sendRawTransaction", ["0x00"]), write=True))
+    assert body["result"] == "0xhash"
+    assert calls == ["http://a", "http://b"]
+    assert pool.stats["hedges"] == 0 and pool.stats["failovers"] == 1
+
+
+def test_endpoint_sits_out_after_consecutive_errors():
+    endpoint = RpcEndpoint("http://a")
+    for _ in range(2):
+        endpoint.record_failure(ConnectionError("refused"), max_errors=3, cooldown=60)
+    assert endpoint.healthy
+    endpoint.record_failure(ConnectionError("refused"), max_errors=3, cooldown=60)
+    assert not endpoint.healthy
+    endpoint.record_success(0.01)
+    assert endpoint.healthy and endpoint.consecutive_errors == 0
+
+
+def test_unhealthy_and_slow_endpoints_rank_last():
+    pool = RpcPool(["http://a", "http://b", "http://c"])
+    pool.read[0].record_latency(0.5)
+    pool.read[1].record_latency(0.1)
+    pool.read[2].down_until = time.time() + 60
+    assert [endpoint.url for endpoint in pool.ranked(pool.read)] == ["http://b", "http://a", "http://c"]
+
+
+def fan_out_pool(monkeypatch, answers):
+    return timed_pool(monkeypatch, answers, hedge_after=None, fan_out=True)
+
+
+def test_fan_out_returns_the_first_acceptance(monkeypatch):
+    pool, calls = fan_out_pool(monkeypatch, {
+        "http://a": (0.3, reply(result=TX_HASH)),
+        "http://b": (0.0, reply(result=TX_HASH)),
+    })
+    started = time.perf_counter()
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["result"] == TX_HASH
+    assert time.perf_counter() - started < 0.25
+    assert sorted(calls) == ["http://a", "http://b"]
+    assert pool.accepted_by(TX_HASH)["endpoint"] == "http://b"
+
+
+def test_fan_out_skips_failures_and_counts_already_known_as_accepted(monkeypatch):
+    pool, _ = fan_out_pool(monkeypatch, {
+        "http://a": (0.0, ConnectionError("refused")),
+        "http://b": (0.05, reply(error="already known")),
+    })
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["result"] == TX_HASH
+    assert pool.accepted_by(TX_HASH)["already_known"] is True
+
+
+def test_fan_out_passes_on_a_rejection_when_nobody_accepts(monkeypatch):
+    pool, _ = fan_out_pool(monkeypatch, {
+        "http://a": (0.0, ConnectionError("refused")),
+        "http://b": (0.0, reply(error="replacement transaction underpriced")),
+    })
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["error"]["message"] == "replacement transaction underpriced"
+
+
+def test_fan_out_raises_when_every_endpoint_fails(monkeypatch):
+    pool, _ = fan_out_pool(monkeypatch, {
+        "http://a": (0.0, ConnectionError("a down")),
+        "http://b": (0.0, ConnectionError("b down")),
+    })
+    with pytest.raises(ConnectionError):
+        pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True)
+    assert pool.accepted_by(TX_HASH) is None
+
+
+NETWORK = {"rpc_url": "https://public", "rpc_urls": ["https://public-2"]}
+
+
+def test_pool_from_config_adds_the_network_endpoints():
+    pool = pool_from_config({}, NETWORK)
+    assert [endpoint.url for endpoint in pool.read] == ["https://public", "https://public-2"]
+    assert [endpoint.url for endpoint in pool.write] == ["https://public"]
+
+
+def test_pool_from_config_keeps_an_own_node_to_itself():
+    pool = pool_from_config({}, NETWORK, rpc_url="https://own-node")
+    assert [endpoint.url for endpoint in pool.read] == ["https://own-node"]
+    assert pool.write[0] is pool.read[0]
+
+
+def test_failover_treats_already_known_as_accepted(monkeypatch):
+    pool, calls = scripted_pool(monkeypatch, {
+        "http://a": [TimeoutError("read timed out")],
+        "http://b": [reply(error="already known")],
+    })
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["result"] == TX_HASH
+    assert calls == [("http://a", "eth_sendRawTransaction"), ("http://b", "eth_sendRawTransaction")]
+
+
+def test_failover_nonce_too_low_for_this_hash_is_accepted(monkeypatch):
+    pool, calls = scripted_pool(monkeypatch, {
+        "http://a": [TimeoutError("read timed out")],
+        "http://b": [reply(error="nonce too low"), reply(result={"hash": TX_HASH})],
+    })
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["result"] == TX_HASH
+    assert calls[-1] == ("http://b", "eth_getTransactionByHash")
+
+
+def test_failover_nonce_too_low_for_another_tx_is_passed_on(monkeypatch):
+    pool, _ = scripted_pool(monkeypatch, {
+        "http://a": [TimeoutError("read timed out")],
+        "http://b": [reply(error="nonce too low"), reply(result=None)],
+    })
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["error"]["message"] == "nonce too low"
+
+
+def test_nonce_too_low_without_failover_is_passed_on(monkeypatch):
+    pool, calls = scripted_pool(monkeypatch, {"http://a": [reply(error="nonce too low")], "http://b": []})
+    body = json.loads(pool.send(request("eth_sendRawTransaction", [RAW_TX]), write=True))
+    assert body["error"]["message"] == "nonce too low"
+    assert calls == [("http://a", "eth_sendRawTransaction")]
+
+
+def test_pending_nonce_reads_skip_hedging_and_batching(monkeypatch):
+    pool, calls = scripted_pool(monkeypatch, {"http://a": [reply(result="0x5", request_id=0)], "http://b": []},
+                                hedge_after=0.0)
+
+    class Batcher:
+        def request(self, method, params):
+            raise AssertionError("pending nonce read went through the batcher")
+
+    provider = PooledHTTPProvider(pool, batcher=Batcher())
+    response = provider.make_request("eth_getTransactionCount", ["0x" + "11" * 20, "pending"])
+    assert response["result"] == "0x5"
+    assert calls == [("http://a", "eth_getTransactionCount")]
+
+
+def test_nonce_reads_ignore_a_faster_lagging_read_endpoint(monkeypatch):
+    # The public node ranks first for reads but has not seen the approval just mined
+    pool = RpcPool(["http://lagging", "http://fresh"], ["http://fresh"], hedge_after=0.0)
+    pool.read[0].record_latency(0.001)
+    pool.read[1].record_latency(0.5)
+    calls = []
+
+    def post(endpoint, data):
+        request_id = json.loads(data)["id"]
+        calls.append(endpoint.url)
+        return reply(result="0x4" if endpoint.url == "http://lagging" else "0x5", request_id=request_id)
+
+    monkeypatch.setattr(pool, "_post", post)
+    web3 = Web3(PooledHTTPProvider(pool))
+    assert web3.eth.get_transaction_count("0x" + "11" * 20) == 5
+    assert calls == ["http://fresh"]
+    # Other reads still go to the fastest endpoint
+    assert web3.eth.get_balance("0x" + "11" * 20) == 4
+    assert calls[-1] == "http://lagging"
+
+
+@pytest.mark.parametrize("method, params, expected", [
+    ("eth_getTransactionCount", ["0xabc", "pending"], True),
+    ("eth_getTransactionCount", ["0xabc", "latest"], True),
+    ("eth_getBalance", ["0xabc", "pending"], False),
+])
+def test_needs_write_endpoint(method, params, expected):
+    assert needs_write_endpoint(method, params) is expected
@@ -0,0 +1,87 @@
+import pytest
+from eth_account import Account
+
+from src.helpers.evm.signers import (
+    LOCAL_SIGNER, HsmSigner, LocalKeySigner, SignerError, SignerRegistry, SoftwareHsm
+)
+
+HOUSE_KEY = "0x" + "01" * 32
+DYNAMIC_FEE_TX = {
+    "chainId": 146, "nonce": 3, "to": "0x" + "22" * 20, "value": 10, "gas": 21000,
+    "maxFeePerGas": 2 * 10 ** 9, "maxPriorityFeePerGas": 10 ** 9, "data": "0x",
+}
+LEGACY_TX = {"chainId": 146, "nonce": 3, "to": "0x" + "22" * 20, "value": 10, "gas": 21000, "gasPrice": 10 ** 9}
+
+
+class FakePrivy:
+    kind = "privy"
+
+    def __init__(self, wallet_id):
+        self.wallet_id = wallet_id
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.delenv("PRIVY_WALLET_ID", raising=False)
+    monkeypatch.setenv("TREASURY_PRIVATE_KEY", HOUSE_KEY)
+    registry = SignerRegistry(FakePrivy)
+    registry.configure({"treasury": {"type": "local", "key_env": "TREASURY_PRIVATE_KEY"}}, default="treasury")
+    return registry
+
+
+@pytest.mark.parametrize("tx", [DYNAMIC_FEE_TX, LEGACY_TX])
+def test_hsm_signature_matches_local_signing(tx):
+    hsm = SoftwareHsm()
+    address = hsm.import_key("mm-1", HOUSE_KEY)
+    local, remote = LocalKeySigner(HOUSE_KEY), HsmSigner(hsm, "mm-1")
+    assert remote.address == local.address == address
+    raw = remote.sign(tx)
+    assert raw == local.sign(tx)
+    assert Account.recover_transaction(raw) == address
+
+
+def test_transaction_from_another_address_is_refused():
+    with pytest.raises(SignerError):
+        LocalKeySigner(HOUSE_KEY).sign({**DYNAMIC_FEE_TX, "from": "0x" + "33" * 20})
+
+
+def test_writes_naming_no_wallet_use_the_default_signer(registry):
+    assert registry.signer_for(None).kind == "local"
+
+
+def test_callers_cannot_name_a_server_held_wallet(registry):
+    registry.register(LOCAL_SIGNER, LocalKeySigner(HOUSE_KEY))
+    for wallet_id in ("treasury", LOCAL_SIGNER):
+        with pytest.raises(SignerError):
+            registry.signer_for(wallet_id)
+
+
+def test_other_wallet_ids_go_to_privy(registry):
+    signer = registry.signer_for("local")
+    assert signer.kind == "privy" and signer.wallet_id == "local"
+
+
+def test_privy_wallet_id_env_takes_precedence_over_the_default(registry, monkeypatch):
+    monkeypatch.setenv("PRIVY_WALLET_ID", "wallet-1")
+    assert registry.signer_for(None).kind == "privy"
+
+
+def test_signing_time_is_recorded_per_kind(registry):
+    registry.sign(DYNAMIC_FEE_TX, None)
+    assert registry.metrics()["signing"]["local"]["signatures"] == 1
+
+
+@pytest.mark.parametrize("spec", [
+    {"type": "local", "key_env": "UNSET_PRIVATE_KEY"},
+    {"type": "ledger", "key_env": "TREASURY_PRIVATE_KEY"},
+])
+def test_misconfigured_signers_are_rejected(spec, monkeypatch):
+    monkeypatch.delenv("UNSET_PRIVATE_KEY", raising=False)
+    monkeypatch.setenv("TREASURY_PRIVATE_KEY", HOUSE_KEY)
+    with pytest.raises(SignerError):
+        SignerRegistry(FakePrivy).configure({"treasury": spec})
+
+
+def test_default_must_be_a_configured_signer():
+    with pytest.raises(SignerError):
+        SignerRegistry(FakePrivy).configure({}, default="missing")
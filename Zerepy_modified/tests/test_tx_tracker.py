@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from web3 import Web3
+
+from src.connections.sonic_connection import SonicConnection
+from src.helpers.evm.fees import GWEI
+from src.helpers.evm.nonce import NonceManager
+from src.helpers.evm.tx_tracker import MINED, TxTracker
+
+WALLET = "0x000000000000000000000000000000000000dEaD"
+ORIGINAL = "0x" + "01" * 32
+
+
+class FakeWatcher:
+    """Receipts and heads are delivered by the test instead of a polling thread"""
+
+    def __init__(self):
+        self.futures = {}
+        self.forgotten = []
+        self.last_block = 100
+        self._listeners = []
+
+    def add_head_listener(self, listener):
+        self._listeners.append(listener)
+
+    def watch(self, tx_hash, timeout=None, callback=None):
+        future = self.futures.setdefault(tx_hash, Future())
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def forget(self, tx_hash):
+        self.forgotten.append(tx_hash)
+        self.futures.pop(tx_hash).cancel()
+
+    def head(self, block_number):
+        self.last_block = block_number
+        for listener in self._listeners:
+            listener(block_number)
+
+    def mine(self, tx_hash, status=1):
+        self.futures[tx_hash].set_result({"status": status, "blockNumber": self.last_block, "gasUsed": 21000})
+
+
+class Replacer:
+    """Stands in for the connection's re-sign callback; returns a new hash per attempt"""
+
+    def __init__(self, error=None, gate=None):
+        self.error = error
+        self.gate = gate
+        self.attempts = []
+        self.started = threading.Event()
+
+    def __call__(self, attempt):
+        self.attempts.append(attempt)
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return "0x" + f"{attempt + 1:02x}" * 32
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def tracked(replacer, **kwargs):
+    watcher = FakeWatcher()
+    tracker = TxTracker(watcher, stuck_blocks=3, **kwargs)
+    job = tracker.track("transfer", ORIGINAL, WALLET, 5, replace=replacer)
+    return watcher, tracker, job
+
+
+def test_stuck_transaction_is_replaced_and_the_replacement_completes_the_job():
+    replacer = Replacer()
+    watcher, tracker, job = tracked(replacer)
+    watcher.head(102)
+    assert replacer.attempts == []
+    watcher.head(103)
+    wait_until(lambda: job.replacements == 1)
+    replacement = "0x" + "02" * 32
+    assert job.tx_hashes == [ORIGINAL, replacement]
+    assert tracker.get(ORIGINAL) is tracker.get(replacement) is job
+
+    watcher.mine(replacement)
+    assert tracker.wait(job, timeout=1)["status"] == 1
+    assert job.status == MINED and job.tx_hash == replacement
+    assert watcher.forgotten == [ORIGINAL]
+
+
+def test_original_mined_while_its_replacement_is_in_flight_wins():
+    gate = threading.Event()
+    replacer = Replacer(gate=gate)
+    watcher, tracker, job = tracked(replacer)
+    watcher.head(103)
+    assert replacer.started.wait(5)
+
+    watcher.mine(ORIGINAL)
+    gate.set()
+    wait_until(lambda: not tracker._replacing)
+    assert job.status == MINED and job.tx_hash == ORIGINAL
+    assert job.replacements == 0 and job.tx_hashes == [ORIGINAL]
+    assert list(watcher.futures) == [ORIGINAL]
+    assert tracker.stats["replaced"] == 0
+
+
+def test_underpriced_replacement_keeps_the_job_and_retries_later():
+    replacer = Replacer(error=ValueError("replacement transaction underpriced"))
+    watcher, tracker, job = tracked(replacer)
+    watcher.head(103)
+    wait_until(lambda: tracker.stats["replace_errors"] == 1 and not tracker._replacing)
+    assert not job.done and job.tx_hashes == [ORIGINAL]
+
+    # The stuck clock restarts from the failed attempt
+    watcher.head(105)
+    assert replacer.attempts == [1]
+    watcher.head(106)
+    wait_until(lambda: tracker.stats["replace_errors"] == 2)
+    assert replacer.attempts == [1, 1]
+
+
+def test_replacements_stop_at_the_limit():
+    replacer = Replacer()
+    watcher, tracker, job = tracked(replacer, max_replacements=1)
+    watcher.head(103)
+    wait_until(lambda: job.replacements == 1 and not tracker._replacing)
+    watcher.head(106)
+    wait_until(lambda: not tracker._replacing)
+    watcher.head(109)
+    assert replacer.attempts == [1]
+
+
+class FakeEth:
+    def __init__(self):
+        self.sent = []
+
+    def send_raw_transaction(self, raw):
+        self.sent.append(raw)
+        return bytes([len(self.sent)]) * 32
+
+
+def test_replacer_resigns_the_same_nonce_with_bumped_fees():
+    web3 = SimpleNamespace(eth=FakeEth(), from_wei=Web3.from_wei)
+    signed = []
+    connection = object.__new__(SonicConnection)
+    connection._web3 = web3
+    connection._fee_bump = 1.125
+    connection._fee_oracle = SimpleNamespace(fees=lambda speed: (3 * GWEI, GWEI))
+    connection._nonce_manager = NonceManager(web3)
+    connection._signers = SimpleNamespace(sign=lambda tx, wallet_id: signed.append(dict(tx)) or b"raw")
+
+    tx = {"nonce": 5, "maxFeePerGas": 4 * GWEI, "maxPriorityFeePerGas": GWEI // 2}
+    replace = connection._replacer(tx, WALLET)
+    replace(1)
+    replace(2)
+    assert [signed_tx["nonce"] for signed_tx in signed] == [5, 5]
+    # First bump: 12.5% over the original, the tip lifted to the fast tier's 1 gwei
+    assert signed[0]["maxFeePerGas"] == 4.5 * GWEI and signed[0]["maxPriorityFeePerGas"] == GWEI
+    # Second bump builds on the first
+    assert signed[1]["maxFeePerGas"] > signed[0]["maxFeePerGas"]
+    assert signed[1]["maxPriorityFeePerGas"] > signed[0]["maxPriorityFeePerGas"]
+    # The caller's tx is left alone
+    assert tx["maxFeePerGas"] == 4 * GWEI
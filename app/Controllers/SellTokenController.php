@@ -288,6 +288,13 @@ class SellTokenController extends Controller
 
             $curl = curl_init();
             
+            // Lets zerePY answer a retry from the first attempt instead of selling twice.
+            // The key comes from the browser, so it is checked before going into a header.
+            $idempotencyKey = $request->input('idempotency_key');
+            if (!is_string($idempotencyKey) || !preg_match('/\A[A-Za-z0-9-]{1,128}\z/', $idempotencyKey)) {
+                $idempotencyKey = null;
+            }
+
             $postData = json_encode([
                 'connection' => 'sonic',
                 'action' => 'sell-token',
@@ -308,10 +315,10 @@ class SellTokenController extends Controller
                 CURLOPT_HTTP_VERSION => CURL_HTTP_VERSION_1_1,
                 CURLOPT_CUSTOMREQUEST => 'POST',
                 CURLOPT_POSTFIELDS => $postData,
-                CURLOPT_HTTPHEADER => [
+                CURLOPT_HTTPHEADER => array_merge([
                     'Content-Type: application/json',
                     'Content-Length: ' . strlen($postData)
-                ],
+                ], $idempotencyKey ? ['Idempotency-Key: ' . $idempotencyKey] : []),
             ]);
             
             $response = curl_exec($curl);
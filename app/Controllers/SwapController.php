@@ -50,6 +50,7 @@ class InstantSwapController extends Controller
                 CURLOPT_RETURNTRANSFER => true,
                 CURLOPT_POST           => true,
                 CURLOPT_POSTFIELDS     => json_encode($postData),
+                CURLOPT_HTTPHEADER     => $this->agentHeaders($request),
             ]);
             $response = curl_exec($curl);
             curl_close($curl);
@@ -60,7 +61,21 @@ class InstantSwapController extends Controller
         }
     }
 
-    // Get swap details from KyberSwap API
+    // Headers for zerePY, with the key the frontend made for this quote so a retry is
+    // answered from the first attempt. Keys are checked before they go into a header
+    // (no CR/LF); without a valid one the swap is sent unkeyed.
+    private function agentHeaders(Request $request): array
+    {
+        $headers = ['Content-Type: application/json'];
+        $key = $request->header('Idempotency-Key') ?: $request->input('idempotency_key');
+        if (is_string($key) && preg_match('/\A[A-Za-z0-9-]{1,128}\z/', $key)) {
+            $headers[] = 'Idempotency-Key: ' . $key;
+        }
+        return $headers;
+    }
+
+    // Get swap details from zerePY, which keeps the route under a quote id so the swap
+    // executes exactly what the user confirmed
     public function processAmount(Request $request)
     {
         $amount  = $request->input('amount');
@@ -70,24 +85,21 @@ class InstantSwapController extends Controller
         }
 
         try {
-            $amountRaw = bcmul($amount, '1000000000000000000');
-            $response = Http::get('https://aggregator-api.kyberswap.com/sonic/api/v1/routes', [
-                'tokenIn'    => '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE',
-                'tokenOut'   => $tokenData->contract_address,
-                'amountIn'   => $amountRaw,
-                'gasInclude' => 'true'
+            $response = Http::post('http://localhost:8000/sonic/quote', [
+                'token_in'  => '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE',
+                'token_out' => $tokenData->contract_address,
+                'amount'    => (float)$amount,
             ]);
 
             if (!$response->successful()) {
-                throw new \Exception('KyberSwap API failed');
+                throw new \Exception('Swap quote failed');
             }
-            $data = $response->json();
-            if (!isset($data['data']['routeSummary'])) {
+            $quote = $response->json('result');
+            if (!isset($quote['quote_id'])) {
                 throw new \Exception('Invalid response');
             }
-            $routeSummary      = $data['data']['routeSummary'];
-            $estimatedAmountOut = bcdiv($routeSummary['amountOut'] ?? '0', '1000000000000000000', 18);
-            $priceImpact       = $routeSummary['priceImpact'] ?? 0;
+            $estimatedAmountOut = number_format((float)($quote['amountOut'] ?? 0), 18, '.', '');
+            $priceImpact       = $quote['priceImpact'] ?? 0;
             $minimumReceived   = bcmul($estimatedAmountOut, '0.99', 18);
 
             return response()->json([
@@ -95,12 +107,13 @@ class InstantSwapController extends Controller
                     'type'         => 'confirm_swap',
                     'token'        => $tokenData,
                     'amount'       => $amount,
+                    'quote_id'     => $quote['quote_id'],
                     'swap_details' => [
                         'current_price'     => $tokenData->price_sonic,
                         'estimated_received'=> $estimatedAmountOut,
                         'price_impact'      => $priceImpact,
                         'minimum_received'  => $minimumReceived,
-                        'route_summary'     => $routeSummary,
+                        'expires_at'        => $quote['expires_at'] ?? null,
                     ],
                 ]
             ]);
@@ -124,16 +137,22 @@ class InstantSwapController extends Controller
 
         $user = auth()->user();
         try {
+            $params = [
+                '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE',
+                $tokenData->contract_address,
+                (string)$amount,
+                '0.5',
+                $user->wallet_id,
+            ];
+            // Execute the route quoted in processAmount; without a quote id zerePY routes afresh
+            $quoteId = $request->input('quote_id');
+            if (is_string($quoteId) && preg_match('/\A[0-9a-f]{32}\z/', $quoteId)) {
+                $params[] = $quoteId;
+            }
             $postData = [
                 'connection' => 'sonic',
                 'action'     => 'swap',
-                'params'     => [
-                    '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE',
-                    $tokenData->contract_address,
-                    (string)$amount,
-                    '0.5',
-                    $user->wallet_id,
-                ]
+                'params'     => $params,
             ];
 
             $curl = curl_init();
@@ -142,7 +161,7 @@ class InstantSwapController extends Controller
                 CURLOPT_RETURNTRANSFER => true,
                 CURLOPT_CUSTOMREQUEST  => 'POST',
                 CURLOPT_POSTFIELDS     => json_encode($postData),
-                CURLOPT_HTTPHEADER     => ['Content-Type: application/json'],
+                CURLOPT_HTTPHEADER     => $this->agentHeaders($request),
             ]);
             $response  = curl_exec($curl);
             $httpCode  = curl_getinfo($curl, CURLINFO_HTTP_CODE);
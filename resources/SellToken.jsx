@@ -173,6 +173,8 @@ export default function SellToken({
   const [optionsLocked, setOptionsLocked] = useState(false);
   const scrollRef = useRef(null);
   const bottomRef = useRef(null);
+  // One key per quote, so a retried confirmation cannot sell twice
+  const sellKeyRef = useRef(null);
   
   // Auto-scroll to bottom
   useEffect(() => {
@@ -436,6 +438,7 @@ export default function SellToken({
   };
 
   const handleAmountSubmit = (amount) => {
+    sellKeyRef.current = crypto.randomUUID();
     router.post(route('sell-token.action'), {
       action: 'process_amount',
       amount: amount,
@@ -480,7 +483,8 @@ export default function SellToken({
       action: 'execute_sell',
       token_id: selectedTokenId,
       amount: currentAmount,
-      confirmation: confirmation
+      confirmation: confirmation,
+      idempotency_key: sellKeyRef.current
     }, {
       preserveState: true,
       preserveScroll: true,
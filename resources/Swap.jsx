@@ -187,6 +187,8 @@ export default function Exchange({ initialMessage }) {
   const [messages, setMessages] = useState([])
   const [isThinking, setIsThinking] = useState(false)
   const scrollRef = useRef(null)
+  // One key per quote, so a retried confirmation cannot swap twice
+  const swapKeyRef = useRef(null)
 
   useEffect(() => {
     if (initialMessage) {
@@ -209,10 +211,16 @@ export default function Exchange({ initialMessage }) {
     setMessages(prev => [...prev, userMessage])
     setIsThinking(true)
 
+    // Anything but a confirmation asks for a new quote; "yes" executes the current one
+    if (input.trim().toLowerCase() !== 'yes' || !swapKeyRef.current) {
+      swapKeyRef.current = crypto.randomUUID()
+    }
+
     // Demo API endpoint
     router.post('http://localhost:8000/api/v1/swap', {
       action: 'search',
-      query: input
+      query: input,
+      idempotency_key: swapKeyRef.current
     }, {
       preserveState: true
     })